@@ -192,7 +192,7 @@ if errorlevel 1 (
 
 REM Install Python dependencies
 echo Installing Python dependencies...
-pip install python-docx pywin32
+pip install "python-docx>=0.8.11,<1.3" pywin32
 
 REM Register native messaging host
 echo Registering native messaging host...
@@ -128,7 +128,9 @@ class BackgroundService {
     try {
       // Initialize native host manager if not already done
       if (!this.nativeHostManager) {
-        this.nativeHostManager = new NativeHostManager();
+        // The service worker owns a long-lived port so that every popup and
+        // context-menu request reuses one warm native host process.
+        this.nativeHostManager = new NativeHostManager({ persistent: true });
       }
 
       const response = await this.nativeHostManager.sendMessageWithRetry(data);
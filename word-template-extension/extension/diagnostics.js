@@ -70,6 +70,7 @@ class DiagnosticsManager {
             
             // Load additional info
             await this.loadNativeHostInfo();
+            await this.loadPerformanceInfo();
             await this.loadTemplatesInfo();
             await this.loadConfigInfo();
             
@@ -138,6 +139,48 @@ class DiagnosticsManager {
         }
     }
 
+    async loadPerformanceInfo() {
+        const infoDiv = document.getElementById('performanceInfo');
+        
+        try {
+            const response = await this.nativeHostManager.getStats();
+            
+            if (response && response.success && response.actions) {
+                const actions = Object.entries(response.actions);
+                
+                if (actions.length === 0) {
+                    infoDiv.innerHTML = '<div class="test-result test-warning">No requests recorded yet</div>';
+                    return;
+                }
+                
+                const ms = value => (value === null || value === undefined) ? '-' : `${value.toFixed(1)} ms`;
+                let html = `
+                    <table class="stats-table" style="width: 100%; font-family: var(--font-family-mono); font-size: 0.85rem;">
+                        <tr><th align="left">Action</th><th>Count</th><th>Errors</th><th>p50</th><th>p95</th><th>p99</th></tr>
+                `;
+                
+                actions.forEach(([action, stats]) => {
+                    html += `
+                        <tr><td>${action}</td><td align="center">${stats.count}</td><td align="center">${stats.errors}</td>
+                            <td align="center">${ms(stats.p50_ms)}</td><td align="center">${ms(stats.p95_ms)}</td><td align="center">${ms(stats.p99_ms)}</td></tr>
+                    `;
+                    Object.entries(stats.phases || {}).forEach(([phase, timing]) => {
+                        html += `
+                            <tr class="text-muted"><td>&nbsp;&nbsp;${phase}</td><td align="center">${timing.count}</td><td></td>
+                                <td align="center">${ms(timing.p50_ms)}</td><td align="center">${ms(timing.p95_ms)}</td><td align="center">${ms(timing.p99_ms)}</td></tr>
+                        `;
+                    });
+                });
+                
+                infoDiv.innerHTML = html + '</table>';
+            } else {
+                infoDiv.innerHTML = '<div class="test-result test-error">Performance statistics not available</div>';
+            }
+        } catch (error) {
+            infoDiv.innerHTML = `<div class="test-result test-error">Error: ${error.message}</div>`;
+        }
+    }
+
     async loadTemplatesInfo() {
         const infoDiv = document.getElementById('templatesInfo');
         
@@ -270,6 +313,7 @@ class DiagnosticsManager {
     async exportDiagnostics() {
         try {
             const diagnostics = await this.nativeHostManager.runDiagnostics();
+            const stats = await this.nativeHostManager.getStats().catch(() => null);
             const systemInfo = {
                 browser: this.getBrowserInfo(),
                 extensionId: chrome.runtime.id,
@@ -280,6 +324,7 @@ class DiagnosticsManager {
             const report = {
                 system: systemInfo,
                 diagnostics: diagnostics,
+                performance: stats && stats.success ? stats.actions : null,
                 userAgent: navigator.userAgent
             };
 
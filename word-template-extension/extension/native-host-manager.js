@@ -1,22 +1,339 @@
 // Native Host Manager
 // Handles native messaging with better error handling and diagnostics
 
+// Chrome delivers at most 1 MB per message from the host, and the host
+// accepts 1 MB frames; larger messages travel as chunked transfers.
+const MAX_FRAME_BYTES = 1024 * 1024;
+const CHUNK_CHARS = 256 * 1024;
+
+// Request bodies at least this large are sent compressed once the host has
+// listed deflate+base64 among the encodings in its ping response
+const DEFLATE_BASE64 = 'deflate+base64';
+const COMPRESS_MIN_BYTES = 64 * 1024;
+
+// Run bytes through a CompressionStream or DecompressionStream
+async function transformBytes(bytes, stream) {
+  const output = new Blob([bytes]).stream().pipeThrough(stream);
+  return new Uint8Array(await new Response(output).arrayBuffer());
+}
+
+// The host refuses a one-shot request whose response would need a chunked
+// transfer, which sendNativeMessage cannot deliver
+const RESPONSE_TOO_LARGE = 'response_too_large';
+
+function isResponseTooLarge(response) {
+  const error = response?.error;
+  return error === RESPONSE_TOO_LARGE || error?.type === RESPONSE_TOO_LARGE;
+}
+
+// Requests that are safe to send again over a port after the host refused
+// their response: they only read, or render a document to memory
+function isRepeatable(message) {
+  if (['list_templates', 'describe_template', 'get_config', 'stats', 'ping'].includes(message.action)) {
+    return true;
+  }
+  return message.action === 'update_template' && message.data?.output === 'bytes';
+}
+
+function bytesToBase64(bytes) {
+  let binary = '';
+  for (let i = 0; i < bytes.length; i += 0x8000) {
+    binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+  }
+  return btoa(binary);
+}
+
+function base64ToBytes(text) {
+  const binary = atob(text);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return bytes;
+}
+
 class NativeHostManager {
-  constructor() {
+  constructor(options = {}) {
     this.hostName = 'com.wordtemplateextension.nativehost';
     this.isConnected = false;
     this.lastError = null;
     this.messageQueue = [];
     this.connectionPromise = null;
+
+    // Persistent port mode keeps one host process alive for many requests
+    // instead of paying the Python start-up cost on every message.
+    this.persistent = Boolean(options.persistent);
+    this.port = null;
+    this.pendingRequests = new Map();
+    this.progressListeners = new Map();
+    this.incomingTransfers = new Map();
+    this.nextRequestId = 1;
+    // Body encodings the host accepts, from its ping response
+    this.encodings = [];
     
     // Initialize connection test
     this.testConnection();
   }
 
+  connect() {
+    if (this.port) {
+      return this.port;
+    }
+
+    const port = chrome.runtime.connectNative(this.hostName);
+
+    port.onMessage.addListener((response) => {
+      if (response && response.chunk) {
+        response = this.receiveChunk(response);
+        if (!response) {
+          return;
+        }
+      }
+
+      if (response && response.encoding) {
+        this.decodeMessage(response)
+          .then(decoded => this.handlePortResponse(decoded))
+          .catch(error => this.rejectPending(response.id, error));
+        return;
+      }
+
+      this.handlePortResponse(response);
+    });
+
+    port.onDisconnect.addListener(() => {
+      const message = chrome.runtime.lastError?.message || 'Native host disconnected';
+      console.warn('Native host port closed:', message);
+
+      this.port = null;
+      this.isConnected = false;
+      this.lastError = message;
+      this.incomingTransfers.clear();
+
+      for (const pending of this.pendingRequests.values()) {
+        clearTimeout(pending.timeoutId);
+        const error = new Error(message);
+        error.type = 'NATIVE_HOST_ERROR';
+        pending.reject(error);
+      }
+      this.pendingRequests.clear();
+    });
+
+    this.port = port;
+    return port;
+  }
+
+  // Deliver a complete response to its pending request or progress listener
+  handlePortResponse(response) {
+    // Background jobs push progress tagged with the id of the request
+    // that started them
+    if (response && response.type === 'progress') {
+      const listener = this.progressListeners.get(response.id);
+      if (listener) {
+        listener(response);
+      }
+      return;
+    }
+
+    const pending = response ? this.pendingRequests.get(response.id) : null;
+    if (!pending) {
+      console.warn('Unmatched native host response:', response);
+      return;
+    }
+
+    this.pendingRequests.delete(response.id);
+    clearTimeout(pending.timeoutId);
+    this.isConnected = true;
+    this.lastError = null;
+    pending.resolve(response);
+  }
+
+  rejectPending(id, error) {
+    console.error('Could not decode native host response:', error);
+    const pending = this.pendingRequests.get(id);
+    if (pending) {
+      this.pendingRequests.delete(id);
+      clearTimeout(pending.timeoutId);
+      pending.reject(error);
+    }
+  }
+
+  supportsCompression() {
+    return this.encodings.includes(DEFLATE_BASE64) && typeof CompressionStream !== 'undefined';
+  }
+
+  // When the host supports it, ask for compressed responses and send a
+  // large data body compressed; older hosts get the message unchanged
+  async encodeMessage(message) {
+    if (!this.supportsCompression()) {
+      return message;
+    }
+
+    const encoded = { ...message, accept_encoding: DEFLATE_BASE64 };
+    if (message.data === undefined || message.data?.encoding) {
+      return encoded;
+    }
+
+    const bytes = new TextEncoder().encode(JSON.stringify(message.data));
+    if (bytes.length < COMPRESS_MIN_BYTES) {
+      return encoded;
+    }
+
+    const compressed = await transformBytes(bytes, new CompressionStream('deflate'));
+    encoded.data = { encoding: DEFLATE_BASE64, payload: bytesToBase64(compressed) };
+    return encoded;
+  }
+
+  // Unwrap a compressed response into the response it carries
+  async decodeMessage(message) {
+    if (!message || message.encoding !== DEFLATE_BASE64) {
+      return message;
+    }
+
+    const bytes = await transformBytes(base64ToBytes(message.payload), new DecompressionStream('deflate'));
+    const decoded = JSON.parse(new TextDecoder().decode(bytes));
+    return message.id !== undefined ? { ...decoded, id: message.id } : decoded;
+  }
+
+  // Collect one chunk of a transfer; returns the message once it is complete
+  receiveChunk(envelope) {
+    const { chunk, transfer_id: transferId, seq, data } = envelope;
+
+    if (chunk === 'start') {
+      this.incomingTransfers.set(transferId, { parts: [data], nextSeq: 1 });
+      return null;
+    }
+
+    const transfer = this.incomingTransfers.get(transferId);
+    if (!transfer || seq !== transfer.nextSeq) {
+      console.error('Dropping out-of-order chunked transfer:', transferId, seq);
+      this.incomingTransfers.delete(transferId);
+      return null;
+    }
+
+    transfer.parts.push(data);
+    transfer.nextSeq += 1;
+    if (chunk !== 'end') {
+      return null;
+    }
+
+    this.incomingTransfers.delete(transferId);
+    return JSON.parse(transfer.parts.join(''));
+  }
+
+  // Post a message, splitting it into a chunked transfer when it is too
+  // large for a single frame
+  postFramed(port, message) {
+    const text = JSON.stringify(message);
+    const totalBytes = new TextEncoder().encode(text).length;
+    if (totalBytes <= MAX_FRAME_BYTES) {
+      port.postMessage(message);
+      return;
+    }
+
+    const transferId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    let position = 0;
+    let seq = 0;
+    while (position < text.length) {
+      let end = Math.min(position + CHUNK_CHARS, text.length);
+      // Never split a surrogate pair across chunks
+      const last = text.charCodeAt(end - 1);
+      if (end < text.length && last >= 0xd800 && last <= 0xdbff) {
+        end -= 1;
+      }
+
+      const data = text.slice(position, end);
+      if (seq === 0) {
+        port.postMessage({ chunk: 'start', transfer_id: transferId, seq, total_bytes: totalBytes, data });
+      } else {
+        port.postMessage({ chunk: end === text.length ? 'end' : 'continue', transfer_id: transferId, seq, data });
+      }
+      position = end;
+      seq += 1;
+    }
+  }
+
+  isOversized(message) {
+    return new TextEncoder().encode(JSON.stringify(message)).length > MAX_FRAME_BYTES;
+  }
+
+  disconnect() {
+    if (this.port) {
+      this.port.disconnect();
+      this.port = null;
+    }
+  }
+
+  sendPortMessage(message, timeout = 10000) {
+    return new Promise((resolve, reject) => {
+      const id = message.id ?? this.nextRequestId++;
+
+      const timeoutId = setTimeout(() => {
+        this.pendingRequests.delete(id);
+        reject(new Error(`Native messaging timeout after ${timeout}ms`));
+      }, timeout);
+
+      this.pendingRequests.set(id, { resolve, reject, timeoutId });
+
+      this.encodeMessage({ ...message, id })
+        .then(encoded => this.postFramed(this.connect(), encoded))
+        .catch(error => {
+          clearTimeout(timeoutId);
+          this.pendingRequests.delete(id);
+          console.error('Error posting to native host port:', error);
+          reject(error);
+        });
+    });
+  }
+
+  // Run a long request as a background job on the persistent port: the host
+  // answers with a job id right away and the result is polled for, so the
+  // port stays free for other requests while the document renders.
+  async runJob(message, { onProgress = null, pollInterval = 500, timeout = 300000 } = {}) {
+    if (!this.persistent) {
+      return this.sendMessage(message, timeout);
+    }
+
+    const id = this.nextRequestId++;
+    if (onProgress) {
+      this.progressListeners.set(id, onProgress);
+    }
+
+    try {
+      const queued = await this.sendPortMessage({
+        ...message,
+        id,
+        async: true,
+        progress: Boolean(onProgress)
+      });
+      if (!queued.success || !queued.job_id) {
+        return queued;
+      }
+
+      const deadline = Date.now() + timeout;
+      while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, pollInterval));
+        const status = await this.sendPortMessage({ action: 'job_result', job_id: queued.job_id });
+        if (!status.success || status.ready) {
+          return status.ready ? status.result : status;
+        }
+      }
+
+      await this.cancelJob(queued.job_id);
+      throw new Error(`Native host job timeout after ${timeout}ms`);
+    } finally {
+      this.progressListeners.delete(id);
+    }
+  }
+
+  async cancelJob(jobId) {
+    return this.sendMessage({ action: 'cancel_job', job_id: jobId });
+  }
+
   async testConnection() {
     try {
       const response = await this.sendMessage({ action: 'ping' });
       this.isConnected = response && response.success;
+      this.encodings = Array.isArray(response?.encodings) ? response.encodings : [];
       this.lastError = this.isConnected ? null : 'Ping failed';
       console.log('Native host connection test:', this.isConnected ? 'SUCCESS' : 'FAILED');
     } catch (error) {
@@ -26,7 +343,36 @@ class NativeHostManager {
     }
   }
 
-  sendMessage(message, timeout = 10000) {
+  async sendMessage(message, timeout = 10000) {
+    if (this.persistent) {
+      return this.sendPortMessage(message, timeout);
+    }
+
+    const repeatable = isRepeatable(message);
+    message = await this.encodeMessage(message);
+
+    // sendNativeMessage carries a single frame each way, so oversized
+    // messages go over a short-lived port instead
+    if (this.isOversized(message)) {
+      return this.sendShortLivedPortMessage(message, timeout);
+    }
+
+    const response = await this.sendOneShotMessage({ ...message, oneshot: true }, timeout);
+    if (isResponseTooLarge(response) && repeatable) {
+      return this.sendShortLivedPortMessage(message, timeout);
+    }
+    return response;
+  }
+
+  sendShortLivedPortMessage(message, timeout) {
+    return this.sendPortMessage(message, timeout).finally(() => {
+      if (this.pendingRequests.size === 0) {
+        this.disconnect();
+      }
+    });
+  }
+
+  sendOneShotMessage(message, timeout) {
     return new Promise((resolve, reject) => {
       const timeoutId = setTimeout(() => {
         reject(new Error(`Native messaging timeout after ${timeout}ms`));
@@ -53,7 +399,7 @@ class NativeHostManager {
               console.log('Native host response:', response);
               this.isConnected = true;
               this.lastError = null;
-              resolve(response);
+              this.decodeMessage(response).then(resolve, reject);
             }
           }
         );
@@ -96,7 +442,22 @@ class NativeHostManager {
     }
   }
 
-  async updateTemplate(templateName, extractedData) {
+  // Placeholder manifest of a template: which fields it needs, so page
+  // extraction can skip everything else
+  async describeTemplate(templateName) {
+    try {
+      const response = await this.sendMessageWithRetry({
+        action: 'describe_template',
+        data: { template: templateName }
+      });
+      return response;
+    } catch (error) {
+      console.error('Failed to describe template:', error);
+      throw error;
+    }
+  }
+
+  async updateTemplate(templateName, extractedData, options = {}) {
     try {
       const message = {
         action: 'update_template',
@@ -106,6 +467,10 @@ class NativeHostManager {
         }
       };
       
+      if (this.persistent) {
+        return await this.runJob(message, options);
+      }
+
       const response = await this.sendMessageWithRetry(message);
       return response;
     } catch (error) {
@@ -114,6 +479,44 @@ class NativeHostManager {
     }
   }
 
+  async updateTemplateBatch(templateName, records, settings = undefined, options = {}) {
+    try {
+      const message = {
+        action: 'update_template_batch',
+        data: {
+          template: templateName,
+          records: records,
+          settings: settings
+        }
+      };
+
+      if (this.persistent) {
+        return await this.runJob(message, options);
+      }
+
+      // A batch legitimately runs longer than a single render
+      const response = await this.sendMessage(message, 120000);
+      return response;
+    } catch (error) {
+      console.error('Failed to update template batch:', error);
+      throw error;
+    }
+  }
+
+  // Per-action latency histograms (p50/p95/p99, counts, errors, phases)
+  async getStats(options = {}) {
+    try {
+      const response = await this.sendMessageWithRetry({
+        action: 'stats',
+        data: { scope: options.scope || 'all', reset: !!options.reset }
+      });
+      return response;
+    } catch (error) {
+      console.error('Failed to get stats:', error);
+      throw error;
+    }
+  }
+
   async getConfig() {
     try {
       const response = await this.sendMessageWithRetry({ action: 'get_config' });
@@ -143,7 +546,9 @@ class NativeHostManager {
     return {
       connected: this.isConnected,
       lastError: this.lastError,
-      hostName: this.hostName
+      hostName: this.hostName,
+      persistent: this.persistent,
+      pendingRequests: this.pendingRequests.size
     };
   }
 
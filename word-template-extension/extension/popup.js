@@ -87,7 +87,11 @@ class WordTemplateExtension {
   async loadTemplates() {
     try {
       this.showStatus('Loading templates...', 'info');
-      const response = await this.sendNativeMessage({ action: 'list_templates' });
+      // The host pages its catalog; the dropdown only needs the first names
+      const response = await this.sendNativeMessage({
+        action: 'list_templates',
+        data: { sort: 'name', limit: 500 }
+      });
       
       console.log('Native host response:', response); // Debug logging
       
@@ -95,7 +99,8 @@ class WordTemplateExtension {
         this.templates = Array.isArray(response.templates) ? response.templates : [];
         console.log('Templates loaded:', this.templates); // Debug logging
         this.updateTemplateSelect();
-        this.showStatus(`Templates loaded successfully (${this.templates.length} found)`, 'success');
+        const total = response.total ?? this.templates.length;
+        this.showStatus(`Templates loaded successfully (${total} found)`, 'success');
       } else {
         this.templates = [];
         this.updateTemplateSelect();
@@ -538,26 +543,26 @@ class WordTemplateExtension {
   }
 
   async sendNativeMessage(message) {
-    return new Promise((resolve, reject) => {
-      try {
-        console.log('Sending native message:', message);
-        chrome.runtime.sendNativeMessage('com.wordtemplateextension.nativehost', message, response => {
-          console.log('Native host response:', response);
-          console.log('Chrome runtime last error:', chrome.runtime.lastError);
-          
-          if (chrome.runtime.lastError) {
-            reject(new Error(`Native host error: ${chrome.runtime.lastError.message}`));
-          } else if (!response) {
-            reject(new Error('Native host returned no response'));
-          } else {
-            resolve(response);
-          }
-        });
-      } catch (error) {
-        console.error('Native message error:', error);
-        reject(error);
-      }
-    });
+    // The manager marks one-shot requests so the host never answers with a
+    // chunked transfer, and repeats reads too large for one over a port
+    if (!this.nativeHostManager) {
+      this.nativeHostManager = new NativeHostManager();
+    }
+
+    console.log('Sending native message:', message);
+    let response;
+    try {
+      // Renders of large templates can take well over the default 10 s
+      response = await this.nativeHostManager.sendMessage(message, 120000);
+    } catch (error) {
+      throw new Error(`Native host error: ${error.message}`);
+    }
+    console.log('Native host response:', response);
+
+    if (!response) {
+      throw new Error('Native host returned no response');
+    }
+    return response;
   }
 
   toggleAdvancedOptions() {
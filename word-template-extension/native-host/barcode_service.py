@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Barcode rendering for the Word Template native host.
+Loads python-barcode once, on first use, and keeps recently rendered
+barcode images so the same value is never drawn twice.
+"""
+
+import io
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYMBOLOGY = 'code128'
+# Displayed size in inches (width, height)
+BARCODE_SIZE = (1.2, 0.4)
+BARCODE_PREFIX = '{{BARCODE_'
+
+
+class BarcodeValue(str):
+    """A replacement value that also carries the symbology its mapping asked for."""
+
+    def __new__(cls, value: str, symbology: Optional[str] = None):
+        instance = super().__new__(cls, value)
+        instance.symbology = symbology
+        return instance
+
+
+def split_barcode_placeholder(placeholder: str) -> Tuple[str, Optional[str]]:
+    """Split ``{{BARCODE_SKU:ean13}}`` into ``('{{BARCODE_SKU}}', 'ean13')``.
+
+    Placeholders without a symbology suffix come back unchanged with None.
+    """
+    name = placeholder[2:-2]
+    if ':' not in name:
+        return placeholder, None
+    name, symbology = name.split(':', 1)
+    return f'{{{{{name.strip()}}}}}', symbology.strip().lower() or None
+
+
+class BarcodeService:
+    """Render barcodes as PNG images, memoized by (symbology, value, size).
+
+    The rendered bytes are identical for identical barcodes, which also lets
+    python-docx store them as a single image part in the package (it looks
+    image parts up by content hash) however often they are inserted.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.images = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._library = None
+        self._load_failed = False
+
+    def load(self):
+        """Import python-barcode once; returns None when it is not installed."""
+        if self._library is None and not self._load_failed:
+            try:
+                import barcode
+                from barcode.writer import ImageWriter
+                self._library = (barcode, ImageWriter)
+            except ImportError:
+                self._load_failed = True
+                logger.warning("python-barcode not installed. Install with: pip install python-barcode[images]")
+        return self._library
+
+    def render(self, value: str, symbology: str = DEFAULT_SYMBOLOGY,
+               size: Tuple[float, float] = BARCODE_SIZE) -> bytes:
+        """Return the PNG for a barcode, rendering it only on a cache miss.
+
+        Raises ImportError without python-barcode, and the library's own
+        errors for unknown symbologies or values they cannot encode.
+        """
+        key = (symbology.lower(), str(value), tuple(size))
+        with self.lock:
+            image = self.images.get(key)
+            if image is not None:
+                self.images.move_to_end(key)
+                self.hits += 1
+                return image
+
+        library = self.load()
+        if library is None:
+            raise ImportError("python-barcode is not installed")
+        barcode, image_writer = library
+
+        buffer = io.BytesIO()
+        barcode.get_barcode_class(key[0])(key[1], writer=image_writer()).write(buffer)
+        image = buffer.getvalue()
+
+        with self.lock:
+            self.misses += 1
+            self.images[key] = image
+            while len(self.images) > self.max_entries:
+                self.images.popitem(last=False)
+        return image
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.images), 'hits': self.hits, 'misses': self.misses}
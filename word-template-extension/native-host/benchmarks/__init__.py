@@ -0,0 +1,9 @@
+"""
+Rendering benchmarks for the Word Template native hosts.
+
+``templates`` builds synthetic .docx templates from a seed, and ``harness``
+renders them through both hosts and writes throughput, peak memory and
+output size to JSON. Run from the native-host directory:
+
+    python -m benchmarks.harness --profile medium --output results.json
+"""
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Rendering benchmark harness.
+Renders synthetic templates through ``WordTemplateUpdater.replace_placeholders``
+and the enhanced host's ``process_template`` and records render time,
+throughput, peak memory and output size as JSON. Both hosts run with a
+throwaway home directory, so the real config, logs and output folders are
+never touched.
+
+    python -m benchmarks.harness --profile small --profile medium \\
+        --iterations 10 --output results.json --baseline previous.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+HOST_DIR = Path(__file__).resolve().parent.parent
+RESULTS_VERSION = 1
+
+
+def _isolate_home(home: Path):
+    """Point the hosts' config, log and output directories at ``home``.
+
+    A config is written up front so the hosts start with auto-open off and
+    only log errors, keeping logging out of the measurements.
+    """
+    os.environ['HOME'] = str(home)
+    os.environ['USERPROFILE'] = str(home)
+    config_dir = home / 'AppData' / 'Local' / 'WordTemplateExtension'
+    config_dir.mkdir(parents=True, exist_ok=True)
+    with open(config_dir / 'config.json', 'w', encoding='utf-8') as f:
+        json.dump({'auto_open': False, 'log_level': 'ERROR', 'persist_metrics': False,
+                   'output_path': str(home / 'output')}, f)
+    if str(HOST_DIR) not in sys.path:
+        sys.path.insert(0, str(HOST_DIR))
+
+
+def _max_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HOST_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def measure(render: Callable[[], int], iterations: int, warmup: int) -> Dict[str, Any]:
+    """Time ``render`` (which returns the output size) and trace its peak memory.
+
+    Timing runs are separate from the traced run, since tracemalloc slows
+    allocation-heavy code down considerably.
+    """
+    for _ in range(warmup):
+        render()
+
+    times = []
+    output_bytes = 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        output_bytes = render()
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        render()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(times)
+    return {
+        'iterations': iterations,
+        'seconds': {
+            'min': min(times),
+            'median': median,
+            'mean': statistics.mean(times),
+            'max': max(times),
+            'stdev': statistics.stdev(times) if len(times) > 1 else 0.0
+        },
+        'renders_per_second': 1 / median if median else None,
+        'peak_traced_bytes': peak,
+        'output_bytes': output_bytes
+    }
+
+
+def benchmark_profile(profile: str, seed: int, iterations: int, warmup: int,
+                      work_dir: Path) -> List[Dict[str, Any]]:
+    from docx import Document
+
+    from benchmarks.templates import generate_template, sample_data
+    from word_updater import WordTemplateUpdater
+    from word_updater_enhanced import WordTemplateUpdaterEnhanced
+
+    # Until a host loads the config, logging runs at its INFO default
+    logging.getLogger().setLevel(logging.ERROR)
+
+    template_path = work_dir / f'{profile}_{seed}.docx'
+    params = generate_template(template_path, profile, seed)
+    data = sample_data(params, seed)
+
+    updater = WordTemplateUpdater()
+    enhanced = WordTemplateUpdaterEnhanced()
+
+    def replace_only():
+        document = Document(str(template_path))
+        updater.replace_placeholders(document, data)
+        buffer = BytesIO()
+        document.save(buffer)
+        return buffer.tell()
+
+    def updater_render():
+        output_path = Path(updater.config['output_path']) / f'updater_{profile}.docx'
+        updater.render_document(template_path, output_path, data, 'docx')
+        return output_path.stat().st_size
+
+    def enhanced_render():
+        output_path, _ = enhanced.process_template(template_path, data)
+        size = output_path.stat().st_size
+        output_path.unlink()
+        return size
+
+    results = []
+    for host, target, render in (
+            ('word_updater', 'replace_placeholders', replace_only),
+            ('word_updater', 'render_document', updater_render),
+            ('word_updater_enhanced', 'process_template', enhanced_render)):
+        result = measure(render, iterations, warmup)
+        seconds = result['seconds']['median']
+        results.append({
+            'host': host,
+            'target': target,
+            'profile': profile,
+            'template': params,
+            'template_bytes': template_path.stat().st_size,
+            'placeholders_per_second': params['placeholders'] / seconds if seconds else None,
+            **result
+        })
+        print(f"{profile:<8} {host + '.' + target:<40} median {seconds * 1000:9.1f} ms  "
+              f"peak {result['peak_traced_bytes'] / 1048576:7.1f} MB  "
+              f"output {result['output_bytes'] / 1024:8.1f} KB", file=sys.stderr)
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: Path):
+    """Print the median time and peak memory of each result against a baseline file."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(entry['host'], entry['target'], entry['profile']): entry
+                    for entry in json.load(f).get('results', [])}
+
+    print(f"Compared with {baseline_path}:", file=sys.stderr)
+    for entry in results:
+        previous = baseline.get((entry['host'], entry['target'], entry['profile']))
+        if previous is None:
+            continue
+        time_ratio = entry['seconds']['median'] / previous['seconds']['median']
+        memory_ratio = entry['peak_traced_bytes'] / max(1, previous['peak_traced_bytes'])
+        print(f"  {entry['profile']:<8} {entry['host'] + '.' + entry['target']:<40} "
+              f"time x{time_ratio:5.2f}  memory x{memory_ratio:5.2f}", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from benchmarks.templates import PROFILES
+
+    parser = argparse.ArgumentParser(description='Benchmark template rendering in both native hosts')
+    parser.add_argument('--profile', action='append', choices=sorted(PROFILES),
+                        help='template profile to run (repeatable; default: small and medium)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--output', type=Path, help='write results JSON here (default: stdout)')
+    parser.add_argument('--baseline', type=Path, help='earlier results JSON to compare against')
+    arguments = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='word-template-bench-') as temp:
+        work_dir = Path(temp)
+        _isolate_home(work_dir / 'home')
+        results = []
+        for profile in arguments.profile or ['small', 'medium']:
+            results.extend(benchmark_profile(profile, arguments.seed, max(1, arguments.iterations),
+                                             max(0, arguments.warmup), work_dir))
+
+    import docx
+
+    report = {
+        'version': RESULTS_VERSION,
+        'created': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'python_docx': getattr(docx, '__version__', None),
+            'commit': _git_commit(),
+            'max_rss_kb': _max_rss_kb()
+        },
+        'results': results
+    }
+
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if arguments.baseline:
+        compare(results, arguments.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
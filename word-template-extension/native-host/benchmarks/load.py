@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+End-to-end load tester for the native messaging hosts.
+Speaks the 4-byte little-endian framing to a host either the way
+``chrome.runtime.sendNativeMessage`` does (a new process per message) or
+over persistent streams like a ``connectNative`` port, and replays a
+message mix at a target rate or concurrency. Reports latency
+distributions, throughput, failure rates and the cost of spawning a host.
+
+    python -m benchmarks.load --host word_updater.py --mode both --count 200 \\
+        --mix ping:5,list_templates:3,update_template:2 --payload-sizes 1k,64k,512k
+
+Unless ``--real-home`` is given the host runs against a temporary home
+directory with a generated template, so nothing outside it is touched.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+HOST_DIR = Path(__file__).resolve().parent.parent
+if str(HOST_DIR) not in sys.path:
+    sys.path.insert(0, str(HOST_DIR))
+
+from chunked_framing import ChunkAssembler, is_chunk, split_message  # noqa: E402
+from frame_codec import FrameReader, dumps, pack_frames  # noqa: E402
+
+LOAD_TEMPLATE = 'load_test.docx'
+SIZE_SUFFIXES = {'k': 1024, 'm': 1024 * 1024}
+
+
+class ProtocolError(Exception):
+    """The host closed the stream or sent something that is not a frame."""
+    pass
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    """Frame a message, as a chunked transfer if it exceeds the 1 MB limit."""
+    return pack_frames(split_message(dumps(message)))
+
+
+def read_response(reader: FrameReader, assembler: ChunkAssembler) -> Dict[str, Any]:
+    """Read frames until a complete response; progress pushes are skipped."""
+    while True:
+        message = reader.read_message()
+        if message is None:
+            raise ProtocolError("Stream closed")
+        if is_chunk(message):
+            message = assembler.feed(message)
+            if message is None:
+                continue
+        if isinstance(message, dict) and message.get('type') == 'progress':
+            continue
+        return message
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    if text and text[-1] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def generate_mix(count: int, weights: Dict[str, int], payload_sizes: List[int],
+                 template: str, seed: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """Build ``count`` (label, message) pairs drawn from ``weights``.
+
+    ``update_template`` messages cycle through ``payload_sizes``; each
+    size gets its own label so latencies can be told apart.
+    """
+    rng = random.Random(seed)
+    actions = list(weights)
+    sizes = itertools.cycle(payload_sizes or [1024])
+    mix = []
+    for _ in range(count):
+        action = rng.choices(actions, weights=[weights[name] for name in actions])[0]
+        if action == 'update_template':
+            size = next(sizes)
+            message = {'action': 'update_template', 'data': {
+                'template': template,
+                'extractedData': {'TITLE': 'Load test', 'DATE': '2024-01-01',
+                                  'DESCRIPTION': 'x' * size}
+            }}
+            mix.append((f'update_template[{format_size(size)}]', message))
+        else:
+            mix.append((action, {'action': action}))
+    return mix
+
+
+def load_replay(path: Path) -> List[Tuple[str, Dict[str, Any]]]:
+    """Read a recorded mix: one JSON message per line."""
+    mix = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                message = json.loads(line)
+                mix.append((message.get('action', 'unknown'), message))
+    return mix
+
+
+def format_size(size: int) -> str:
+    for suffix, factor in (('m', 1024 * 1024), ('k', 1024)):
+        if size >= factor and size % factor == 0:
+            return f'{size // factor}{suffix}'
+    return str(size)
+
+
+def host_command(host: str) -> List[str]:
+    path = Path(host)
+    if not path.is_absolute() and not path.exists():
+        path = HOST_DIR / host
+    return [sys.executable, str(path)] if path.suffix == '.py' else [str(path)]
+
+
+class Result:
+    __slots__ = ('label', 'latency', 'ok', 'error', 'lag')
+
+    def __init__(self, label: str, latency: float, ok: bool, error: Optional[str] = None,
+                 lag: float = 0.0):
+        self.label = label
+        self.latency = latency
+        self.ok = ok
+        self.error = error
+        self.lag = lag
+
+
+def spawn_request(command: List[str], env: Dict[str, str], message: Dict[str, Any],
+                  timeout: float) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Start a host for one message, like ``sendNativeMessage``."""
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, env=env)
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    try:
+        process.stdin.write(encode(message))
+        process.stdin.close()
+        return read_response(FrameReader(process.stdout), ChunkAssembler()), None
+    except (ProtocolError, OSError, ValueError) as e:
+        return None, f'{type(e).__name__}: {e}'
+    finally:
+        timer.cancel()
+        process.stdout.close()
+        process.wait()
+
+
+class Connection:
+    """A persistent host process with pipelined, id-matched requests."""
+
+    def __init__(self, command: List[str], env: Dict[str, str]):
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, env=env)
+        self.pending = {}
+        self.lock = threading.Lock()
+        # Separate from ``lock`` so a long write never stalls the reader
+        self.write_lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.closed = None
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    def _read_loop(self):
+        reader = FrameReader(self.process.stdout)
+        assembler = ChunkAssembler()
+        try:
+            while True:
+                response = read_response(reader, assembler)
+                with self.lock:
+                    future = self.pending.pop(response.get('id'), None)
+                if future is not None:
+                    future.set_result(response)
+        except Exception as e:
+            with self.lock:
+                self.closed = f'{type(e).__name__}: {e}'
+                pending, self.pending = self.pending, {}
+            for future in pending.values():
+                future.set_exception(ProtocolError(self.closed))
+
+    def request(self, message: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise ProtocolError(self.closed)
+            request_id = next(self.ids)
+            self.pending[request_id] = future
+        frame = encode({**message, 'id': request_id})
+        with self.write_lock:
+            self.process.stdin.write(frame)
+            self.process.stdin.flush()
+        try:
+            return future.result(timeout)
+        finally:
+            with self.lock:
+                self.pending.pop(request_id, None)
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+
+
+def run_load(mode: str, command: List[str], env: Dict[str, str],
+             mix: List[Tuple[str, Dict[str, Any]]], concurrency: int,
+             rate: Optional[float], connections: int, timeout: float) -> Dict[str, Any]:
+    """Send every message of ``mix`` and collect per-message results.
+
+    Without ``rate`` the run is closed-loop: ``concurrency`` requests are
+    kept in flight. With ``rate`` messages are released on a fixed
+    schedule (open loop) and ``lag`` records how late each one started.
+    """
+    pool_size = max(1, concurrency)
+    links = [Connection(command, env) for _ in range(connections)] if mode == 'persistent' else []
+    if links:
+        # Make sure every host is up before the clock starts
+        for link in links:
+            link.request({'action': 'ping'}, timeout)
+    next_link = itertools.cycle(links)
+    link_lock = threading.Lock()
+    results = []
+    results_lock = threading.Lock()
+
+    def send(label: str, message: Dict[str, Any], scheduled: float):
+        started = time.perf_counter()
+        try:
+            if mode == 'spawn':
+                response, error = spawn_request(command, env, message, timeout)
+            else:
+                with link_lock:
+                    link = next(next_link)
+                response, error = link.request(message, timeout), None
+        except Exception as e:
+            response, error = None, f'{type(e).__name__}: {e}'
+        latency = time.perf_counter() - started
+        if error is None and not (isinstance(response, dict) and response.get('success')):
+            error = str((response or {}).get('error', 'unsuccessful response'))[:200]
+        with results_lock:
+            results.append(Result(label, latency, error is None, error,
+                                  max(0.0, started - scheduled) if rate else 0.0))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=pool_size) as pool:
+        for index, (label, message) in enumerate(mix):
+            scheduled = started + index / rate if rate else time.perf_counter()
+            if rate:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(send, label, message, scheduled)
+    elapsed = time.perf_counter() - started
+
+    for link in links:
+        link.close()
+    return {'elapsed': elapsed, 'results': results}
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    rank = max(1, int(len(sorted_values) * p / 100 + 0.999999))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def distribution(seconds: List[float]) -> Dict[str, Any]:
+    values = sorted(value * 1000 for value in seconds)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values), 3),
+        'min_ms': round(values[0], 3),
+        **{f'p{p}_ms': round(percentile(values, p), 3) for p in (50, 90, 95, 99)},
+        'max_ms': round(values[-1], 3)
+    }
+
+
+def summarize(run: Dict[str, Any]) -> Dict[str, Any]:
+    results = run['results']
+    by_label = {}
+    for result in results:
+        by_label.setdefault(result.label, []).append(result)
+
+    def block(items: List[Result]) -> Dict[str, Any]:
+        failures = [item for item in items if not item.ok]
+        errors = {}
+        for item in failures:
+            errors[item.error] = errors.get(item.error, 0) + 1
+        return {
+            'requests': len(items),
+            'failures': len(failures),
+            'failure_rate': round(len(failures) / len(items), 4) if items else 0.0,
+            'latency': distribution([item.latency for item in items]),
+            'errors': dict(sorted(errors.items(), key=lambda pair: -pair[1])[:5])
+        }
+
+    summary = {
+        'elapsed_seconds': round(run['elapsed'], 3),
+        'throughput_per_second': round(len(results) / run['elapsed'], 3) if run['elapsed'] else None,
+        'overall': block(results),
+        'actions': {label: block(items) for label, items in sorted(by_label.items())}
+    }
+    lags = [result.lag for result in results if result.lag]
+    if lags:
+        summary['schedule_lag'] = distribution(lags)
+    return summary
+
+
+def interpreter_baseline(runs: int = 5) -> Dict[str, Any]:
+    """Time starting a bare interpreter, the floor under any spawned host."""
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=False)
+        times.append(time.perf_counter() - started)
+    return distribution(times)
+
+
+def prepare_home(home: Path) -> Dict[str, str]:
+    """Create an isolated home with a config and a generated template."""
+    from benchmarks.templates import generate_template
+
+    config_dir = home / 'AppData' / 'Local' / 'WordTemplateExtension'
+    templates = home / 'Documents' / 'Templates'
+    config_dir.mkdir(parents=True, exist_ok=True)
+    templates.mkdir(parents=True, exist_ok=True)
+    with open(config_dir / 'config.json', 'w', encoding='utf-8') as f:
+        json.dump({'auto_open': False, 'log_level': 'ERROR', 'persist_metrics': False,
+                   'template_path': str(templates), 'output_path': str(home / 'output')}, f)
+    generate_template(templates / LOAD_TEMPLATE, 'small')
+    return dict(os.environ, HOME=str(home), USERPROFILE=str(home))
+
+
+def print_summary(mode: str, summary: Dict[str, Any]):
+    print(f"{mode}: {summary['overall']['requests']} requests in {summary['elapsed_seconds']:.2f} s "
+          f"({summary['throughput_per_second']:.1f}/s), "
+          f"{summary['overall']['failure_rate'] * 100:.1f}% failed", file=sys.stderr)
+    for label, block in summary['actions'].items():
+        latency = block['latency']
+        print(f"  {label:<28} n={block['requests']:<5} p50 {latency['p50_ms']:9.1f} ms  "
+              f"p95 {latency['p95_ms']:9.1f} ms  p99 {latency['p99_ms']:9.1f} ms  "
+              f"failed {block['failures']}", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Load test a native messaging host')
+    parser.add_argument('--host', default='word_updater.py',
+                        help='host script or executable (default: word_updater.py)')
+    parser.add_argument('--mode', choices=('spawn', 'persistent', 'both'), default='both',
+                        help='spawn: one process per message; persistent: long-lived streams')
+    parser.add_argument('--count', type=int, default=100, help='messages per mode')
+    parser.add_argument('--mix', default='ping:5,list_templates:3,update_template:2',
+                        help='action:weight pairs for a generated mix')
+    parser.add_argument('--payload-sizes', default='1k,64k,512k',
+                        help='extracted data sizes cycled through by update_template')
+    parser.add_argument('--replay', type=Path, help='JSON lines file of recorded messages (replaces --mix)')
+    parser.add_argument('--template', help=f'template for update_template (default: generated {LOAD_TEMPLATE})')
+    parser.add_argument('--concurrency', type=int, default=1, help='requests in flight at once')
+    parser.add_argument('--rate', type=float, help='messages per second (open loop) instead of closed loop')
+    parser.add_argument('--connections', type=int, default=1, help='persistent host processes')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--real-home', action='store_true',
+                        help="use the current user's config and templates instead of a temporary home")
+    parser.add_argument('--output', type=Path, help='write the JSON report here (default: stdout)')
+    arguments = parser.parse_args(argv)
+
+    command = host_command(arguments.host)
+    with tempfile.TemporaryDirectory(prefix='word-template-load-') as temp:
+        env = dict(os.environ) if arguments.real_home else prepare_home(Path(temp) / 'home')
+        template = arguments.template or LOAD_TEMPLATE
+
+        if arguments.replay:
+            recorded = load_replay(arguments.replay)
+            mix = [recorded[index % len(recorded)] for index in range(arguments.count)]
+        else:
+            weights = {}
+            for pair in arguments.mix.split(','):
+                name, _, weight = pair.partition(':')
+                weights[name.strip()] = int(weight or 1)
+            sizes = [parse_size(size) for size in arguments.payload_sizes.split(',') if size.strip()]
+            mix = generate_mix(arguments.count, weights, sizes, template, arguments.seed)
+
+        modes = ['spawn', 'persistent'] if arguments.mode == 'both' else [arguments.mode]
+        report = {
+            'host': command,
+            'count': arguments.count,
+            'concurrency': arguments.concurrency,
+            'rate': arguments.rate,
+            'connections': arguments.connections,
+            'modes': {}
+        }
+        for mode in modes:
+            run = run_load(mode, command, env, mix, arguments.concurrency, arguments.rate,
+                           max(1, arguments.connections), arguments.timeout)
+            report['modes'][mode] = summarize(run)
+            print_summary(mode, report['modes'][mode])
+
+    if 'spawn' in report['modes']:
+        report['interpreter_start'] = interpreter_baseline()
+        print(f"interpreter start p50 {report['interpreter_start']['p50_ms']:.1f} ms", file=sys.stderr)
+    if len(report['modes']) == 2:
+        # What starting a host costs each action: spawn minus persistent medians
+        spawn, persistent = report['modes']['spawn']['actions'], report['modes']['persistent']['actions']
+        report['spawn_overhead_ms'] = {
+            label: round(spawn[label]['latency']['p50_ms'] - persistent[label]['latency']['p50_ms'], 3)
+            for label in spawn if label in persistent and spawn[label]['latency']['count']
+        }
+        for label, overhead in report['spawn_overhead_ms'].items():
+            print(f"  spawn overhead {label:<28} {overhead:9.1f} ms", file=sys.stderr)
+
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 1 if any(mode['overall']['failures'] for mode in report['modes'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
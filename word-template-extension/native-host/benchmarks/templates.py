@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Synthetic template generator for the rendering benchmarks.
+Builds .docx templates covering what makes rendering expensive: many
+paragraphs, placeholders split across runs, tables with merged cells,
+several sections with their own (first, even and default) headers and
+footers, barcode placeholders and embedded images. Output is fully
+determined by the profile and seed, so runs can be compared.
+"""
+
+import random
+import struct
+import zlib
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict
+
+PROFILES = {
+    'small': {'paragraphs': 50, 'tables': 1, 'table_rows': 8, 'table_cols': 4,
+              'sections': 1, 'barcodes': 1, 'images': 1, 'fields': 20},
+    'medium': {'paragraphs': 500, 'tables': 4, 'table_rows': 25, 'table_cols': 6,
+               'sections': 3, 'barcodes': 4, 'images': 4, 'fields': 100},
+    'large': {'paragraphs': 3000, 'tables': 10, 'table_rows': 60, 'table_cols': 8,
+              'sections': 6, 'barcodes': 10, 'images': 10, 'fields': 400},
+}
+
+WORDS = ('invoice', 'order', 'customer', 'shipment', 'total', 'account', 'balance',
+         'reference', 'delivery', 'product', 'quantity', 'price', 'service', 'period')
+
+
+def png_bytes(width: int, height: int, seed: int) -> bytes:
+    """A solid-colour RGB PNG, built by hand so no imaging library is needed."""
+    rng = random.Random(seed)
+    pixel = bytes(rng.randrange(256) for _ in range(3))
+    raw = b''.join(b'\x00' + pixel * width for _ in range(height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(raw, 9)) + chunk(b'IEND', b''))
+
+
+def field_name(index: int) -> str:
+    return f'FIELD_{index:04d}'
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _add_split_placeholder(paragraph, name: str, rng: random.Random):
+    """Add ``{{name}}`` cut into three runs with different formatting."""
+    placeholder = f'{{{{{name}}}}}'
+    first, second = sorted(rng.sample(range(1, len(placeholder)), 2))
+    paragraph.add_run(placeholder[:first])
+    paragraph.add_run(placeholder[first:second]).bold = True
+    paragraph.add_run(placeholder[second:]).italic = True
+
+
+def generate_template(path: Path, profile: str = 'medium', seed: int = 0,
+                      **overrides) -> Dict[str, Any]:
+    """Write a synthetic template to ``path`` and return its parameters.
+
+    ``overrides`` replace individual profile settings (e.g. ``paragraphs``).
+    The returned dict includes the placeholder count, for throughput
+    figures.
+    """
+    from docx import Document
+    from docx.shared import Inches
+
+    params = {**PROFILES[profile], **overrides}
+    rng = random.Random(seed)
+    fields = params['fields']
+    document = Document()
+    document.settings.odd_and_even_pages_header_footer = True
+    placeholders = 0
+
+    images = [png_bytes(64, 32, seed + index) for index in range(params['images'])]
+    paragraphs_per_section = max(1, params['paragraphs'] // params['sections'])
+    tables_left = params['tables']
+
+    for section_index in range(params['sections']):
+        section = document.sections[0] if section_index == 0 else document.add_section()
+        section.different_first_page_header_footer = True
+        for label, part in (('First', section.first_page_header), ('Even', section.even_page_header),
+                            ('Header', section.header), ('First footer', section.first_page_footer),
+                            ('Even footer', section.even_page_footer), ('Footer', section.footer)):
+            part.is_linked_to_previous = False
+            part.paragraphs[0].text = f'{label} {section_index}: {{{{TITLE}}}} / {{{{DATE}}}}'
+            placeholders += 2
+
+        for index in range(paragraphs_per_section):
+            paragraph = document.add_paragraph(_sentence(rng, rng.randint(4, 12)) + ' ')
+            kind = index % 4
+            if kind == 0:
+                paragraph.add_run(f'{{{{{field_name(rng.randrange(fields))}}}}}')
+            elif kind == 1:
+                _add_split_placeholder(paragraph, field_name(rng.randrange(fields)), rng)
+            elif kind == 2:
+                paragraph.add_run(f'{{{{{field_name(rng.randrange(fields))}}}}} and '
+                                  f'{{{{{field_name(rng.randrange(fields))}}}}}')
+                placeholders += 1
+            else:
+                paragraph.add_run(_sentence(rng, 6))
+                continue
+            placeholders += 1
+            paragraph.add_run(' ' + _sentence(rng, rng.randint(2, 6)))
+
+        # Spread tables, barcodes and images over the sections
+        for _ in range(-(-tables_left // (params['sections'] - section_index))):
+            rows, cols = params['table_rows'], params['table_cols']
+            table = document.add_table(rows=rows, cols=cols)
+            for row_index, row in enumerate(table.rows):
+                for col_index, cell in enumerate(row.cells):
+                    cell.text = f'{{{{{field_name((row_index * cols + col_index) % fields)}}}}}'
+                    placeholders += 1
+            # A horizontal and a vertical merge
+            table.cell(0, 0).merge(table.cell(0, min(2, cols - 1)))
+            table.cell(1, cols - 1).merge(table.cell(min(4, rows - 1), cols - 1))
+            tables_left -= 1
+
+    for index in range(params['barcodes']):
+        document.add_paragraph(f'Item code: {{{{BARCODE_SKU_{index}}}}}')
+        placeholders += 1
+
+    for image in images:
+        document.add_paragraph().add_run().add_picture(BytesIO(image), width=Inches(1.0))
+
+    document.save(str(path))
+    return {**params, 'profile': profile, 'seed': seed, 'placeholders': placeholders}
+
+
+def sample_data(params: Dict[str, Any], seed: int = 0) -> Dict[str, Any]:
+    """Extracted data filling every placeholder of a generated template.
+
+    Keys are upper case so both hosts map them to the same placeholders.
+    """
+    rng = random.Random(seed + 1)
+    data = {
+        'TITLE': 'Benchmark document',
+        'DATE': '2024-01-01',
+    }
+    for index in range(params['fields']):
+        data[field_name(index)] = _sentence(rng, rng.randint(1, 4))
+    for index in range(params['barcodes']):
+        data[f'BARCODE_SKU_{index}'] = f'{rng.randrange(10 ** 11):012d}'
+    return data
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Write a synthetic benchmark template')
+    parser.add_argument('output', type=Path)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='medium')
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    print(generate_template(arguments.output, arguments.profile, arguments.seed))
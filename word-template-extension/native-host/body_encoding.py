@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Compressed message bodies for the native messaging protocol.
+Page extractions (full text, tables, lists, forms, meta tags, JSON-LD)
+compress well, so an extension that has seen ``deflate+base64`` among the
+``encodings`` in the host's ping response may send a request's ``data`` as
+
+    {"encoding": "deflate+base64", "payload": "eJzLSM3JyVcozy/KSQEAGgQEXQ=="}
+
+where ``payload`` is the base64 of the zlib-deflated UTF-8 JSON. A request
+that also carries ``"accept_encoding": "deflate+base64"`` may get a large
+response back the same way, as ``{"id": ..., "encoding": ..., "payload": ...}``
+wrapping the whole response. Peers that never negotiate see plain JSON.
+"""
+
+import binascii
+import zlib
+from typing import Any, Dict, Optional
+
+from frame_codec import dumps, loads
+
+DEFLATE_BASE64 = 'deflate+base64'
+ENCODINGS = (DEFLATE_BASE64,)
+
+# Responses smaller than this are sent as they are
+COMPRESS_MIN_BYTES = 64 * 1024
+COMPRESS_LEVEL = 6
+
+# Base64 text decoded per step (a multiple of 4) while inflating
+DECODE_STEP_CHARS = 256 * 1024
+
+
+class EncodingError(ValueError):
+    """A compressed body is malformed, uses an unknown encoding or is too large."""
+    pass
+
+
+def is_encoded(body: Any) -> bool:
+    return isinstance(body, dict) and 'encoding' in body and 'payload' in body
+
+
+def accepts_encoding(message: Dict[str, Any]) -> bool:
+    """Whether the sender of ``message`` takes compressed responses."""
+    accepted = message.get('accept_encoding')
+    if isinstance(accepted, str):
+        accepted = [accepted]
+    return isinstance(accepted, list) and DEFLATE_BASE64 in accepted
+
+
+def decode_body(body: Dict[str, Any], max_bytes: int) -> Any:
+    """Inflate and parse a compressed body, refusing to produce more than ``max_bytes``.
+
+    The payload is base64-decoded and inflated a slice at a time, and
+    inflation never asks for more output than the remaining budget, so a
+    small payload that expands enormously is rejected without being held
+    in memory.
+    """
+    if body.get('encoding') != DEFLATE_BASE64:
+        raise EncodingError(f"Unsupported encoding: {body.get('encoding')}")
+    payload = body.get('payload')
+    if not isinstance(payload, str):
+        raise EncodingError("Compressed body without a payload")
+
+    inflater = zlib.decompressobj()
+    output = bytearray()
+    try:
+        for start in range(0, len(payload), DECODE_STEP_CHARS):
+            data = binascii.a2b_base64(payload[start:start + DECODE_STEP_CHARS])
+            while data:
+                output += inflater.decompress(data, max_bytes - len(output) + 1)
+                if len(output) > max_bytes:
+                    raise EncodingError(f"Compressed body expands beyond {max_bytes} bytes")
+                data = inflater.unconsumed_tail
+        output += inflater.flush()
+    except (binascii.Error, zlib.error) as e:
+        raise EncodingError(f"Invalid compressed body: {e}")
+    if len(output) > max_bytes:
+        raise EncodingError(f"Compressed body expands beyond {max_bytes} bytes")
+    if not inflater.eof:
+        raise EncodingError("Compressed body is truncated")
+    return loads(output)
+
+
+def decode_message(message: Dict[str, Any], max_bytes: int) -> Dict[str, Any]:
+    """Replace a compressed ``data`` with its decoded value, in place."""
+    if is_encoded(message.get('data')):
+        message['data'] = decode_body(message['data'], max_bytes)
+    return message
+
+
+def encode_body(encoded: bytes, level: int = COMPRESS_LEVEL) -> Optional[Dict[str, str]]:
+    """Compress encoded JSON into a body; None when that would not make it smaller."""
+    payload = binascii.b2a_base64(zlib.compress(encoded, level), newline=False)
+    if len(payload) + 64 >= len(encoded):
+        return None
+    return {'encoding': DEFLATE_BASE64, 'payload': payload.decode('ascii')}
+
+
+def compress_response(response: Dict[str, Any], encoded: bytes) -> bytes:
+    """Return the bytes to send for an encoded response the peer accepts compressed."""
+    if len(encoded) < COMPRESS_MIN_BYTES:
+        return encoded
+    body = encode_body(encoded)
+    if body is None:
+        return encoded
+    if response.get('id') is not None:
+        body = {'id': response['id'], **body}
+    return dumps(body)
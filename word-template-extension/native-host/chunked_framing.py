@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Chunked transfers for the native messaging protocol.
+Chrome limits host-to-extension messages to 1 MB, so larger messages are
+sent as a series of ordinary frames, each holding a slice of the message's
+JSON text in a start / continue / end envelope:
+
+    {"chunk": "start", "transfer_id": "...", "seq": 0, "total_bytes": 5242880, "data": "{\"success\": ..."}
+    {"chunk": "continue", "transfer_id": "...", "seq": 1, "data": "..."}
+    {"chunk": "end", "transfer_id": "...", "seq": 2, "data": "...}"}
+
+Messages that fit in one frame are sent as before, so peers that know
+nothing about chunking keep working. A one-shot ``sendNativeMessage``
+caller reads a single frame and cannot reassemble a transfer, so a request
+may say ``"oneshot": true``; a response to it that would need chunking is
+replaced by a ``response_too_large`` error.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from frame_codec import dumps, loads
+
+MAX_FRAME_BYTES = 1024 * 1024
+CHUNK_KINDS = ('start', 'continue', 'end')
+RESPONSE_TOO_LARGE = 'response_too_large'
+
+
+class ChunkError(ValueError):
+    """A chunked transfer broke the protocol (bad order, size or id)."""
+    pass
+
+
+def is_chunk(message: Any) -> bool:
+    return isinstance(message, dict) and message.get('chunk') in CHUNK_KINDS
+
+
+def wants_single_frame(message: Dict[str, Any]) -> bool:
+    """Whether the sender of ``message`` reads only one response frame."""
+    return message.get('oneshot') is True
+
+
+def too_large_message(size: int, max_frame: int = MAX_FRAME_BYTES) -> str:
+    return (f"Response of {size} bytes does not fit in one {max_frame}-byte frame; "
+            f"send the request over a connectNative port")
+
+
+def split_message(encoded: bytes, max_frame: int = MAX_FRAME_BYTES) -> List[bytes]:
+    """Return the frame bodies to send for an encoded JSON message.
+
+    A message within ``max_frame`` is returned as its only frame. Larger
+    ones are cut into chunk envelopes that each encode to at most
+    ``max_frame`` bytes; slices are cut on characters, never inside a
+    UTF-8 sequence.
+    """
+    if len(encoded) <= max_frame:
+        return [encoded]
+
+    import uuid
+
+    text = encoded.decode('utf-8')
+    transfer_id = uuid.uuid4().hex
+    frames = []
+    position = 0
+    seq = 0
+    # Escaping can at most double ASCII text; wider characters fall back below
+    step = max(1, (max_frame - 256) // 2)
+
+    while position < len(text):
+        size = step
+        while True:
+            piece = text[position:position + size]
+            if seq == 0:
+                envelope = {'chunk': 'start', 'transfer_id': transfer_id, 'seq': 0,
+                            'total_bytes': len(encoded), 'data': piece}
+            else:
+                kind = 'end' if position + len(piece) >= len(text) else 'continue'
+                envelope = {'chunk': kind, 'transfer_id': transfer_id, 'seq': seq, 'data': piece}
+            frame = dumps(envelope)
+            if len(frame) <= max_frame or size == 1:
+                break
+            size //= 2
+
+        frames.append(frame)
+        position += len(piece)
+        seq += 1
+
+    return frames
+
+
+class _Transfer:
+    def __init__(self, total_bytes: int):
+        self.buffer = bytearray(total_bytes)
+        self.offset = 0
+        self.next_seq = 1
+
+
+class ChunkAssembler:
+    """Reassemble chunked transfers received frame by frame.
+
+    Each transfer is written into a buffer allocated up front from the
+    ``total_bytes`` its start frame announces, so reassembly is linear in
+    the message size. Several transfers may be in progress at once.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_transfers: int = 8):
+        self.max_bytes = max_bytes
+        self.max_transfers = max_transfers
+        self.transfers = {}
+
+    def feed(self, envelope: Dict[str, Any]) -> Optional[Any]:
+        """Add one chunk; returns the decoded message once its end arrives."""
+        kind = envelope.get('chunk')
+        transfer_id = envelope.get('transfer_id')
+        seq = envelope.get('seq')
+        data = envelope.get('data', '')
+        if not isinstance(transfer_id, str) or not isinstance(data, str):
+            raise ChunkError("Chunk without a transfer id or data")
+
+        if kind == 'start':
+            total_bytes = envelope.get('total_bytes')
+            if seq != 0 or not isinstance(total_bytes, int) or total_bytes < 0:
+                raise ChunkError(f"Invalid start of transfer {transfer_id}")
+            if total_bytes > self.max_bytes:
+                raise ChunkError(f"Transfer too large: {total_bytes} bytes (limit {self.max_bytes})")
+            if transfer_id not in self.transfers and len(self.transfers) >= self.max_transfers:
+                raise ChunkError(f"Too many concurrent transfers ({self.max_transfers})")
+            transfer = self.transfers[transfer_id] = _Transfer(total_bytes)
+        else:
+            transfer = self.transfers.get(transfer_id)
+            if transfer is None:
+                raise ChunkError(f"Unknown transfer: {transfer_id}")
+            if seq != transfer.next_seq:
+                self.transfers.pop(transfer_id, None)
+                raise ChunkError(f"Transfer {transfer_id}: expected chunk {transfer.next_seq}, got {seq}")
+            transfer.next_seq += 1
+
+        chunk = data.encode('utf-8')
+        end = transfer.offset + len(chunk)
+        if end > len(transfer.buffer):
+            self.transfers.pop(transfer_id, None)
+            raise ChunkError(f"Transfer {transfer_id} exceeds its announced size")
+        transfer.buffer[transfer.offset:end] = chunk
+        transfer.offset = end
+
+        if kind != 'end':
+            return None
+
+        del self.transfers[transfer_id]
+        if transfer.offset != len(transfer.buffer):
+            raise ChunkError(f"Transfer {transfer_id} ended after {transfer.offset} of "
+                             f"{len(transfer.buffer)} bytes")
+        return loads(transfer.buffer)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Compiled field mappings for the Word Template native host.
+Turns the ``settings.fieldMappings`` of a request into a plan of
+precompiled path accessors and bound transforms, cached by a hash of the
+settings so a persistent host compiles each mapping profile once.
+"""
+
+import json
+import re
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from barcode_service import BarcodeValue
+
+# One step of a path: a key, a list index or [*]
+PATH_TOKEN = re.compile(r'\[(\*|-?\d+)\]|\.?([^.\[\]]+)')
+
+MISSING = object()
+
+
+class PathError(ValueError):
+    """A source field path that cannot be parsed."""
+    pass
+
+
+def parse_path(path: str) -> Tuple[Any, ...]:
+    """Split ``a.b[2].c`` into steps: keys are strings, indices ints, ``*`` a wildcard.
+
+    ``*`` is accepted both as ``[*]`` and as a ``.*`` segment and matches
+    every item of a list or value of an object.
+    """
+    steps = []
+    position = 0
+    while position < len(path):
+        match = PATH_TOKEN.match(path, position)
+        if not match or match.end() == position:
+            raise PathError(f"Invalid field path: {path!r}")
+        index, key = match.groups()
+        if index is not None:
+            steps.append('*' if index == '*' else int(index))
+        else:
+            steps.append(key)
+        position = match.end()
+    if not steps:
+        raise PathError(f"Invalid field path: {path!r}")
+    return tuple(steps)
+
+
+def _step(values: List[Any], step) -> List[Any]:
+    """Apply one path step to every current value, dropping the ones it misses."""
+    result = []
+    for value in values:
+        if step == '*':
+            if isinstance(value, list):
+                result.extend(value)
+            elif isinstance(value, dict):
+                result.extend(value.values())
+        elif isinstance(step, int):
+            if isinstance(value, list) and -len(value) <= step < len(value):
+                result.append(value[step])
+        elif isinstance(value, dict) and step in value:
+            result.append(value[step])
+    return result
+
+
+def compile_path(path: str) -> Callable[[Dict[str, Any]], Any]:
+    """Return an accessor for ``path``; it yields the missing sentinel when nothing matches.
+
+    A key present in the data verbatim (even one containing dots or
+    brackets) wins over the parsed path. Paths with a wildcard return the
+    list of everything they matched.
+    """
+    try:
+        steps = parse_path(path)
+    except PathError:
+        steps = None
+
+    if steps is None or steps == (path,):
+        def access(data):
+            return data.get(path, MISSING) if isinstance(data, dict) else MISSING
+        return access
+
+    has_wildcard = '*' in steps
+
+    def access(data):
+        if isinstance(data, dict) and path in data:
+            return data[path]
+        values = [data]
+        for step in steps:
+            values = _step(values, step)
+            if not values:
+                return [] if has_wildcard else MISSING
+        return values if has_wildcard else values[0]
+    return access
+
+
+class CompiledMapping:
+    """One field mapping with its accessor and transforms bound."""
+
+    __slots__ = ('key', 'access', 'plain', 'transform', 'symbology')
+
+    def __init__(self, key: str, access: Callable, plain: bool,
+                 transform: Optional[Callable[[str], str]], symbology: Optional[str]):
+        self.key = key
+        self.access = access
+        self.plain = plain
+        self.transform = transform
+        self.symbology = symbology
+
+
+class MappingPlan:
+    """A compiled ``fieldMappings`` list, evaluated in one loop per request."""
+
+    def __init__(self, mappings: List[CompiledMapping], join_array: Callable[[Any], str],
+                 preserve_empty: bool):
+        self.mappings = mappings
+        self.join_array = join_array
+        self.preserve_empty = preserve_empty
+
+    def evaluate(self, data: Dict[str, Any]) -> Dict[str, str]:
+        """Build the placeholder -> value replacements for ``data``.
+
+        Lists (including wildcard matches) are joined with the request's
+        array handling, as is any value read by a plain field name; values
+        reached through an index or nested path are used as they are.
+        """
+        join_array = self.join_array
+        preserve_empty = self.preserve_empty
+        replacements = {}
+
+        for mapping in self.mappings:
+            value = mapping.access(data)
+            if value is MISSING:
+                continue
+            if mapping.plain or isinstance(value, list):
+                value = join_array(value)
+            if value is None:
+                continue
+
+            if value != '':
+                value = str(value)
+                if mapping.transform is not None:
+                    value = mapping.transform(value)
+                if mapping.symbology:
+                    value = BarcodeValue(value, mapping.symbology)
+                replacements[mapping.key] = value
+            elif preserve_empty:
+                replacements[mapping.key] = mapping.key
+
+        return replacements
+
+
+def settings_key(settings: Dict[str, Any]) -> str:
+    """Hash the parts of the settings a mapping plan depends on."""
+    import hashlib
+
+    relevant = [
+        settings.get('fieldMappings', []),
+        settings.get('arrayHandling', 'first'),
+        settings.get('textTransform', 'none'),
+        settings.get('preserveEmptyPlaceholders', False)
+    ]
+    return hashlib.sha1(json.dumps(relevant, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class MappingPlanCache:
+    """Compiled mapping plans keyed by settings hash, least recently used evicted first.
+
+    ``apply_text_transform(text, transform)`` and
+    ``process_array_value(value, array_handling)`` are the host's own
+    functions; each plan binds them to its mappings' options.
+    """
+
+    def __init__(self, apply_text_transform: Callable[[str, str], str],
+                 process_array_value: Callable[[Any, str], str], max_plans: int = 32):
+        self.apply_text_transform = apply_text_transform
+        self.process_array_value = process_array_value
+        self.max_plans = max_plans
+        self.plans = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, settings: Dict[str, Any]) -> MappingPlan:
+        key = settings_key(settings)
+        with self.lock:
+            plan = self.plans.get(key)
+            if plan is not None:
+                self.plans.move_to_end(key)
+                return plan
+
+        plan = self.compile(settings)
+        with self.lock:
+            self.plans[key] = plan
+            while len(self.plans) > self.max_plans:
+                self.plans.popitem(last=False)
+        return plan
+
+    def compile(self, settings: Dict[str, Any]) -> MappingPlan:
+        array_handling = settings.get('arrayHandling', 'first')
+        text_transform = settings.get('textTransform', 'none')
+
+        mappings = []
+        for mapping in settings.get('fieldMappings', []):
+            source_field = mapping.get('sourceField', '')
+            placeholder = mapping.get('placeholder', '')
+            if not source_field or not placeholder:
+                continue
+
+            transform = mapping.get('transform', 'none')
+            if transform == 'none':
+                transform = text_transform
+            bound_transform = None
+            if transform and transform != 'none':
+                bound_transform = partial(self.apply_text_transform, transform=transform)
+
+            symbology = None
+            if placeholder.startswith('BARCODE_') and mapping.get('symbology'):
+                symbology = mapping['symbology'].lower()
+
+            mappings.append(CompiledMapping(
+                key=f'{{{{{placeholder}}}}}',
+                access=compile_path(source_field),
+                plain=is_plain_path(source_field),
+                transform=bound_transform,
+                symbology=symbology
+            ))
+
+        join_array = partial(self.process_array_value, array_handling=array_handling)
+        return MappingPlan(mappings, join_array, settings.get('preserveEmptyPlaceholders', False))
+
+
+def is_plain_path(path: str) -> bool:
+    """True for a bare field name, which is read without path parsing."""
+    return not any(char in path for char in '.[]*')
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Native messaging frame codec shared by the Word Template hosts and their
+test clients.
+A frame is a 4-byte little-endian length followed by that many bytes of
+UTF-8 JSON. Frames are read into one reusable buffer and parsed straight
+from bytes, and written as a single buffered write per message. When
+orjson is installed it parses large frames and, once loaded, encodes
+messages too. It is imported by the first large frame rather than at
+start-up: importing it costs more than the standard library takes to
+parse the small messages of a one-shot ``sendNativeMessage`` host.
+"""
+
+import json
+import struct
+import time
+from importlib.util import find_spec
+from typing import Any, Iterable, Optional
+
+HEADER = struct.Struct('<I')
+JSON_BACKEND = 'orjson' if find_spec('orjson') is not None else 'json'
+
+# Smallest frame parsed with orjson, importing it on first use
+FAST_JSON_MIN_BYTES = 64 * 1024
+
+# Frames up to this size are read into the reusable buffer; a larger one
+# gets a buffer of its own so one huge request does not pin its memory
+RETAINED_BUFFER_BYTES = 1024 * 1024
+
+_orjson = None
+
+
+class FramingError(ValueError):
+    """The stream ended inside a frame, or a frame exceeded the size limit."""
+    pass
+
+
+def _load_orjson():
+    global _orjson
+    if _orjson is None and JSON_BACKEND == 'orjson':
+        import orjson
+        _orjson = orjson
+    return _orjson
+
+
+def loads(data) -> Any:
+    """Parse JSON from ``bytes``, ``bytearray`` or ``memoryview`` without decoding to ``str`` first."""
+    orjson = _load_orjson() if len(data) >= FAST_JSON_MIN_BYTES else _orjson
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects a few documents json accepts (integers over
+            # 64 bits, NaN); json reports the error for invalid ones
+            pass
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def dumps(message: Any) -> bytes:
+    """Serialize a message to UTF-8 JSON bytes, through orjson once it is loaded."""
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(message)
+        except TypeError:
+            # Types orjson does not serialize (e.g. integers over 64 bits)
+            pass
+    return json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def pack_frames(frames: Iterable[bytes]) -> bytes:
+    """Join frame bodies, each behind its length header, into one block to write."""
+    parts = []
+    for frame in frames:
+        parts.append(HEADER.pack(len(frame)))
+        parts.append(frame)
+    return b''.join(parts)
+
+
+def write_frames(stream, frames: Iterable[bytes]):
+    """Write the frames of one message with a single write, then flush."""
+    stream.write(pack_frames(frames))
+    stream.flush()
+
+
+class FrameReader:
+    """Reads frames from a binary stream into a reusable buffer.
+
+    ``readinto`` may return fewer bytes than asked for (a pipe delivers a
+    large message in pieces), so every read loops until the frame is
+    complete; a stream that ends inside a header or a body raises
+    :class:`FramingError` instead of returning a truncated message. A frame
+    over ``max_frame`` bytes is skipped, keeping the stream in step, and
+    reported the same way. ``started`` is the ``time.perf_counter()`` at
+    which the last header arrived, so callers can time the read without
+    counting the wait for a message.
+    """
+
+    def __init__(self, stream, max_frame: Optional[int] = None):
+        self.stream = stream
+        self.max_frame = max_frame
+        self.header = bytearray(HEADER.size)
+        self.buffer = bytearray(64 * 1024)
+        self.started = None
+
+    def _fill(self, view: memoryview) -> int:
+        """Read until ``view`` is full or the stream ends; returns the bytes read."""
+        filled = 0
+        while filled < len(view):
+            count = self.stream.readinto(view[filled:])
+            if not count:
+                break
+            filled += count
+        return filled
+
+    def _skip(self, length: int) -> int:
+        skipped = 0
+        with memoryview(self.buffer) as view:
+            while skipped < length:
+                count = self._fill(view[:min(len(view), length - skipped)])
+                if not count:
+                    break
+                skipped += count
+        return skipped
+
+    def read_frame(self) -> Optional[memoryview]:
+        """Return the next frame body, or None once the stream ends between frames.
+
+        The body is a view of the reusable buffer, only valid until the
+        next call.
+        """
+        header_bytes = self._fill(memoryview(self.header))
+        if header_bytes == 0:
+            return None
+        if header_bytes < HEADER.size:
+            raise FramingError(f"Stream ended inside a frame header ({header_bytes} of {HEADER.size} bytes)")
+        self.started = time.perf_counter()
+
+        length = HEADER.unpack(self.header)[0]
+        if self.max_frame is not None and length > self.max_frame:
+            self._skip(length)
+            raise FramingError(f"Frame too large: {length} bytes (limit {self.max_frame})")
+
+        if length <= len(self.buffer):
+            buffer = self.buffer
+        elif length <= RETAINED_BUFFER_BYTES:
+            buffer = self.buffer = bytearray(length)
+        else:
+            buffer = bytearray(length)
+
+        frame = memoryview(buffer)[:length]
+        received = self._fill(frame)
+        if received < length:
+            frame.release()
+            raise FramingError(f"Stream ended inside a frame ({received} of {length} bytes)")
+        return frame
+
+    def read_message(self) -> Optional[Any]:
+        """Read and parse the next frame; None once the stream ends between frames."""
+        frame = self.read_frame()
+        if frame is None:
+            return None
+        with frame:
+            return loads(frame)
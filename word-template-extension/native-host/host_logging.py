@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Logging setup shared by the Word Template native hosts.
+Records are handed to a queue and written by a background listener, so a
+render never waits on the log file; the file rotates by size, and request
+payloads are logged truncated and, optionally, for a sample of requests.
+
+Every host process (one per sendNativeMessage call, a persistent port host,
+batch workers) appends to the same file. Rotation is checked when the config
+is applied and done by one process at a time, holding a lock file, so two
+processes never rename the file under each other.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+LOG_DEFAULTS = {
+    "log_level": "INFO",
+    "log_max_mb": 5,
+    "log_backups": 3,
+    "log_payload_chars": 2000,
+    "log_payload_sample_rate": 1.0
+}
+
+# A rotation lock older than this was left by a process that died mid-rotation
+ROTATE_LOCK_STALE_SECONDS = 60
+
+_listener = None
+_log_file = None
+_rotate = True
+_max_bytes = int(LOG_DEFAULTS["log_max_mb"] * 1024 * 1024)
+_backups = LOG_DEFAULTS["log_backups"]
+_payload_chars = LOG_DEFAULTS["log_payload_chars"]
+_payload_sample_rate = LOG_DEFAULTS["log_payload_sample_rate"]
+
+
+def configure_logging(log_file: Path, fmt: str, level: str = LOG_DEFAULTS["log_level"],
+                      max_mb: float = LOG_DEFAULTS["log_max_mb"],
+                      backups: int = LOG_DEFAULTS["log_backups"], rotate: bool = True):
+    """Route the root logger through a queue to the log file and stderr.
+
+    Safe to call more than once; only the first call installs handlers.
+    ``rotate=False`` appends without ever rotating, for processes that share
+    the file with a host that rotates it.
+    """
+    global _listener, _log_file, _rotate, _max_bytes, _backups
+    if _listener is not None:
+        return _listener
+
+    _log_file = Path(log_file)
+    _rotate = rotate
+    _max_bytes = int(max_mb * 1024 * 1024)
+    _backups = backups
+    file_handler = logging.FileHandler(log_file, encoding='utf-8', delay=True)
+    formatter = logging.Formatter(fmt)
+    stream_handler = logging.StreamHandler(sys.stderr)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(_parse_level(level))
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler,
+                                               respect_handler_level=True)
+    _listener.start()
+    # Drain whatever is still queued when the process exits
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def apply_log_config(config: Dict[str, Any]):
+    """Apply the ``log_*`` settings of a host config; called on every (re)load.
+
+    The log file is rotated here if it has outgrown ``log_max_mb``.
+    """
+    global _payload_chars, _payload_sample_rate, _max_bytes, _backups
+    logging.getLogger().setLevel(_parse_level(config.get("log_level", LOG_DEFAULTS["log_level"])))
+    try:
+        _payload_chars = max(0, int(config.get("log_payload_chars", LOG_DEFAULTS["log_payload_chars"])))
+        _payload_sample_rate = min(1.0, max(0.0, float(
+            config.get("log_payload_sample_rate", LOG_DEFAULTS["log_payload_sample_rate"]))))
+    except (TypeError, ValueError):
+        logging.getLogger(__name__).warning("Ignoring invalid log_payload_* settings")
+
+    try:
+        _max_bytes = int(float(config.get("log_max_mb", LOG_DEFAULTS["log_max_mb"])) * 1024 * 1024)
+        _backups = int(config.get("log_backups", LOG_DEFAULTS["log_backups"]))
+    except (TypeError, ValueError):
+        logging.getLogger(__name__).warning("Ignoring invalid log rotation settings")
+    rotate_log()
+
+
+def rotate_log() -> bool:
+    """Rotate the log file if it is over the size limit; True if it was rotated.
+
+    Only the process that creates the lock file next to the log rotates;
+    any other skips and appends to whichever file is current. The live file
+    is renamed away before the backups are shifted, so a rename refused
+    (on Windows, while another process has the file open) leaves everything
+    as it was until a later attempt.
+    """
+    handler = _file_handler()
+    if not _rotate or handler is None or _max_bytes <= 0 or not _over_limit():
+        return False
+
+    lock = _log_file.with_name(_log_file.name + '.lock')
+    try:
+        os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        try:
+            if time.time() - lock.stat().st_mtime > ROTATE_LOCK_STALE_SECONDS:
+                lock.unlink()
+        except OSError:
+            pass
+        return False
+    except OSError:
+        return False
+
+    try:
+        # Another process may have rotated between the size check and the lock
+        if not _over_limit():
+            return False
+        handler.acquire()
+        try:
+            # Our own open handle would stop the rename on Windows; the
+            # handler reopens the current file on its next record
+            if handler.stream is not None:
+                handler.stream.close()
+                handler.stream = None
+            return _shift_backups()
+        finally:
+            handler.release()
+    finally:
+        try:
+            lock.unlink()
+        except OSError:
+            pass
+
+
+def _over_limit() -> bool:
+    try:
+        return _log_file.stat().st_size >= _max_bytes
+    except OSError:
+        return False
+
+
+def _shift_backups() -> bool:
+    def backup(index):
+        return _log_file.with_name(f"{_log_file.name}.{index}")
+
+    rotating = _log_file.with_name(_log_file.name + '.rotating')
+    try:
+        os.replace(_log_file, rotating)
+    except OSError:
+        return False
+    if _backups <= 0:
+        rotating.unlink()
+        return True
+    try:
+        for index in range(_backups - 1, 0, -1):
+            if backup(index).exists():
+                os.replace(backup(index), backup(index + 1))
+        os.replace(rotating, backup(1))
+    except OSError as e:
+        logging.getLogger(__name__).warning(f"Could not shift log backups: {e}")
+    return True
+
+
+def _file_handler() -> Optional[logging.Handler]:
+    if _listener is None:
+        return None
+    return next((handler for handler in _listener.handlers
+                 if isinstance(handler, logging.FileHandler)), None)
+
+
+def _parse_level(level: Any) -> int:
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).upper())
+    return value if isinstance(value, int) else logging.INFO
+
+
+class Truncated:
+    """A payload that is serialized only if its log record is formatted.
+
+    At most ``limit`` characters are produced: the JSON encoder is consumed
+    piece by piece and stopped once the limit is reached, so a huge
+    extraction costs no more to log than a small one.
+    """
+
+    __slots__ = ('payload', 'limit')
+
+    def __init__(self, payload: Any, limit: int):
+        self.payload = payload
+        self.limit = limit
+
+    def __str__(self) -> str:
+        pieces = []
+        length = 0
+        encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+        try:
+            for piece in encoder.iterencode(self.payload):
+                pieces.append(piece)
+                length += len(piece)
+                if length > self.limit:
+                    return ''.join(pieces)[:self.limit] + '... (truncated)'
+        except Exception:
+            return repr(self.payload)[:self.limit]
+        return ''.join(pieces)
+
+
+def log_payload(logger: logging.Logger, label: str, payload: Any, level: int = logging.DEBUG):
+    """Log a request or response body, truncated and sampled per the config.
+
+    Nothing is serialized when the level is disabled, payload logging is
+    off (``log_payload_chars`` 0) or the request falls outside the sample.
+    """
+    if not _payload_chars or not logger.isEnabledFor(level):
+        return
+    if _payload_sample_rate < 1.0:
+        import random
+
+        if random.random() >= _payload_sample_rate:
+            return
+    logger.log(level, "%s: %s", label, Truncated(payload, _payload_chars))
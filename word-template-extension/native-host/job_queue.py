@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Background job queue shared by the Word Template native hosts.
+Long renders run on worker threads and are tracked by job id, so the
+message loop can answer job_status / job_result / cancel_job requests and
+push progress while a document is being generated. Every request also
+runs under a render context that enforces its deadline and can be
+cancelled by request id while it is in flight (see request_dispatch).
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATES = ('completed', 'failed', 'cancelled')
+
+
+class JobCancelled(Exception):
+    """Raised inside a render when its job or request has been cancelled."""
+    code = 'cancelled'
+
+
+class DeadlineExceeded(JobCancelled):
+    """Raised inside a render that has run past its request's deadline."""
+    code = 'deadline_exceeded'
+
+
+class RenderContext:
+    """Progress and cancellation state for one render.
+
+    The render pipeline reports through :func:`current_context` as it goes:
+    ``add_replacements`` after each paragraph and ``part_done`` after each
+    document part. Both are also the points where cancellation and the
+    ``deadline`` (a ``time.monotonic()`` value) are checked.
+    """
+
+    def __init__(self, on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 min_interval: float = 0.25, deadline: Optional[float] = None):
+        self.on_progress = on_progress
+        self.job_id = None
+        self.min_interval = min_interval
+        self.deadline = deadline
+        self.cancelled = threading.Event()
+        self.parts_processed = 0
+        self.replacements = 0
+        self.current_part = None
+        self.last_emit = 0.0
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise JobCancelled("Render cancelled")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise DeadlineExceeded("Request deadline exceeded")
+
+    def add_replacements(self, count: int):
+        self.replacements += count
+        self.check()
+        if self.on_progress and time.monotonic() - self.last_emit >= self.min_interval:
+            self.emit()
+
+    def part_done(self, part: str):
+        self.parts_processed += 1
+        self.current_part = part
+        self.check()
+        if self.on_progress:
+            self.emit()
+
+    def emit(self):
+        self.last_emit = time.monotonic()
+        try:
+            self.on_progress({'job_id': self.job_id, **self.progress()})
+        except Exception as e:
+            logger.warning(f"Could not report progress: {e}")
+
+    def progress(self) -> Dict[str, Any]:
+        return {
+            'parts_processed': self.parts_processed,
+            'replacements': self.replacements,
+            'part': self.current_part
+        }
+
+
+class _NullContext(RenderContext):
+    """Context used outside of any request: counts nothing, never cancels."""
+
+    def add_replacements(self, count: int):
+        pass
+
+    def part_done(self, part: str):
+        pass
+
+
+_NULL_CONTEXT = _NullContext()
+_local = threading.local()
+
+
+def current_context() -> RenderContext:
+    """Return the render context active on this thread."""
+    return getattr(_local, 'context', None) or _NULL_CONTEXT
+
+
+@contextmanager
+def activate(context: RenderContext):
+    """Make ``context`` the active render context for this thread."""
+    previous = getattr(_local, 'context', None)
+    _local.context = context
+    try:
+        yield context
+    finally:
+        _local.context = previous
+
+
+class Job:
+    def __init__(self, action: str, context: RenderContext):
+        import uuid
+
+        self.id = uuid.uuid4().hex
+        self.action = action
+        self.context = context
+        context.job_id = self.id
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'action': self.action,
+            'status': self.status,
+            'progress': self.context.progress(),
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'error': self.error
+        }
+
+
+class JobManager:
+    """Runs handlers on background threads and keeps their results by job id."""
+
+    def __init__(self, workers: int = 1, max_finished: int = 100):
+        self.workers = max(1, workers)
+        self.executor = None
+        self.max_finished = max_finished
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, action: str, handler: Callable[[], Dict[str, Any]],
+               on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+               deadline: Optional[float] = None) -> Job:
+        """Queue ``handler`` as a job; it runs with the job's context active."""
+        job = Job(action, RenderContext(on_progress, deadline=deadline))
+        with self.lock:
+            self.jobs[job.id] = job
+            self._prune()
+        if self.executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            # Created on first use so hosts that never run a job skip it
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='render-job')
+        job.future = self.executor.submit(self._run, job, handler)
+        logger.info(f"Queued job {job.id} ({action})")
+        return job
+
+    def _run(self, job: Job, handler: Callable[[], Dict[str, Any]]):
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            with activate(job.context):
+                job.context.check()
+                result = handler()
+            job.result = result
+            if job.context.cancelled.is_set():
+                job.status = 'cancelled'
+            elif isinstance(result, dict) and result.get('success') is False:
+                job.status = 'failed'
+                job.error = result.get('error')
+            else:
+                job.status = 'completed'
+        except DeadlineExceeded as e:
+            job.status = 'failed'
+            job.error = e.code
+        except JobCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+            logger.info(f"Job {job.id} {job.status}")
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond ``max_finished``."""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        job = self.get(job_id)
+        if job is None:
+            return {'success': False, 'error': f'Unknown job: {job_id}'}
+        return {'success': True, **job.describe()}
+
+    def result(self, job_id: str) -> Dict[str, Any]:
+        job = self.get(job_id)
+        if job is None:
+            return {'success': False, 'error': f'Unknown job: {job_id}'}
+        if job.status not in FINISHED_STATES:
+            return {'success': True, 'ready': False, **job.describe()}
+        return {'success': True, 'ready': True, **job.describe(), 'result': job.result}
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        job = self.get(job_id)
+        if job is None:
+            return {'success': False, 'error': f'Unknown job: {job_id}'}
+        if job.status in FINISHED_STATES:
+            return {'success': False, 'error': f'Job already {job.status}', **job.describe()}
+        job.context.cancelled.set()
+        logger.info(f"Cancellation requested for job {job_id}")
+        return {'success': True, **job.describe()}
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs; by default let queued and running ones finish."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+
+
+def job_id_from(message: Dict[str, Any]) -> Optional[str]:
+    """Read the job id from a message, at the top level or under ``data``."""
+    return message.get('job_id') or (message.get('data') or {}).get('job_id')
+
+
+def deadline_from(message: Dict[str, Any], received: float) -> Optional[float]:
+    """Turn a message's ``deadline_ms`` budget into a ``time.monotonic()`` deadline.
+
+    The budget counts from ``received``, when the host read the message,
+    so it does not depend on the browser's and the host's clocks agreeing.
+    """
+    budget = message.get('deadline_ms')
+    if budget is None:
+        return None
+    return received + float(budget) / 1000
+
+
+class RequestRegistry:
+    """Render contexts of the requests received and not yet answered, by request id."""
+
+    def __init__(self):
+        self.contexts = {}
+        self.lock = threading.Lock()
+
+    def add(self, request_id: Any, context: RenderContext):
+        if request_id is not None:
+            with self.lock:
+                self.contexts[request_id] = context
+
+    def discard(self, request_id: Any):
+        with self.lock:
+            self.contexts.pop(request_id, None)
+
+    def cancel(self, request_id: Any) -> Dict[str, Any]:
+        """Ask an in-flight request to stop at its next check."""
+        with self.lock:
+            context = self.contexts.get(request_id)
+        if context is None:
+            return {'success': False, 'error': f'Unknown or finished request: {request_id}'}
+        context.cancelled.set()
+        logger.info(f"Cancellation requested for request {request_id}")
+        return {'success': True, 'request_id': request_id, 'status': 'cancelling'}
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Request timing for the Word Template native hosts.
+Each request is timed as a whole and by phase (read, config, open,
+replace, barcode, save, auto_open, write) into per-action histograms that
+the ``stats`` action reports. Short-lived hosts can merge their numbers
+into a metrics file on exit, so one-message-per-process callers show up
+too.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+METRICS_VERSION = 1
+
+# Bucket upper bounds in milliseconds: 0.1 ms to ~10 minutes, 25% apart
+BUCKET_BOUNDS = []
+_bound = 0.1
+while _bound < 600000:
+    BUCKET_BOUNDS.append(round(_bound, 4))
+    _bound *= 1.25
+del _bound
+
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """Latencies counted in fixed log-scale buckets.
+
+    Fixed buckets keep recording O(1) and let histograms from different
+    processes be merged by adding counts; percentiles are read as the
+    upper bound of the bucket they fall in (within 25%).
+    """
+
+    __slots__ = ('counts', 'count', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        low, high = 0, len(BUCKET_BOUNDS)
+        while low < high:
+            middle = (low + high) // 2
+            if BUCKET_BOUNDS[middle] < ms:
+                low = middle + 1
+            else:
+                high = middle
+        self.counts[low] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = max(1, int(self.count * p / 100 + 0.999999))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                bound = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max_ms
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def merge(self, other: 'Histogram'):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {'count': self.count,
+                   'mean_ms': round(self.total_ms / self.count, 3) if self.count else None,
+                   'max_ms': round(self.max_ms, 3)}
+        for p in PERCENTILES:
+            value = self.percentile(p)
+            summary[f'p{p}_ms'] = None if value is None else round(value, 3)
+        return summary
+
+    def to_json(self) -> Dict[str, Any]:
+        # Sparse, so the metrics file stays small
+        return {'buckets': {str(index): count for index, count in enumerate(self.counts) if count},
+                'count': self.count, 'total_ms': self.total_ms, 'max_ms': self.max_ms}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'Histogram':
+        histogram = cls()
+        for index, count in data.get('buckets', {}).items():
+            index = int(index)
+            if 0 <= index < len(histogram.counts):
+                histogram.counts[index] = count
+        histogram.count = data.get('count', 0)
+        histogram.total_ms = data.get('total_ms', 0.0)
+        histogram.max_ms = data.get('max_ms', 0.0)
+        return histogram
+
+
+class ActionStats:
+    def __init__(self):
+        self.errors = 0
+        self.total = Histogram()
+        self.phases = {}
+
+    def merge(self, other: 'ActionStats'):
+        self.errors += other.errors
+        self.total.merge(other.total)
+        for name, histogram in other.phases.items():
+            self.phases.setdefault(name, Histogram()).merge(histogram)
+
+    def summary(self) -> Dict[str, Any]:
+        return {**self.total.summary(), 'errors': self.errors,
+                'phases': {name: histogram.summary() for name, histogram in self.phases.items()}}
+
+    def to_json(self) -> Dict[str, Any]:
+        return {'errors': self.errors, 'total': self.total.to_json(),
+                'phases': {name: histogram.to_json() for name, histogram in self.phases.items()}}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'ActionStats':
+        stats = cls()
+        stats.errors = data.get('errors', 0)
+        stats.total = Histogram.from_json(data.get('total', {}))
+        stats.phases = {name: Histogram.from_json(histogram)
+                        for name, histogram in data.get('phases', {}).items()}
+        return stats
+
+
+class RequestTimer:
+    """Phase timings of one request, recorded into its action when it ends."""
+
+    def __init__(self, action: str):
+        self.action = action
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.failed = False
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds * 1000
+
+
+_local = threading.local()
+
+
+def current_timer() -> Optional[RequestTimer]:
+    return getattr(_local, 'timer', None)
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block as phase ``name`` of the request active on this thread.
+
+    Does nothing outside a request (e.g. in batch worker processes).
+    Phases may nest; ``barcode`` time is also part of ``replace``.
+    """
+    timer = getattr(_local, 'timer', None)
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+class Metrics:
+    """Per-action latency histograms for this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.actions = {}
+        self.started = time.time()
+
+    @contextmanager
+    def request(self, action: str):
+        """Time a request on this thread; mark it failed via ``timer.failed``."""
+        timer = RequestTimer(action)
+        previous = getattr(_local, 'timer', None)
+        _local.timer = timer
+        try:
+            yield timer
+        except Exception:
+            timer.failed = True
+            raise
+        finally:
+            _local.timer = previous
+            self.record(timer)
+
+    def record(self, timer: RequestTimer):
+        elapsed = (time.perf_counter() - timer.started) * 1000
+        with self.lock:
+            stats = self.actions.setdefault(timer.action, ActionStats())
+            stats.total.add(elapsed)
+            if timer.failed:
+                stats.errors += 1
+            for name, ms in timer.phases.items():
+                stats.phases.setdefault(name, Histogram()).add(ms)
+
+    def snapshot(self) -> Dict[str, ActionStats]:
+        """A copy of the current histograms, safe to merge into."""
+        copy = {}
+        with self.lock:
+            for action, stats in self.actions.items():
+                copy[action] = ActionStats()
+                copy[action].merge(stats)
+        return copy
+
+    def reset(self):
+        with self.lock:
+            self.actions = {}
+            self.started = time.time()
+
+
+def summarize(actions: Dict[str, ActionStats]) -> Dict[str, Any]:
+    return {action: stats.summary() for action, stats in sorted(actions.items())}
+
+
+def load_metrics_file(path: Path) -> Dict[str, ActionStats]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable metrics file {path}: {e}")
+        return {}
+    if data.get('version') != METRICS_VERSION:
+        return {}
+    return {action: ActionStats.from_json(stats) for action, stats in data.get('actions', {}).items()}
+
+
+def merge_into_file(path: Path, metrics: Metrics):
+    """Add this process's histograms to the metrics file and reset them.
+
+    Concurrent hosts may each merge at exit; the file is replaced
+    atomically, so a lost race drops one process's numbers rather than
+    corrupting the file.
+    """
+    actions = metrics.snapshot()
+    if not actions:
+        return
+    stored = load_metrics_file(path)
+    for action, stats in actions.items():
+        stored.setdefault(action, ActionStats()).merge(stats)
+
+    payload = json.dumps({'version': METRICS_VERSION,
+                          'actions': {action: stats.to_json() for action, stats in stored.items()}})
+    temp_path = Path(path).with_name(f"{Path(path).name}.{os.getpid()}.tmp")
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(temp_path, path)
+        metrics.reset()
+    except OSError as e:
+        logger.warning(f"Could not save metrics: {e}")
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def stats_response(metrics: Metrics, path: Optional[Path], scope: str = 'all') -> Dict[str, Any]:
+    """Build the body of a ``stats`` reply.
+
+    ``process`` covers this host process only; ``all`` adds what earlier
+    processes merged into the metrics file.
+    """
+    actions = metrics.snapshot()
+    if scope == 'all' and path is not None:
+        for action, stats in load_metrics_file(path).items():
+            actions.setdefault(action, ActionStats()).merge(stats)
+    return {
+        'scope': scope,
+        'since': metrics.started,
+        'uptime_seconds': round(time.time() - metrics.started, 3),
+        'actions': summarize(actions)
+    }
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Raw OOXML render engine for the Word Template native host.
+Streams the story parts of a .docx straight out of the ZIP through an
+incremental XML parser and copies every other member byte-for-byte,
+instead of loading the whole package into the python-docx object model.
+"""
+
+import io
+import logging
+import zipfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from job_queue import current_context
+from output_writer import open_output, zip_options
+from package_zip import PackageWriter, read_raw_member
+from story_parts import (DOCUMENT_PART, MC_FALLBACK, W_P, counts_summary, iter_story_paragraphs,
+                         package_story_parts, part_counts)
+
+logger = logging.getLogger(__name__)
+
+
+def _render_part(data: bytes, replace_paragraph: Callable,
+                 prepare_body: Optional[Callable] = None):
+    """Parse one story part incrementally and fill every paragraph in it.
+
+    Paragraphs, including those in table cells and text boxes, are handed to
+    the host as they finish parsing. A body needing ``prepare_body`` (e.g.
+    repeating blocks to expand) is parsed whole first. Returns the modified
+    root and the number of replacements, not counting the legacy copies of
+    text boxes.
+    """
+    from lxml import etree
+    from docx.oxml.ns import qn
+    try:
+        from docx.oxml.parser import element_class_lookup, oxml_parser
+    except ImportError:
+        # python-docx before 1.0 defines them in docx.oxml itself
+        from docx.oxml import element_class_lookup, oxml_parser
+    from docx.text.paragraph import Paragraph
+
+    replaced = 0
+
+    if prepare_body is not None:
+        root = etree.fromstring(data, oxml_parser)
+        prepare_body(root.find(qn('w:body')))
+        for element, primary in iter_story_paragraphs(root):
+            count = replace_paragraph(Paragraph(element, None))
+            if primary:
+                replaced += count
+        return root, replaced
+
+    events = etree.iterparse(io.BytesIO(data), events=('start', 'end'), tag=(W_P, MC_FALLBACK),
+                             remove_blank_text=True)
+    events.set_element_class_lookup(element_class_lookup)
+
+    fallback_depth = 0
+    for event, element in events:
+        if element.tag == MC_FALLBACK:
+            fallback_depth += 1 if event == 'start' else -1
+        elif event == 'end':
+            count = replace_paragraph(Paragraph(element, None))
+            if not fallback_depth:
+                replaced += count
+
+    return events.root, replaced
+
+
+def render_package(template_path: Path, target, replace_paragraph: Callable,
+                   expand_blocks: Optional[Callable] = None,
+                   level: Optional[int] = None) -> Dict[str, Any]:
+    """Render ``template_path`` into ``target`` without python-docx's package model.
+
+    Every story part the document references (body, headers and footers of
+    all types, footnotes, endnotes and comments) is parsed once when it
+    contains ``{``, filled through the host's own paragraph callback and
+    serialized the way python-docx serializes parts and compressed at
+    ``level``. All other members are copied with their original compressed
+    bytes. ``expand_blocks`` is applied to the document body first when it
+    holds repeating blocks. ``target`` is a path, published atomically, or
+    a binary file object (see :func:`output_writer.open_output`). Returns
+    the replacement total and per-part counts.
+    """
+    from lxml import etree
+
+    rendered = {}
+
+    with zipfile.ZipFile(template_path) as package, open(template_path, 'rb') as source:
+        parts = package_story_parts(package)
+        counts = part_counts(parts)
+        for name, kind in parts:
+            data = package.read(name)
+            if b'{' in data:
+                prepare_body = expand_blocks if name == DOCUMENT_PART and b'{{#each' in data else None
+                root, replaced = _render_part(data, replace_paragraph, prepare_body)
+                rendered[name] = etree.tostring(root, encoding='UTF-8', standalone=True)
+                counts[name]['replacements'] = replaced
+            current_context().part_done(name)
+
+        with open_output(target) as stream, PackageWriter(stream, *zip_options(level)) as writer:
+            for info in package.infolist():
+                if info.filename in rendered:
+                    writer.write(info, rendered[info.filename])
+                else:
+                    writer.write_raw(info, read_raw_member(source, info))
+            # Last chance to abandon the render before the output is published
+            current_context().check()
+
+    copied = len(package.infolist()) - len(rendered)
+    logger.info(f"OOXML render: {len(rendered)} part(s) rewritten, {copied} copied unchanged")
+    return counts_summary(counts)
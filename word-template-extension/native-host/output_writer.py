@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Output stage for the Word Template native hosts.
+Rendered documents are written to a temporary file next to their final
+name and renamed into place once complete, so Word (or the auto-open step)
+never sees a half-written file. Packages are written at a configurable
+compression level, and members the render left unchanged keep the
+template's already-compressed bytes instead of being deflated again.
+"""
+
+import io
+import logging
+import os
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from job_queue import current_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPRESSION = 6
+OUTPUT_MODES = ('file', 'bytes')
+
+
+def zip_options(level: Optional[int]) -> Tuple[int, Optional[int]]:
+    """Return ``(compression, compresslevel)`` for a 0-9 level.
+
+    Level 0 stores members uncompressed, the fastest option for local
+    drafts; ``None`` uses the default deflate level.
+    """
+    import zipfile
+
+    if level is None:
+        level = DEFAULT_COMPRESSION
+    level = int(level)
+    if not 0 <= level <= 9:
+        raise ValueError(f"Compression level must be 0-9, got {level}")
+    if level == 0:
+        return zipfile.ZIP_STORED, None
+    return zipfile.ZIP_DEFLATED, level
+
+
+def _default_mode() -> int:
+    """Permissions a plain ``open`` would give a new file under the umask."""
+    # Read once at import, while the host is still single-threaded: the
+    # umask can only be read by setting it
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+DEFAULT_FILE_MODE = _default_mode()
+
+
+def _publish_new(temp_name: str, target: Path):
+    """Move ``temp_name`` to ``target``; FileExistsError if ``target`` exists.
+
+    Only the complete file ever appears under ``target``.
+    """
+    try:
+        os.link(temp_name, target)
+    except FileExistsError:
+        raise
+    except OSError:
+        # No hard links on this volume (e.g. FAT)
+        _rename_new(temp_name, target)
+        return
+    os.unlink(temp_name)
+
+
+def _rename_new(temp_name: str, target: Path):
+    """Rename ``temp_name`` to ``target`` unless ``target`` exists."""
+    if os.name == 'nt':
+        # Windows never renames onto an existing file
+        os.rename(temp_name, target)
+        return
+
+    # Elsewhere rename replaces silently, so writers first lock the name; a
+    # lock left by a crashed writer only makes them move on to the next name
+    lock = target.with_name(f'.{target.name}.lock')
+    os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    try:
+        if os.path.lexists(target):
+            raise FileExistsError(f"Output already exists: {target}")
+        os.rename(temp_name, target)
+    finally:
+        os.unlink(lock)
+
+
+class OutputName:
+    """A new output file named ``<base>_<timestamp><suffix>``, claimed when published.
+
+    Passed to :func:`open_output` (or anything built on it) in place of a
+    path. Nothing exists under the final name until the document is
+    complete; a counter is then appended if the name is taken, so requests
+    finishing within the same second (on other threads or in other
+    processes) never overwrite each other. ``path`` is the name used, None
+    until published.
+    """
+
+    def __init__(self, output_dir: Path, base_name: str, suffix: str):
+        self.output_dir = Path(output_dir)
+        self.base_name = base_name
+        self.suffix = suffix
+        self.timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.path: Optional[Path] = None
+
+    def claim(self, temp_name: str) -> Path:
+        """Publish the finished ``temp_name`` under the first free name."""
+        candidate = self.output_dir / f"{self.base_name}_{self.timestamp}{self.suffix}"
+        counter = 1
+        while True:
+            try:
+                _publish_new(temp_name, candidate)
+                self.path = candidate
+                return candidate
+            except FileExistsError:
+                counter += 1
+                candidate = self.output_dir / f"{self.base_name}_{self.timestamp}_{counter}{self.suffix}"
+
+    def __str__(self) -> str:
+        if self.path is not None:
+            return str(self.path)
+        return str(self.output_dir / f"{self.base_name}_{self.timestamp}{self.suffix}")
+
+
+@contextmanager
+def open_output(target, text: bool = False):
+    """Yield a stream to write a rendered document into.
+
+    A path is written through a temporary file in the same directory that
+    replaces ``target`` only once the block completes; an
+    :class:`OutputName` is published the same way under a new name. On
+    error the temporary file is removed and nothing is published. Any other
+    ``target`` is taken to be a binary file object (e.g. ``BytesIO``) and
+    written directly. ``text`` yields a UTF-8 text stream instead.
+    """
+    if not isinstance(target, (str, os.PathLike, OutputName)):
+        if not text:
+            yield target
+            return
+        stream = io.TextIOWrapper(target, encoding='utf-8')
+        try:
+            yield stream
+            stream.flush()
+        finally:
+            stream.detach()
+        return
+
+    import tempfile
+
+    if isinstance(target, OutputName):
+        directory, prefix = target.output_dir, target.base_name
+    else:
+        target = Path(target)
+        directory, prefix = target.parent, target.stem
+    fd, temp_name = tempfile.mkstemp(prefix=f'.{prefix}.', suffix='.tmp', dir=directory)
+    try:
+        with (os.fdopen(fd, 'w', encoding='utf-8') if text else os.fdopen(fd, 'wb')) as stream:
+            yield stream
+        # mkstemp creates the file private to its owner
+        os.chmod(temp_name, DEFAULT_FILE_MODE)
+        if isinstance(target, OutputName):
+            target.claim(temp_name)
+        else:
+            os.replace(temp_name, target)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except OSError:
+            pass
+        raise
+
+
+class _ReusingPhysWriter:
+    """python-docx physical package writer that reuses unchanged template members.
+
+    A member whose serialized bytes match the template's (same size and
+    CRC-32) is copied with its original compressed bytes; everything else
+    is compressed at the writer's level.
+    """
+
+    def __init__(self, writer, source, source_file):
+        self.writer = writer
+        self.source = source
+        self.source_file = source_file
+        self.reused = 0
+        self.written = 0
+
+    def write(self, pack_uri, blob: bytes):
+        self.write_member(pack_uri.membername, blob)
+
+    def write_member(self, name: str, blob: bytes):
+        from package_zip import read_raw_member
+
+        info = self.source.NameToInfo.get(name) if self.source is not None else None
+        if info is not None and info.file_size == len(blob) and zlib.crc32(blob) == info.CRC:
+            self.writer.write_raw(info, read_raw_member(self.source_file, info))
+            self.reused += 1
+        else:
+            self.writer.write(name, blob)
+            self.written += 1
+
+
+# The steps of python-docx's OpcPackage.save, static methods of its
+# PackageWriter from 0.8 through 1.2 (requirements.txt caps the version)
+DOCX_WRITE_STEPS = ('_write_content_types_stream', '_write_pkg_rels', '_write_parts')
+
+
+def _write_package(phys_writer: _ReusingPhysWriter, package, parts):
+    """Write a python-docx package through ``phys_writer``.
+
+    python-docx has no public way to save through another physical writer,
+    so this runs the steps of its own save. Should a release drop them, the
+    package is saved with its public ``save`` into memory and the members
+    copied across instead.
+    """
+    from docx.opc.pkgwriter import PackageWriter as DocxPackageWriter
+
+    steps = [getattr(DocxPackageWriter, name, None) for name in DOCX_WRITE_STEPS]
+    if all(callable(step) for step in steps):
+        write_content_types, write_pkg_rels, write_parts = steps
+        write_content_types(phys_writer, parts)
+        write_pkg_rels(phys_writer, package.rels)
+        write_parts(phys_writer, parts)
+        return
+
+    import zipfile
+
+    logger.debug("python-docx package writer steps unavailable, saving through memory")
+    buffer = io.BytesIO()
+    package.save(buffer)
+    with zipfile.ZipFile(buffer) as saved:
+        for info in saved.infolist():
+            phys_writer.write_member(info.filename, saved.read(info))
+
+
+def save_document(doc, target, template_path: Optional[Path] = None,
+                  level: Optional[int] = None) -> Dict[str, Any]:
+    """Save a python-docx document to ``target`` (a path, :class:`OutputName` or binary file object).
+
+    Replaces ``doc.save``: a path is published atomically (see
+    :func:`open_output`), members are compressed at ``level`` (0 stores
+    them) and, given the ``template_path`` the document was opened from,
+    members left unchanged reuse the template's compressed bytes. Returns
+    the number of members reused and written.
+    """
+    import zipfile
+
+    from package_zip import PackageWriter
+
+    compression, compresslevel = zip_options(level)
+    package = doc.part.package
+    parts = list(package.iter_parts())
+    for part in parts:
+        part.before_marshal()
+
+    source = source_file = None
+    try:
+        if template_path is not None:
+            source_file = open(template_path, 'rb')
+            source = zipfile.ZipFile(source_file)
+
+        with open_output(target) as stream, \
+                PackageWriter(stream, compression, compresslevel) as writer:
+            phys_writer = _ReusingPhysWriter(writer, source, source_file)
+            _write_package(phys_writer, package, parts)
+            # Last chance to abandon the render before the output is published
+            current_context().check()
+    finally:
+        if source is not None:
+            source.close()
+        if source_file is not None:
+            source_file.close()
+
+    logger.debug("Saved document: %d member(s) reused, %d compressed",
+                 phys_writer.reused, phys_writer.written)
+    return {'members_reused': phys_writer.reused, 'members_written': phys_writer.written}
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+ZIP helpers for writing .docx packages.
+Lets the native hosts copy untouched package members (media, styles,
+fonts) byte-for-byte, without inflating and re-deflating them.
+"""
+
+import copy
+import io
+import struct
+import zipfile
+import zlib
+from functools import lru_cache
+from typing import BinaryIO
+
+# Local file header: signature, versions, flags, sizes... (30 bytes), then
+# the file name and extra field whose lengths are the last two fields.
+LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+DATA_DESCRIPTOR_FLAG = 0x08
+# New members get a fixed timestamp, so identical input renders to identical bytes
+MEMBER_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def read_raw_member(source: BinaryIO, info: zipfile.ZipInfo) -> bytes:
+    """Return the still-compressed bytes of ``info`` from an open package file."""
+    source.seek(info.header_offset)
+    header = source.read(LOCAL_HEADER.size)
+    if len(header) != LOCAL_HEADER.size or header[:4] != b'PK\x03\x04':
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    name_length, extra_length = LOCAL_HEADER.unpack(header)[-2:]
+    source.seek(name_length + extra_length, 1)
+    return source.read(info.compress_size)
+
+
+# ZipFile has no public way to add already-compressed bytes. write_raw
+# appends them itself, using the writer state below, which CPython's
+# zipfile has kept since 3.6; _raw_copy_works checks it once per process.
+RAW_COPY_ATTRIBUTES = ('fp', 'start_dir', 'filelist', 'NameToInfo', '_didModify')
+
+
+@lru_cache(maxsize=None)
+def _raw_copy_works() -> bool:
+    """Whether appending a member by hand yields an archive zipfile reads back intact."""
+    data = b'raw copy probe ' * 64
+    deflater = zlib.compressobj(6, zlib.DEFLATED, -15)
+    info = zipfile.ZipInfo('probe.xml', date_time=MEMBER_DATE_TIME)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.file_size = len(data)
+    info.CRC = zlib.crc32(data)
+    try:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            if not all(hasattr(archive, name) for name in RAW_COPY_ATTRIBUTES):
+                return False
+            raw = deflater.compress(data) + deflater.flush()
+            info.compress_size = len(raw)
+            _append_raw(archive, info, raw)
+        with zipfile.ZipFile(buffer) as archive:
+            return archive.testzip() is None and archive.read('probe.xml') == data
+    except Exception:
+        return False
+
+
+def _append_raw(archive: zipfile.ZipFile, zinfo: zipfile.ZipInfo, raw: bytes):
+    archive.fp.seek(archive.start_dir)
+    zinfo.header_offset = archive.fp.tell()
+    archive.fp.write(zinfo.FileHeader())
+    archive.fp.write(raw)
+
+    archive.filelist.append(zinfo)
+    archive.NameToInfo[zinfo.filename] = zinfo
+    archive.start_dir = archive.fp.tell()
+    archive._didModify = True
+
+
+def _inflate(info: zipfile.ZipInfo, raw: bytes) -> bytes:
+    if info.compress_type == zipfile.ZIP_STORED:
+        return raw
+    if info.compress_type == zipfile.ZIP_DEFLATED:
+        return zlib.decompress(raw, -15)
+    raise NotImplementedError(f"Unsupported compression method {info.compress_type} for {info.filename}")
+
+
+class PackageWriter:
+    """Write a ZIP package member by member.
+
+    ``write_raw`` appends a member from its original compressed bytes;
+    ``write`` compresses new content as usual. Both can be mixed freely and
+    members are written in the order given. Nothing about the time of
+    writing ends up in the archive.
+    """
+
+    def __init__(self, target, compression=zipfile.ZIP_DEFLATED, compresslevel=None):
+        self.zip = zipfile.ZipFile(target, 'w', compression=compression, compresslevel=compresslevel)
+
+    def write(self, name_or_info, data: bytes):
+        """Compress ``data`` into a new member, keeping a source ZipInfo's metadata.
+
+        The member is compressed the writer's way, whatever the source used.
+        """
+        if isinstance(name_or_info, zipfile.ZipInfo):
+            name_or_info = self._fresh_info(name_or_info)
+        else:
+            name_or_info = zipfile.ZipInfo(name_or_info, date_time=MEMBER_DATE_TIME)
+            name_or_info.external_attr = 0o600 << 16
+        self.zip.writestr(name_or_info, data, compress_type=self.zip.compression,
+                          compresslevel=self.zip.compresslevel)
+
+    @staticmethod
+    def _fresh_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+        """Copy a ZipInfo read from another archive so it can be written here."""
+        zinfo = copy.copy(info)
+        # Sizes and CRC are known up front, so no trailing data descriptor
+        zinfo.flag_bits &= ~DATA_DESCRIPTOR_FLAG
+        zinfo.extra = b''
+        return zinfo
+
+    def write_raw(self, info: zipfile.ZipInfo, raw: bytes):
+        """Append ``info`` using ``raw`` (its compressed bytes) verbatim.
+
+        Where the raw copy is unavailable the member is inflated and written
+        through ``ZipFile.writestr`` with its original compression method.
+        """
+        zinfo = self._fresh_info(info)
+        if _raw_copy_works():
+            _append_raw(self.zip, zinfo, raw)
+        else:
+            self.zip.writestr(zinfo, _inflate(info, raw), compress_type=info.compress_type)
+
+    def close(self):
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Single-pass placeholder substitution for the Word Template native hosts.
+Finds every {{PLACEHOLDER}} in a paragraph with one regex scan over the
+concatenated run text, including placeholders split across runs, and
+rewrites only the runs that change.
+"""
+
+import re
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Tuple
+
+PLACEHOLDER_PATTERN = re.compile(r'\{\{[^{}]*\}\}')
+
+# Called with a matched placeholder; returns the text to put in its place,
+# or None to leave the placeholder untouched.
+Resolver = Callable[[str], Optional[str]]
+
+
+def find_placeholders(text: str) -> List[str]:
+    """Return every placeholder token in ``text`` in document order."""
+    return PLACEHOLDER_PATTERN.findall(text)
+
+
+def substitute_text(text: str, replacements: Dict[str, str]) -> Tuple[str, int]:
+    """Replace every known placeholder in a plain string.
+
+    Returns the new text and the number of placeholders replaced.
+    """
+    count = 0
+
+    def _substitute(match):
+        nonlocal count
+        value = replacements.get(match.group(0))
+        if value is None:
+            return match.group(0)
+        count += 1
+        return value
+
+    if '{{' not in text:
+        return text, 0
+    return PLACEHOLDER_PATTERN.sub(_substitute, text), count
+
+
+def substitute_runs(runs, resolve: Resolver, pattern=PLACEHOLDER_PATTERN) -> int:
+    """Replace placeholders across a sequence of runs in a single pass.
+
+    ``runs`` are python-docx ``Run`` objects (or anything with a ``text``
+    attribute). A placeholder spanning several runs is written into the
+    first run it touches, keeping that run's formatting; the runs it covers
+    are emptied and the last one keeps the text after the placeholder.
+    ``pattern`` selects what counts as a placeholder. Returns the number
+    of placeholders replaced.
+    """
+    texts = [run.text for run in runs]
+    full_text = ''.join(texts)
+    if '{{' not in full_text:
+        return 0
+
+    matches = []
+    for match in pattern.finditer(full_text):
+        value = resolve(match.group(0))
+        if value is not None:
+            matches.append((match.start(), match.end(), value))
+    if not matches:
+        return 0
+
+    # Start offsets of the non-empty runs, for mapping text positions to runs
+    run_starts = []
+    run_indexes = []
+    position = 0
+    for index, text in enumerate(texts):
+        if text:
+            run_starts.append(position)
+            run_indexes.append(index)
+        position += len(text)
+
+    new_texts = list(texts)
+
+    # Apply from the end so earlier offsets stay valid while editing
+    for start, end, value in reversed(matches):
+        first_slot = bisect_right(run_starts, start) - 1
+        last_slot = bisect_right(run_starts, end - 1) - 1
+        first = run_indexes[first_slot]
+        last = run_indexes[last_slot]
+
+        local_start = start - run_starts[first_slot]
+        local_end = end - run_starts[last_slot]
+        if first == last:
+            text = new_texts[first]
+            new_texts[first] = text[:local_start] + value + text[local_end:]
+        else:
+            new_texts[first] = new_texts[first][:local_start] + value
+            for middle in range(first + 1, last):
+                new_texts[middle] = ''
+            new_texts[last] = new_texts[last][local_end:]
+
+    for run, old_text, new_text in zip(runs, texts, new_texts):
+        if new_text != old_text:
+            run.text = new_text
+
+    return len(matches)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Idempotent render cache for the Word Template native hosts.
+The extension retries a request that times out and users double-click
+Generate, so the same render often arrives more than once, each time in a
+new host process. Renders are keyed by the template's identity and the
+canonical JSON of everything else that affects the output; a repeated
+request whose earlier output is still intact gets that output back instead
+of another timestamped copy. The index is a JSON file in the config
+directory, shared by all host processes. Within one process, a request
+arriving while an identical render is still running waits for it instead
+of starting another.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+from job_queue import current_context
+
+logger = logging.getLogger(__name__)
+
+RENDER_CACHE_VERSION = 1
+
+RENDER_CACHE_DEFAULTS = {
+    'render_cache': True,
+    'render_cache_ttl_seconds': 600,
+    'render_cache_entries': 200,
+}
+
+# How often a request waiting on an identical render checks its own deadline
+CLAIM_POLL_SECONDS = 0.1
+
+
+def render_key(template_key: Sequence[Any], request: Dict[str, Any]) -> str:
+    """Hash a template identity (path, mtime, size) and the request inputs.
+
+    ``request`` is serialized as canonical JSON (sorted keys, no
+    whitespace), so the same data in a different key order gives the same
+    key.
+    """
+    import hashlib
+
+    canonical = json.dumps([RENDER_CACHE_VERSION, list(template_key), request], sort_keys=True,
+                           separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    import hashlib
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """Maps render keys to the outputs they produced.
+
+    An entry is served while it is younger than ``ttl_seconds`` and its
+    output is still the file that was written, so a document edited or
+    deleted since is rendered again. At
+    most ``max_entries`` entries are kept, oldest dropped first. Evicting
+    an entry only forgets it: generated documents belong to the user and
+    are never deleted.
+
+    ``claim`` and ``release`` bracket a render so that identical requests
+    handled concurrently render once: the others wait and are served the
+    first one's entry.
+    """
+
+    def __init__(self, path: Path, ttl_seconds: float = 600, max_entries: int = 200):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = {}
+        self.loaded_mtime = None
+        self.lock = threading.Lock()
+        self.rendering: Dict[str, threading.Event] = {}
+
+    def configure(self, config: Dict[str, Any]):
+        self.ttl_seconds = float(config.get('render_cache_ttl_seconds',
+                                            RENDER_CACHE_DEFAULTS['render_cache_ttl_seconds']))
+        self.max_entries = int(config.get('render_cache_entries',
+                                          RENDER_CACHE_DEFAULTS['render_cache_entries']))
+
+    def _refresh(self):
+        """Re-read the index when another process has changed it."""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            self.entries = {}
+            self.loaded_mtime = None
+            return
+        if mtime == self.loaded_mtime:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.entries = data.get('entries', {}) if data.get('version') == RENDER_CACHE_VERSION else {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable render cache {self.path}: {e}")
+            self.entries = {}
+        self.loaded_mtime = mtime
+
+    def _save(self):
+        temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': RENDER_CACHE_VERSION, 'entries': self.entries}, f)
+            os.replace(temp_path, self.path)
+            self.loaded_mtime = self.path.stat().st_mtime_ns
+        except OSError as e:
+            logger.warning(f"Could not save render cache: {e}")
+            if temp_path.exists():
+                temp_path.unlink()
+
+    def _intact(self, entry: Dict[str, Any]) -> bool:
+        """Whether an entry's output is unchanged since it was written.
+
+        The same size and mtime count as unchanged. The SHA-256 is only
+        computed for a file of the same size whose mtime moved, to tell a
+        copy or touch from an edit.
+        """
+        try:
+            stat = os.stat(entry['output_path'])
+            if stat.st_size != entry['size']:
+                return False
+            if stat.st_mtime_ns == entry['mtime_ns']:
+                return True
+            return file_digest(Path(entry['output_path'])) == entry['sha256']
+        except (OSError, KeyError):
+            return False
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the entry for ``key`` if its output can be served again."""
+        with self.lock:
+            self._refresh()
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry.get('created', 0) <= self.ttl_seconds and self._intact(entry):
+                return entry
+            del self.entries[key]
+            self._save()
+            return None
+
+    def claim(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the servable entry for ``key``, or None with ``key`` claimed to render.
+
+        While another thread holds the claim this waits for it to be
+        released, then looks again; if that render failed the caller takes
+        over the claim. A None result must be followed by :meth:`release`.
+        The wait is abandoned if the caller's request is cancelled or runs
+        out of time.
+        """
+        while True:
+            with self.lock:
+                pending = self.rendering.get(key)
+                if pending is None:
+                    self.rendering[key] = threading.Event()
+                    break
+            while not pending.wait(CLAIM_POLL_SECONDS):
+                current_context().check()
+        try:
+            entry = self.lookup(key)
+        except BaseException:
+            self.release(key)
+            raise
+        if entry is not None:
+            self.release(key)
+        return entry
+
+    def release(self, key: str):
+        """Give up a claim taken by :meth:`claim`, waking requests waiting on it."""
+        with self.lock:
+            pending = self.rendering.pop(key, None)
+        if pending is not None:
+            pending.set()
+
+    def store(self, key: str, output_path: Path, result: Optional[Dict[str, Any]] = None):
+        """Record the output of a finished render, with response fields to replay."""
+        try:
+            stat = output_path.stat()
+            entry = {
+                'output_path': str(output_path),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': file_digest(output_path),
+                'created': time.time(),
+                'result': result or {}
+            }
+        except OSError as e:
+            logger.warning(f"Could not cache render of {output_path}: {e}")
+            return
+        with self.lock:
+            self._refresh()
+            self.entries[key] = entry
+            self._prune()
+            self._save()
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl_seconds
+        for key in [k for k, e in self.entries.items() if e.get('created', 0) < cutoff]:
+            del self.entries[key]
+        if len(self.entries) > self.max_entries:
+            oldest = sorted(self.entries, key=lambda k: self.entries[k].get('created', 0))
+            for key in oldest[:len(self.entries) - self.max_entries]:
+                del self.entries[key]
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Repeating blocks for Word templates.
+Expands {{#each items}} ... {{/each}} ranges of paragraphs or table rows,
+or spans of text inside one paragraph, once per record before the normal
+placeholder replacement runs.
+"""
+
+import copy
+import re
+from typing import Any, Callable, Dict, Optional
+
+from job_queue import current_context
+from placeholder_engine import PLACEHOLDER_PATTERN, substitute_runs
+
+EACH_START_PATTERN = re.compile(r'\{\{#each\s+([^{}\s]+)\s*\}\}')
+EACH_END = '{{/each}}'
+EACH_MARKER = '{{#each'
+# A block that opens and closes inside one paragraph; inline blocks don't nest
+INLINE_BLOCK_PATTERN = re.compile(
+    r'\{\{#each\s+([^{}\s]+)\s*\}\}((?:(?!\{\{#each).)*?)\{\{/each\}\}', re.DOTALL)
+
+
+def has_repeat_blocks(text: str) -> bool:
+    return EACH_MARKER in text
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(item) for item in value)
+    return str(value)
+
+
+def _element_text(element) -> str:
+    from docx.oxml.ns import qn
+
+    return ''.join(t.text or '' for t in element.iter(qn('w:t')))
+
+
+def _lookup(data: Dict[str, Any], name: str):
+    """Find ``name`` in ``data``, falling back to a case-insensitive match."""
+    if name in data:
+        return data[name]
+    lowered = name.lower()
+    for key, value in data.items():
+        if isinstance(key, str) and key.lower() == lowered:
+            return value
+    return None
+
+
+def _records(data: Dict[str, Any], name: str) -> list:
+    records = _lookup(data, name)
+    if not isinstance(records, list):
+        records = [] if records is None else [records]
+    return records
+
+
+def _record_resolver(record: Any, index: int, format_value: Callable[[Any], str],
+                     strip_markers: bool):
+    """Build a placeholder resolver for one record of a block."""
+    def resolve(placeholder: str) -> Optional[str]:
+        name = placeholder[2:-2].strip()
+        if name.startswith('#each') or name == '/each':
+            return '' if strip_markers else None
+        if name in ('this', '.'):
+            return format_value(record)
+        if name == '@index':
+            return str(index)
+        if name == '@number':
+            return str(index + 1)
+        if isinstance(record, dict):
+            value = _lookup(record, name)
+            if value is not None:
+                return format_value(value)
+        # Leave it for the document-wide replacement pass
+        return None
+    return resolve
+
+
+def _inline_resolver(data: Dict[str, Any], format_value: Callable[[Any], str]):
+    """Build a resolver that renders a whole inline block span."""
+    def resolve(span: str) -> str:
+        match = INLINE_BLOCK_PATTERN.fullmatch(span)
+        pieces = []
+        for index, record in enumerate(_records(data, match.group(1))):
+            current_context().check()
+            resolve_field = _record_resolver(record, index, format_value, strip_markers=False)
+
+            def field(placeholder):
+                value = resolve_field(placeholder.group(0))
+                return placeholder.group(0) if value is None else value
+            pieces.append(PLACEHOLDER_PATTERN.sub(field, match.group(2)))
+        return ''.join(pieces)
+    return resolve
+
+
+def _expand_inline(paragraphs, data: Dict[str, Any], format_value) -> int:
+    """Repeat the text of each inline block in ``paragraphs`` per record."""
+    from docx.text.paragraph import Paragraph
+
+    resolve = _inline_resolver(data, format_value)
+    expanded = 0
+    for p in paragraphs:
+        if INLINE_BLOCK_PATTERN.search(_element_text(p)):
+            expanded += substitute_runs(Paragraph(p, None).runs, resolve, INLINE_BLOCK_PATTERN)
+    return expanded
+
+
+def _is_marker_only(text: str) -> bool:
+    stripped = EACH_START_PATTERN.sub('', text).replace(EACH_END, '')
+    return not stripped.strip()
+
+
+def _render_clone(element, record: Any, index: int, is_edge: bool, format_value) -> bool:
+    """Fill a cloned block element for one record.
+
+    Nested row blocks inside the clone are expanded first, scoped to the
+    record. Returns False for a marker-only edge paragraph or table row,
+    which is dropped.
+    """
+    from docx.oxml.ns import qn
+    from docx.text.paragraph import Paragraph
+
+    is_paragraph = element.tag == qn('w:p')
+    is_marker_tag = is_paragraph or element.tag == qn('w:tr')
+    if is_edge and is_marker_tag and _is_marker_only(_element_text(element)):
+        return False
+
+    if isinstance(record, dict) and not is_paragraph:
+        for table in list(element.iter(qn('w:tbl'))):
+            if has_repeat_blocks(_element_text(table)):
+                _expand_children(table, record, format_value)
+
+    paragraphs = [element] if is_paragraph else list(element.iter(qn('w:p')))
+    if isinstance(record, dict):
+        _expand_inline(paragraphs, record, format_value)
+    resolve = _record_resolver(record, index, format_value, strip_markers=is_edge)
+    for p in paragraphs:
+        substitute_runs(Paragraph(p, None).runs, resolve)
+    return True
+
+
+def _expand_children(container, data: Dict[str, Any], format_value) -> int:
+    """Expand every block among the direct children of ``container``.
+
+    In the document body blocks are delimited by paragraphs (and may
+    contain tables); in a table they are delimited by rows.
+    """
+    from docx.oxml.ns import qn
+
+    if container.tag == qn('w:tbl'):
+        marker_tags = block_tags = (qn('w:tr'),)
+    else:
+        marker_tags = (qn('w:p'),)
+        block_tags = (qn('w:p'), qn('w:tbl'))
+
+    def marker_text(element):
+        if element.tag not in marker_tags:
+            return ''
+        # Inline blocks are expanded separately and never delimit a range
+        return INLINE_BLOCK_PATTERN.sub('', _element_text(element))
+
+    expanded = 0
+    children = [child for child in container if child.tag in block_tags]
+    position = 0
+
+    while position < len(children):
+        match = EACH_START_PATTERN.search(marker_text(children[position]))
+        if not match:
+            position += 1
+            continue
+
+        end_position = position
+        while end_position < len(children) and EACH_END not in marker_text(children[end_position]):
+            end_position += 1
+        if end_position == len(children):
+            # Unterminated block: leave the template untouched
+            position += 1
+            continue
+
+        block = children[position:end_position + 1]
+        records = _records(data, match.group(1))
+
+        anchor = block[0]
+        for index, record in enumerate(records):
+            # A huge array must not outlive the request's deadline
+            current_context().check()
+            for element in block:
+                clone = copy.deepcopy(element)
+                is_edge = element is block[0] or element is block[-1]
+                if _render_clone(clone, record, index, is_edge, format_value):
+                    anchor.addprevious(clone)
+
+        for element in block:
+            container.remove(element)
+
+        expanded += 1
+        position = end_position + 1
+
+    return expanded
+
+
+def expand_repeat_blocks(body, data: Dict[str, Any],
+                         format_value: Callable[[Any], str] = _format_value) -> int:
+    """Expand ``{{#each NAME}} ... {{/each}}`` blocks under ``body``.
+
+    A block runs from the paragraph (or table row) holding ``{{#each NAME}}``
+    to the sibling holding ``{{/each}}``, and is repeated once for every
+    item of ``data[NAME]``. Inside a block ``{{field}}`` resolves against
+    the current item (``{{this}}`` for plain values, ``{{@index}}`` and
+    ``{{@number}}`` for its zero- and one-based position); anything else is
+    left for the document-wide replacement. Paragraphs and table rows that
+    only hold a marker are dropped.
+
+    A block that opens and closes inside one paragraph repeats just the
+    text between its markers, written in the formatting of the run where
+    the block starts. Returns the number of blocks expanded.
+    """
+    from docx.oxml.ns import qn
+
+    if not has_repeat_blocks(_element_text(body)):
+        return 0
+
+    expanded = _expand_children(body, data, format_value)
+    for table in list(body.iter(qn('w:tbl'))):
+        if has_repeat_blocks(_element_text(table)):
+            expanded += _expand_children(table, data, format_value)
+    return expanded + _expand_inline(list(body.iter(qn('w:p'))), data, format_value)
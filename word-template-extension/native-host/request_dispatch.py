@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Concurrent request handling for the Word Template native hosts.
+Over a connectNative port one host process serves every popup, so a slow
+render must not hold up a ping or list_templates from another. Messages
+are read on their own thread, renders run on a pool of worker threads
+while pings and job status checks are answered straight away, and every
+frame is written by a single writer thread. Responses carry the request ``id`` and may
+arrive out of order, but their frames never interleave.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from frame_codec import write_frames
+from job_queue import RenderContext, RequestRegistry, deadline_from
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUEST_WORKERS = 4
+
+# Answered on the dispatching thread instead of queueing behind renders.
+# Only actions that touch nothing but memory belong here: listing templates
+# rescans the folder (and may open every template) and update_config writes
+# to disk under the host's config lock, so they go to the pool like renders.
+FAST_ACTIONS = frozenset({'ping', 'stats', 'job_status', 'job_result', 'cancel_job'})
+
+
+class MessageReader:
+    """Reads messages on a background thread, ahead of the loop handling them.
+
+    Each message is queued with its read time and a render context carrying
+    its deadline, registered under its ``id`` until the loop discards it.
+    Messages ``handle_now`` accepts (returns True for) are handled on the
+    reader thread instead, so a cancellation does not wait behind the
+    render it cancels. ``None`` is queued once input ends.
+    """
+
+    def __init__(self, read: Callable[[], Optional[Dict[str, Any]]], read_seconds: Callable[[], float],
+                 requests: RequestRegistry, handle_now: Callable[[Dict[str, Any]], bool]):
+        self.read = read
+        self.read_seconds = read_seconds
+        self.requests = requests
+        self.handle_now = handle_now
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='message-reader', daemon=True)
+
+    def start(self) -> 'MessageReader':
+        self.thread.start()
+        return self
+
+    def _run(self):
+        try:
+            while True:
+                message = self.read()
+                if message is None:
+                    break
+                received = time.monotonic()
+                read_seconds = self.read_seconds()
+                try:
+                    if self.handle_now(message):
+                        continue
+                    context = RenderContext(deadline=deadline_from(message, received))
+                except Exception as e:
+                    logger.error(f"Error reading ahead: {e}")
+                    context = RenderContext()
+                self.requests.add(message.get('id'), context)
+                self.queue.put((message, read_seconds, context))
+        finally:
+            self.queue.put(None)
+
+    def get(self):
+        """Return the next ``(message, read_seconds, context)``, or None at end of input."""
+        return self.queue.get()
+
+
+class RequestDispatcher:
+    """Runs each request on the dispatching thread or on a worker pool.
+
+    Actions in ``fast_actions`` and ``async`` submissions (which only queue
+    a job) run inline, in arrival order; everything else goes to one of
+    ``workers`` threads. With ``workers`` 0 every request runs inline, one
+    at a time, as before the pool existed.
+    """
+
+    def __init__(self, handle: Callable[[Dict[str, Any], float, RenderContext], None], workers: int,
+                 fast_actions=FAST_ACTIONS):
+        self.handle = handle
+        self.workers = workers
+        self.fast_actions = fast_actions
+        self.executor = None
+
+    def is_fast(self, message: Dict[str, Any]) -> bool:
+        return message.get('action') in self.fast_actions or bool(message.get('async'))
+
+    def dispatch(self, message: Dict[str, Any], read_seconds: float, context: RenderContext):
+        if self.workers <= 0 or self.is_fast(message):
+            self.handle(message, read_seconds, context)
+            return
+        if self.executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            # Created on first use so a ping-only process never starts it
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='request')
+        self.executor.submit(self._run, message, read_seconds, context)
+
+    def _run(self, message: Dict[str, Any], read_seconds: float, context: RenderContext):
+        try:
+            self.handle(message, read_seconds, context)
+        except Exception as e:
+            logger.error(f"Unhandled error in {message.get('action')} request: {e}")
+
+    def shutdown(self):
+        """Wait for the requests still running."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+class FrameWriter:
+    """Writes native messaging frames to ``stream`` from a single thread.
+
+    ``send`` queues the frames of one message, which are written back to
+    back in one write, so concurrent senders never interleave. With
+    ``wait`` it returns only once they are written, so a caller timing the
+    send measures the write rather than the enqueue.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='frame-writer', daemon=True)
+        self.thread.start()
+
+    def send(self, frames: List[bytes], wait: bool = False):
+        written = threading.Event() if wait else None
+        self.queue.put((frames, written))
+        if written:
+            written.wait()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            frames, written = item
+            try:
+                write_frames(self.stream, frames)
+            except Exception as e:
+                logger.error(f"Error writing message: {e}")
+            finally:
+                if written:
+                    written.set()
+
+    def close(self):
+        """Write everything already queued, then stop the thread."""
+        self.queue.put(None)
+        self.thread.join()
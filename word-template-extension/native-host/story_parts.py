@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Story part traversal for the Word Template native hosts.
+A .docx keeps its text in several story parts: the main document, its
+headers and footers (default, first-page and even-page, often shared by
+several sections), footnotes, endnotes and comments. These helpers list
+each story part once and every paragraph inside it, which covers table
+cells, nested tables and text boxes in a single walk.
+"""
+
+import posixpath
+from typing import Any, Dict, Iterator, List, Tuple
+
+DOCUMENT_PART = 'word/document.xml'
+DOCUMENT_RELS = 'word/_rels/document.xml.rels'
+
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_RELS_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+MC_NS = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+
+W_P = f'{{{W_NS}}}p'
+MC_FALLBACK = f'{{{MC_NS}}}Fallback'
+
+# Relationship types from the document part to the other story parts
+STORY_RELATIONSHIPS = {
+    f'{R_NS}/header': 'header',
+    f'{R_NS}/footer': 'footer',
+    f'{R_NS}/footnotes': 'footnotes',
+    f'{R_NS}/endnotes': 'endnotes',
+    f'{R_NS}/comments': 'comments',
+}
+
+
+def load_story_parts(doc) -> int:
+    """Parse the story parts python-docx keeps as opaque bytes in ``doc``.
+
+    python-docx only parses the parts it has an API for (comments since
+    1.2); footnotes and endnotes are loaded as plain blob parts. Each one
+    is replaced in this document's package by a ``StoryPart`` parsed from
+    its bytes, keeping its own relationships, and every relationship to it
+    is pointed at the replacement. Other documents are not affected.
+    Returns the number of parts parsed.
+    """
+    from docx.parts.story import StoryPart
+
+    document_part = doc.part
+    loaded = {}
+    for rel in document_part.rels.values():
+        if rel.is_external or rel.reltype not in STORY_RELATIONSHIPS:
+            continue
+        part = rel.target_part
+        if hasattr(part, 'element') or part in loaded:
+            continue
+        story = StoryPart.load(part.partname, part.content_type, part.blob, part.package)
+        for part_rel in part.rels.values():
+            target = part_rel.target_ref if part_rel.is_external else part_rel.target_part
+            story.load_rel(part_rel.reltype, target, part_rel.rId, part_rel.is_external)
+        loaded[part] = story
+    if not loaded:
+        return 0
+
+    package = document_part.package
+    for owner in [package, *package.iter_parts()]:
+        for rel in list(owner.rels.values()):
+            if not rel.is_external and rel.target_part in loaded:
+                owner.load_rel(rel.reltype, loaded[rel.target_part], rel.rId)
+    return len(loaded)
+
+
+def iter_story_parts(doc) -> Iterator[Tuple[str, str, Any]]:
+    """Yield ``(name, kind, part)`` for each story part of a python-docx document.
+
+    ``name`` is the ZIP member name (``word/header1.xml``) and ``kind`` one
+    of ``document``, ``header``, ``footer``, ``footnotes``, ``endnotes`` or
+    ``comments``. A header or footer referenced by several sections is
+    yielded once. Parts python-docx did not parse (see
+    :func:`load_story_parts`) are skipped.
+    """
+    document_part = doc.part
+    yield document_part.partname.lstrip('/'), 'document', document_part
+
+    seen = set()
+    for rel in document_part.rels.values():
+        kind = STORY_RELATIONSHIPS.get(rel.reltype)
+        if kind is None or rel.is_external:
+            continue
+        part = rel.target_part
+        if part.partname in seen or not hasattr(part, 'element'):
+            continue
+        seen.add(part.partname)
+        yield part.partname.lstrip('/'), kind, part
+
+
+def package_story_parts(package) -> List[Tuple[str, str]]:
+    """Return ``(name, kind)`` for each story part of an open ``zipfile.ZipFile``.
+
+    The raw-package counterpart of :func:`iter_story_parts`, read from the
+    document part's relationships.
+    """
+    from lxml import etree
+
+    parts = [(DOCUMENT_PART, 'document')]
+    if DOCUMENT_RELS not in package.NameToInfo:
+        return parts
+
+    rels = etree.fromstring(package.read(DOCUMENT_RELS))
+    seen = {DOCUMENT_PART}
+    for rel in rels.iter(f'{{{PKG_RELS_NS}}}Relationship'):
+        kind = STORY_RELATIONSHIPS.get(rel.get('Type'))
+        if kind is None or rel.get('TargetMode') == 'External':
+            continue
+        name = posixpath.normpath(posixpath.join('word', rel.get('Target')))
+        if name not in seen and name in package.NameToInfo:
+            seen.add(name)
+            parts.append((name, kind))
+    return parts
+
+
+def iter_story_paragraphs(element) -> Iterator[Tuple[Any, bool]]:
+    """Yield ``(w:p element, primary)`` for every paragraph under ``element``.
+
+    Paragraphs come in document order and include those in table cells,
+    nested tables and text boxes. ``primary`` is False inside
+    ``mc:Fallback``, the legacy VML copy Word keeps of a text box: it is
+    filled too, so older readers show the same text, but its replacements
+    should not be counted twice. The paragraphs are listed up front, so
+    the caller may modify them while iterating.
+    """
+    fallback = set()
+    for alternate in element.iter(MC_FALLBACK):
+        fallback.update(alternate.iter(W_P))
+    for paragraph in list(element.iter(W_P)):
+        yield paragraph, paragraph not in fallback
+
+
+def part_counts(parts) -> Dict[str, Dict[str, Any]]:
+    """Start a per-part replacement tally from ``(name, kind, ...)`` tuples."""
+    return {part[0]: {'part': part[0], 'type': part[1], 'replacements': 0} for part in parts}
+
+
+def counts_summary(counts: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Response fields for a per-part tally: the total and the parts list."""
+    parts = list(counts.values())
+    return {
+        'replacements': sum(part['replacements'] for part in parts),
+        'parts': parts
+    }
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Compiled template cache for the Word Template native hosts.
+Keeps parsed templates in memory together with an index of where their
+placeholders sit, so repeated renders skip re-parsing the package and
+re-scanning every paragraph.
+"""
+
+import copy
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from story_parts import iter_story_paragraphs, iter_story_parts, load_story_parts
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_OPEN = '{{'
+PLACEHOLDER_CLOSE = '}}'
+
+
+class PlaceholderSlot(NamedTuple):
+    """A paragraph in a template that contains at least one placeholder.
+
+    ``part`` is the story part's member name (``word/document.xml``,
+    ``word/header2.xml``, ``word/footnotes.xml``, ...) and ``kind`` its
+    type, as listed by :func:`story_parts.iter_story_parts`. ``paragraph``
+    is the paragraph's position in :func:`story_parts.iter_story_paragraphs`
+    order, so table cells, nested tables and text boxes are ordinary
+    paragraphs. ``text`` is the paragraph's template text and ``primary``
+    is False for the legacy copy of a text box.
+    """
+    part: str
+    kind: str
+    paragraph: int
+    text: str
+    primary: bool = True
+
+
+def _has_placeholder(text: str) -> bool:
+    """Cheap test for text that may contain a ``{{...}}`` placeholder."""
+    open_at = text.find(PLACEHOLDER_OPEN)
+    return open_at != -1 and text.find(PLACEHOLDER_CLOSE, open_at) != -1
+
+
+def parts_to_copy(doc, names: Set[str]) -> Set[Any]:
+    """Return the parts of ``doc`` a render may change.
+
+    These are the parts named in ``names`` (ZIP member names), the document
+    part, and every part that relates to one of them, so that the copies
+    stay reachable from the package.
+    """
+    parts = list(doc.part.package.iter_parts())
+    copied = {part for part in parts if part.partname.lstrip('/') in names}
+    copied.add(doc.part)
+    grown = True
+    while grown:
+        grown = False
+        for part in parts:
+            if part not in copied and any(not rel.is_external and rel.target_part in copied
+                                          for rel in part.rels.values()):
+                copied.add(part)
+                grown = True
+    return copied
+
+
+def _copy_part(part, package):
+    """Copy ``part`` into ``package``, without its relationships."""
+    if hasattr(part, 'element'):
+        return type(part)(part.partname, part.content_type, copy.deepcopy(part.element), package)
+    return type(part).load(part.partname, part.content_type, part.blob, package)
+
+
+class CompiledTemplate:
+    """A parsed template skeleton plus its placeholder index.
+
+    ``document`` is never modified: :meth:`clone` copies only the parts a
+    render can change and shares every other part (styles, numbering,
+    images, ...) with it.
+    """
+
+    def __init__(self, path: Path, key: Tuple[str, int, int], document: Any,
+                 slots: List[PlaceholderSlot], cost: int):
+        self.path = path
+        self.key = key
+        self.document = document
+        self.slots = slots
+        self.cost = cost
+        self.copied_parts = parts_to_copy(document, {slot.part for slot in slots})
+
+    def clone(self):
+        """Return a document to render into, independent of the skeleton where it matters.
+
+        The story parts holding placeholders, and the parts relating to
+        them, are copied into a new package; relationships to any other
+        part point at the skeleton's own. Images a render adds (barcodes)
+        become new parts of the copy.
+        """
+        source = self.document.part.package
+        package = type(source)()
+        copies = {part: _copy_part(part, package) for part in self.copied_parts}
+
+        def target(rel):
+            if rel.is_external:
+                return rel.target_ref
+            return copies.get(rel.target_part, rel.target_part)
+
+        for rel in source.rels.values():
+            package.load_rel(rel.reltype, target(rel), rel.rId, rel.is_external)
+        for part, part_copy in copies.items():
+            for rel in part.rels.values():
+                part_copy.load_rel(rel.reltype, target(rel), rel.rId, rel.is_external)
+        package.after_unmarshal()
+        return copies[self.document.part].document
+
+
+def index_document(doc) -> List[PlaceholderSlot]:
+    """Record every paragraph of every story part that holds a placeholder.
+
+    The traversal mirrors the order the hosts use when replacing, so that
+    visiting only the indexed slots is equivalent to a full walk.
+    """
+    from docx.text.paragraph import Paragraph
+
+    slots = []
+    for name, kind, part in iter_story_parts(doc):
+        for p_index, (element, primary) in enumerate(iter_story_paragraphs(part.element)):
+            paragraph = Paragraph(element, part)
+            text = paragraph.text
+            if _has_placeholder(text):
+                slots.append(PlaceholderSlot(name, kind, p_index, text, primary))
+    return slots
+
+
+def resolve_slots(doc, slots: List[PlaceholderSlot]) -> Iterator[Tuple[str, List[Tuple[PlaceholderSlot, Any]]]]:
+    """Yield ``(part name, [(slot, paragraph), ...])`` for each story part of ``doc`` (or a clone).
+
+    Parts come in document order, those without slots with an empty list,
+    so callers can report every part as done just like a full walk. Each
+    part's paragraphs are listed once for all the slots that point into it.
+    """
+    from docx.text.paragraph import Paragraph
+
+    by_part = {}
+    for slot in slots:
+        by_part.setdefault(slot.part, []).append(slot)
+    for name, _, part in iter_story_parts(doc):
+        found = by_part.get(name, [])
+        if found:
+            paragraphs = [element for element, _ in iter_story_paragraphs(part.element)]
+            found = [(slot, Paragraph(paragraphs[slot.paragraph], part)) for slot in found]
+        yield name, found
+
+
+def package_cost(path: Path) -> int:
+    """Estimate the in-memory cost of a parsed template from its ZIP members."""
+    import zipfile
+
+    try:
+        with zipfile.ZipFile(path) as package:
+            return sum(info.file_size for info in package.infolist())
+    except (OSError, zipfile.BadZipFile):
+        return path.stat().st_size
+
+
+class TemplateCache:
+    """LRU cache of compiled templates bounded by an approximate memory budget.
+
+    Entries are keyed by absolute path, mtime and size, so an edited template
+    is recompiled on its next use and the stale entry ages out. Concurrent
+    requests for a template not yet cached compile it once: the first
+    compiles and the others wait for its entry.
+    """
+
+    def __init__(self, budget_mb: float = 64):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.entries = OrderedDict()
+        self.total_cost = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.compiling = {}
+
+    @staticmethod
+    def make_key(template_path: Path) -> Tuple[str, int, int]:
+        stat = template_path.stat()
+        return str(template_path.resolve()), stat.st_mtime_ns, stat.st_size
+
+    def get(self, template_path: Path) -> CompiledTemplate:
+        """Return the compiled template for ``template_path``, compiling on a miss."""
+        key = self.make_key(template_path)
+
+        with self.lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry
+            compiling = self.compiling.setdefault(key, threading.Lock())
+
+        with compiling:
+            with self.lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    return entry
+                self.misses += 1
+            try:
+                entry = self.compile(template_path, key)
+                with self.lock:
+                    self._insert(key, entry)
+            finally:
+                with self.lock:
+                    if self.compiling.get(key) is compiling:
+                        del self.compiling[key]
+        return entry
+
+    def _lookup(self, key: Tuple[str, int, int]) -> Optional[CompiledTemplate]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return entry
+
+    def _insert(self, key: Tuple[str, int, int], entry: CompiledTemplate):
+        self._evict_path(key[0])
+        if entry.cost <= self.budget_bytes:
+            self.entries[key] = entry
+            self.total_cost += entry.cost
+            while self.total_cost > self.budget_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_cost -= evicted.cost
+                logger.debug(f"Evicted cached template: {evicted.path}")
+
+    def compile(self, template_path: Path, key: Tuple[str, int, int]) -> CompiledTemplate:
+        from docx import Document
+
+        logger.info(f"Compiling template: {template_path}")
+        skeleton = Document(str(template_path))
+        load_story_parts(skeleton)
+        slots = index_document(skeleton)
+        return CompiledTemplate(template_path, key, skeleton, slots, package_cost(template_path))
+
+    def _evict_path(self, resolved_path: str):
+        """Drop entries for older versions of the same file."""
+        for key in [k for k in self.entries if k[0] == resolved_path]:
+            self.total_cost -= self.entries.pop(key).cost
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_cost = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'cost_bytes': self.total_cost,
+                'budget_bytes': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Persistent template catalog for the Word Template native hosts.
+Keeps the files of each template directory, with their size, mtime and
+(once read) placeholder set, in a JSON index in the config directory, so
+listing templates only rescans directories that changed since last time.
+"""
+
+import io
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from placeholder_engine import find_placeholders
+from repeat_blocks import EACH_END, EACH_START_PATTERN
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION = 1
+
+# Story parts of a .docx that can hold placeholders
+STORY_PART_PATTERN = re.compile(r'word/(document|header\d*|footer\d*|footnotes|endnotes|comments)\.xml$')
+
+# Elements read when scanning paragraphs for placeholders
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+MC_NS = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+W_P = f'{{{W_NS}}}p'
+W_T = f'{{{W_NS}}}t'
+MC_FALLBACK = f'{{{MC_NS}}}Fallback'
+
+ARRAY_INDEX = re.compile(r'^(.+?)\[(-?\d+)\]$')
+BLOCK_VALUES = ('this', '.', '@index', '@number')
+
+SORT_KEYS = {
+    'name': lambda entry: entry['name'].lower(),
+    'modified': lambda entry: entry['mtime'],
+    'size': lambda entry: entry['size'],
+}
+
+
+def _story_texts(path: Path) -> Iterable[str]:
+    """Yield the text of each paragraph holding a placeholder, in document order.
+
+    Parts are parsed incrementally. Only ``w:t`` text counts, so field
+    codes (``w:instrText``) are left out; a text box's paragraphs are read
+    on their own rather than as part of the paragraph anchoring it, and
+    the legacy copy of a text box is skipped.
+    """
+    import zipfile
+    from lxml import etree
+
+    with zipfile.ZipFile(path) as package:
+        for name in package.namelist():
+            if not STORY_PART_PATTERN.match(name):
+                continue
+            data = package.read(name)
+            if b'{{' not in data:
+                continue
+            # Text of each paragraph still open, innermost last
+            open_paragraphs = []
+            fallback_depth = 0
+            for event, element in etree.iterparse(io.BytesIO(data), events=('start', 'end'),
+                                                  tag=(W_P, W_T, MC_FALLBACK)):
+                if element.tag == MC_FALLBACK:
+                    fallback_depth += 1 if event == 'start' else -1
+                elif element.tag == W_P:
+                    if event == 'start':
+                        open_paragraphs.append([])
+                        continue
+                    text = ''.join(open_paragraphs.pop())
+                    if not fallback_depth and '{' in text:
+                        yield text
+                elif event == 'end' and element.text and open_paragraphs:
+                    open_paragraphs[-1].append(element.text)
+
+
+def extract_placeholders(path: Path) -> List[str]:
+    """Return the placeholders a template uses, in first-seen order.
+
+    Word files are read paragraph by paragraph straight from the XML, so
+    placeholders split across runs are still found; text templates are read
+    as they are. Other files have none. Each ``{{#each}}`` / ``{{/each}}``
+    marker is kept where it occurs, and other placeholders are listed once
+    per block they appear in, so the sequence still shows which fields
+    belong to which repeating block.
+    """
+    suffix = path.suffix.lower()
+    if suffix == '.txt':
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            texts = [f.read()]
+    elif suffix in ('.docx', '.docm', '.dotx', '.dotm'):
+        texts = _story_texts(path)
+    else:
+        return []
+
+    sequence = []
+    seen = set()
+    blocks = []
+    for text in texts:
+        for placeholder in find_placeholders(text):
+            start = EACH_START_PATTERN.fullmatch(placeholder)
+            if start or placeholder == EACH_END:
+                sequence.append(placeholder)
+                if start:
+                    blocks.append(start.group(1))
+                elif blocks:
+                    blocks.pop()
+                continue
+            key = (tuple(blocks), placeholder)
+            if key not in seen:
+                seen.add(key)
+                sequence.append(placeholder)
+    return sequence
+
+
+def describe_placeholders(sequence: List[str]) -> Dict[str, Any]:
+    """Build the placeholder manifest of a template from its extracted sequence.
+
+    Every placeholder is classified as a plain ``field``, a ``barcode``
+    (``{{BARCODE_NAME}}`` or ``{{BARCODE_NAME:symbology}}``) or an
+    ``array_item`` (``{{NAME[2]}}``, negative indices count from the end).
+    Placeholders inside a ``{{#each NAME}}`` block carry the block name and
+    resolve against each item (``block_value`` for ``{{this}}``,
+    ``{{@index}}`` and ``{{@number}}``); ``fields`` lists the top-level data fields
+    the template needs.
+    """
+    from barcode_service import split_barcode_placeholder
+
+    placeholders = []
+    fields = {}
+    blocks = {}
+    stack = []
+
+    for placeholder in sequence:
+        start = EACH_START_PATTERN.fullmatch(placeholder)
+        if start:
+            stack.append(start.group(1))
+            blocks.setdefault(start.group(1), {})
+            fields.setdefault(start.group(1), None)
+            continue
+        if placeholder == EACH_END:
+            if stack:
+                stack.pop()
+            continue
+
+        name = placeholder[2:-2].strip()
+        item = {'placeholder': placeholder, 'kind': 'field', 'field': name}
+        if name.startswith('BARCODE_'):
+            base, symbology = split_barcode_placeholder(placeholder)
+            item.update(kind='barcode', field=base[2:-2], symbology=symbology)
+        else:
+            array_item = ARRAY_INDEX.match(name)
+            if array_item:
+                item.update(kind='array_item', field=array_item.group(1), index=int(array_item.group(2)))
+
+        if stack:
+            item['block'] = stack[-1]
+            if name in BLOCK_VALUES:
+                item['kind'] = 'block_value'
+            else:
+                blocks[stack[-1]].setdefault(item['field'], None)
+        else:
+            fields.setdefault(item['field'], None)
+        placeholders.append(item)
+
+    return {
+        'placeholders': placeholders,
+        'fields': list(fields),
+        'blocks': [{'name': name, 'fields': list(block_fields)} for name, block_fields in blocks.items()]
+    }
+
+
+class TemplateCatalog:
+    """On-disk index of template directories.
+
+    ``refresh`` lists a directory again only when its mtime has changed
+    (files added, removed, renamed or saved through a temporary file);
+    otherwise the stored entries are used as they are. Placeholder sets are
+    read on demand and kept until the file's size or mtime changes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.dirs = {}
+        self.dirty = False
+        self.loaded = False
+
+    def load(self):
+        """Read the stored index; done on first use, not when the host starts."""
+        self.loaded = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CATALOG_VERSION:
+                self.dirs = data.get('dirs', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable template catalog {self.path}: {e}")
+
+    def save(self):
+        """Write the catalog if it changed, replacing the old file atomically."""
+        with self.lock:
+            if not self.dirty:
+                return
+            payload = json.dumps({'version': CATALOG_VERSION, 'dirs': self.dirs})
+            self.dirty = False
+        temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save template catalog: {e}")
+            if temp_path.exists():
+                temp_path.unlink()
+
+    def _scan(self, directory: str, previous: Dict[str, Any]) -> Dict[str, Any]:
+        """List one directory, reusing placeholder sets of unchanged files."""
+        files = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('~') or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                record = {'size': stat.st_size, 'mtime': stat.st_mtime}
+                old = previous.get(entry.name)
+                if old and old['size'] == record['size'] and old['mtime'] == record['mtime']:
+                    record['placeholders'] = old.get('placeholders')
+                files[entry.name] = record
+        return files
+
+    def refresh(self, template_dirs: Iterable[Path], force: bool = False) -> List[Dict[str, Any]]:
+        """Bring the given directories up to date and return all their files.
+
+        Entries are dicts with ``name``, ``dir``, ``path``, ``size`` and ``mtime``, in
+        directory order. ``force`` rescans directories whose mtime is
+        unchanged too, to pick up templates edited in place.
+        """
+        entries = []
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            for template_dir in template_dirs:
+                directory = str(template_dir)
+                try:
+                    dir_mtime = os.stat(directory).st_mtime
+                except OSError:
+                    if self.dirs.pop(directory, None) is not None:
+                        self.dirty = True
+                    continue
+
+                known = self.dirs.get(directory)
+                if force or known is None or known['mtime'] != dir_mtime:
+                    logger.info(f"Rescanning template directory {directory}")
+                    files = self._scan(directory, known['files'] if known else {})
+                    known = self.dirs[directory] = {'mtime': dir_mtime, 'files': files}
+                    self.dirty = True
+
+                for name, record in known['files'].items():
+                    entries.append({
+                        'name': name,
+                        'dir': directory,
+                        'path': os.path.join(directory, name),
+                        'size': record['size'],
+                        'mtime': record['mtime']
+                    })
+        self.save()
+        return entries
+
+    def placeholders_for(self, path: Path) -> List[str]:
+        """Return the placeholder sequence of any template file.
+
+        The file itself is checked against its catalog record, so a template
+        edited in place is read again even before its directory is rescanned.
+        """
+        path = Path(path)
+        stat = path.stat()
+        directory, name = str(path.parent), path.name
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            record = self.dirs.get(directory, {}).get('files', {}).get(name)
+            if (record is not None and record['size'] == stat.st_size
+                    and record['mtime'] == stat.st_mtime and record.get('placeholders') is not None):
+                return record['placeholders']
+
+        placeholders = extract_placeholders(path)
+
+        with self.lock:
+            # A directory not listed yet is recorded with no mtime, so its
+            # first refresh still scans it (keeping this placeholder set)
+            known = self.dirs.setdefault(directory, {'mtime': None, 'files': {}})
+            known['files'][name] = {'size': stat.st_size, 'mtime': stat.st_mtime,
+                                    'placeholders': placeholders}
+            self.dirty = True
+        return placeholders
+
+    def placeholders(self, entry: Dict[str, Any]) -> List[str]:
+        """Return the placeholder set of a catalog entry, reading it on a miss.
+
+        As with :meth:`placeholders_for`, a set recorded for a different
+        size or mtime than the file now has is read again.
+        """
+        path = Path(entry['path'])
+        try:
+            stat = path.stat()
+        except OSError as e:
+            logger.warning(f"Could not read placeholders from {path}: {e}")
+            return []
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            known = self.dirs.get(entry['dir'], {}).get('files', {})
+            record = known.get(entry['name'])
+            if (record is not None and record['size'] == stat.st_size
+                    and record['mtime'] == stat.st_mtime and record.get('placeholders') is not None):
+                return record['placeholders']
+
+        try:
+            placeholders = extract_placeholders(path)
+        except Exception as e:
+            logger.warning(f"Could not read placeholders from {path}: {e}")
+            return []
+
+        with self.lock:
+            if record is not None:
+                record.update(size=stat.st_size, mtime=stat.st_mtime, placeholders=placeholders)
+                self.dirty = True
+        return placeholders
+
+
+def select_page(entries: List[Dict[str, Any]], prefix: Optional[str] = None,
+                query: Optional[str] = None, sort: str = 'name', order: str = 'asc',
+                offset: int = 0, limit: Optional[int] = None,
+                include: Optional[Callable[[Dict[str, Any]], bool]] = None):
+    """Filter, sort and slice catalog entries; returns (page, total matches).
+
+    ``prefix`` matches the start of the name and ``query`` any part of it,
+    both case-insensitively.
+    """
+    prefix = (prefix or '').lower()
+    query = (query or '').lower()
+    matches = [
+        entry for entry in entries
+        if (include is None or include(entry))
+        and entry['name'].lower().startswith(prefix)
+        and query in entry['name'].lower()
+    ]
+    matches.sort(key=SORT_KEYS.get(sort, SORT_KEYS['name']), reverse=(order == 'desc'))
+
+    offset = max(0, int(offset or 0))
+    end = None if limit is None else offset + max(0, int(limit))
+    return matches[offset:end], len(matches)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import base64
+import zlib
+
+import pytest
+
+from body_encoding import (COMPRESS_MIN_BYTES, DEFLATE_BASE64, EncodingError, accepts_encoding,
+                           compress_response, decode_body, decode_message, encode_body)
+from frame_codec import dumps, loads
+
+
+def deflated(raw: bytes) -> dict:
+    return {'encoding': DEFLATE_BASE64, 'payload': base64.b64encode(zlib.compress(raw)).decode('ascii')}
+
+
+def test_round_trip():
+    value = {'text': 'Lorem ipsum ' * 500, 'rows': list(range(100))}
+    body = encode_body(dumps(value))
+    assert body['encoding'] == DEFLATE_BASE64
+    assert decode_body(body, 1024 * 1024) == value
+
+
+def test_incompressible_body_is_not_encoded():
+    assert encode_body(dumps({'a': 1})) is None
+
+
+def test_decode_message_replaces_data_in_place():
+    message = {'action': 'update_template', 'data': deflated(b'{"template": "a.docx"}')}
+    assert decode_message(message, 1024) is message
+    assert message['data'] == {'template': 'a.docx'}
+
+    plain = {'action': 'ping', 'data': {'encoding': 'utf-8'}}
+    assert decode_message(plain, 1024)['data'] == {'encoding': 'utf-8'}
+
+
+def test_inflate_limit():
+    raw = dumps({'text': 'a' * 100000})
+    assert decode_body(deflated(raw), len(raw)) == loads(raw)
+    with pytest.raises(EncodingError, match='expands beyond'):
+        decode_body(deflated(raw), len(raw) - 1)
+
+
+def test_inflate_limit_stops_a_compression_bomb_early():
+    # 64 MB of spaces deflate to about 64 KB; the limit trips long before
+    bomb = deflated(b'[' + b' ' * (64 * 1024 * 1024) + b']')
+    with pytest.raises(EncodingError, match='expands beyond 1024 bytes'):
+        decode_body(bomb, 1024)
+
+
+def test_invalid_bodies():
+    with pytest.raises(EncodingError, match='Unsupported encoding'):
+        decode_body({'encoding': 'br', 'payload': ''}, 1024)
+    with pytest.raises(EncodingError, match='without a payload'):
+        decode_body({'encoding': DEFLATE_BASE64, 'payload': None}, 1024)
+    with pytest.raises(EncodingError, match='Invalid compressed body'):
+        decode_body({'encoding': DEFLATE_BASE64, 'payload': 'not base64!'}, 1024)
+
+    payload = base64.b64encode(zlib.compress(b'{"a": 1}')[:-4]).decode('ascii')
+    with pytest.raises(EncodingError, match='truncated'):
+        decode_body({'encoding': DEFLATE_BASE64, 'payload': payload}, 1024)
+
+
+def test_accepts_encoding():
+    assert accepts_encoding({'accept_encoding': DEFLATE_BASE64})
+    assert accepts_encoding({'accept_encoding': ['br', DEFLATE_BASE64]})
+    assert not accepts_encoding({'accept_encoding': 'br'})
+    assert not accepts_encoding({})
+
+
+def test_compress_response():
+    small = {'id': 1, 'success': True}
+    encoded = dumps(small)
+    assert compress_response(small, encoded) is encoded
+
+    large = {'id': 7, 'success': True, 'text': 'x' * COMPRESS_MIN_BYTES}
+    body = loads(compress_response(large, dumps(large)))
+    assert body['id'] == 7
+    assert decode_body(body, 1024 * 1024) == large
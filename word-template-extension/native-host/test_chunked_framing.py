@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+import pytest
+
+from chunked_framing import ChunkAssembler, ChunkError, is_chunk, split_message, wants_single_frame
+from frame_codec import dumps, loads
+
+MAX_FRAME = 1024
+
+
+def chunks_of(message, max_frame=MAX_FRAME):
+    return [loads(frame) for frame in split_message(dumps(message), max_frame)]
+
+
+def test_small_message_is_sent_as_one_frame():
+    encoded = dumps({'success': True})
+    assert split_message(encoded, MAX_FRAME) == [encoded]
+
+
+def test_large_message_round_trips():
+    message = {'success': True, 'text': 'x' * 5000, 'quoted': '"\\' * 700}
+    frames = split_message(dumps(message), MAX_FRAME)
+    assert len(frames) > 1
+    assert all(len(frame) <= MAX_FRAME for frame in frames)
+
+    envelopes = [loads(frame) for frame in frames]
+    assert all(is_chunk(envelope) for envelope in envelopes)
+    assert [envelope['chunk'] for envelope in envelopes] == \
+        ['start'] + ['continue'] * (len(frames) - 2) + ['end']
+
+    assembler = ChunkAssembler()
+    results = [assembler.feed(envelope) for envelope in envelopes]
+    assert results[:-1] == [None] * (len(frames) - 1)
+    assert results[-1] == message
+    assert assembler.transfers == {}
+
+
+def test_multibyte_text_is_not_cut_inside_a_character():
+    message = {'text': 'Grüße, 世界 ' * 400}
+    assembler = ChunkAssembler()
+    result = None
+    for envelope in chunks_of(message):
+        result = assembler.feed(envelope)
+    assert result == message
+
+
+def test_interleaved_transfers():
+    first, second = {'n': 'a' * 3000}, {'n': 'b' * 3000}
+    a, b = chunks_of(first), chunks_of(second)
+    assembler = ChunkAssembler()
+    done = []
+    for pair in zip(a, b):
+        for envelope in pair:
+            result = assembler.feed(envelope)
+            if result is not None:
+                done.append(result)
+    assert done == [first, second]
+
+
+def test_out_of_order_chunk_drops_the_transfer():
+    envelopes = chunks_of({'n': 'x' * 5000})
+    assembler = ChunkAssembler()
+    assembler.feed(envelopes[0])
+    with pytest.raises(ChunkError, match='expected chunk 1'):
+        assembler.feed(envelopes[2])
+    with pytest.raises(ChunkError, match='Unknown transfer'):
+        assembler.feed(envelopes[1])
+
+
+def test_transfer_over_the_limit_is_refused():
+    envelopes = chunks_of({'n': 'x' * 5000})
+    with pytest.raises(ChunkError, match='too large'):
+        ChunkAssembler(max_bytes=1000).feed(envelopes[0])
+
+
+def test_chunks_beyond_the_announced_size_are_refused():
+    start = {'chunk': 'start', 'transfer_id': 't', 'seq': 0, 'total_bytes': 4, 'data': '{"a"'}
+    assembler = ChunkAssembler()
+    assembler.feed(start)
+    with pytest.raises(ChunkError, match='exceeds its announced size'):
+        assembler.feed({'chunk': 'end', 'transfer_id': 't', 'seq': 1, 'data': ': 1}'})
+    assert assembler.transfers == {}
+
+
+def test_transfer_ending_short_is_refused():
+    assembler = ChunkAssembler()
+    assembler.feed({'chunk': 'start', 'transfer_id': 't', 'seq': 0, 'total_bytes': 10, 'data': '{"a"'})
+    with pytest.raises(ChunkError, match='ended after 7 of 10 bytes'):
+        assembler.feed({'chunk': 'end', 'transfer_id': 't', 'seq': 1, 'data': ':1}'})
+
+
+def test_concurrent_transfer_limit():
+    assembler = ChunkAssembler(max_transfers=1)
+    assembler.feed({'chunk': 'start', 'transfer_id': 'a', 'seq': 0, 'total_bytes': 2, 'data': ''})
+    with pytest.raises(ChunkError, match='Too many concurrent transfers'):
+        assembler.feed({'chunk': 'start', 'transfer_id': 'b', 'seq': 0, 'total_bytes': 2, 'data': ''})
+
+
+def test_malformed_envelopes():
+    assembler = ChunkAssembler()
+    with pytest.raises(ChunkError):
+        assembler.feed({'chunk': 'start', 'seq': 0, 'total_bytes': 2, 'data': '{}'})
+    with pytest.raises(ChunkError, match='Invalid start'):
+        assembler.feed({'chunk': 'start', 'transfer_id': 't', 'seq': 1, 'total_bytes': 2, 'data': '{}'})
+    assert not is_chunk({'chunk': 'middle'})
+    assert not is_chunk(['start'])
+
+
+def test_wants_single_frame():
+    assert wants_single_frame({'action': 'list_templates', 'oneshot': True})
+    assert not wants_single_frame({'action': 'list_templates'})
+    assert not wants_single_frame({'action': 'list_templates', 'oneshot': 'yes'})
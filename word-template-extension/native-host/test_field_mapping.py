@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import pytest
+
+from field_mapping import MISSING, PathError, compile_path, is_plain_path, parse_path
+
+DATA = {
+    'title': 'Report',
+    'author': {'name': 'Ada', 'tags': ['x', 'y']},
+    'items': [{'name': 'a', 'price': 1}, {'name': 'b', 'price': 2}, {'name': 'c'}],
+    'meta.version': 'verbatim',
+    'scores': {'math': 9, 'art': 7},
+}
+
+
+def test_parse_path():
+    assert parse_path('author.name') == ('author', 'name')
+    assert parse_path('items[0].name') == ('items', 0, 'name')
+    assert parse_path('items[-1]') == ('items', -1)
+    assert parse_path('items[*].name') == ('items', '*', 'name')
+    assert parse_path('scores.*') == ('scores', '*')
+    with pytest.raises(PathError):
+        parse_path('author..name')
+
+
+def test_plain_key():
+    assert compile_path('title')(DATA) == 'Report'
+    assert compile_path('missing')(DATA) is MISSING
+    assert compile_path('title')(['not', 'a', 'dict']) is MISSING
+
+
+def test_nested_keys_and_indices():
+    assert compile_path('author.name')(DATA) == 'Ada'
+    assert compile_path('author.tags[1]')(DATA) == 'y'
+    assert compile_path('items[1].price')(DATA) == 2
+    assert compile_path('items[-1].name')(DATA) == 'c'
+
+
+def test_misses_return_the_sentinel():
+    assert compile_path('author.email')(DATA) is MISSING
+    assert compile_path('items[5].name')(DATA) is MISSING
+    assert compile_path('items[-4]')(DATA) is MISSING
+    assert compile_path('title.length')(DATA) is MISSING
+
+
+def test_wildcards_return_every_match():
+    assert compile_path('items[*].name')(DATA) == ['a', 'b', 'c']
+    assert compile_path('items.*.price')(DATA) == [1, 2]
+    assert sorted(compile_path('scores.*')(DATA)) == [7, 9]
+    assert compile_path('nothing[*].name')(DATA) == []
+
+
+def test_verbatim_key_wins_over_the_path():
+    assert compile_path('meta.version')(DATA) == 'verbatim'
+    assert compile_path('meta.version')({'meta': {'version': 2}}) == 2
+
+
+def test_unparseable_path_is_read_as_a_key():
+    access = compile_path('a..b')
+    assert access({'a..b': 1}) == 1
+    assert access({'a': {'b': 1}}) is MISSING
+
+
+def test_is_plain_path():
+    assert is_plain_path('title')
+    assert not is_plain_path('author.name')
+    assert not is_plain_path('items[0]')
+    assert not is_plain_path('scores*')
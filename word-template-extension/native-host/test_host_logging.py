@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import logging
+import os
+import time
+
+import pytest
+
+import host_logging
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    path = tmp_path / 'host.log'
+    handler = logging.FileHandler(path, encoding='utf-8', delay=True)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    monkeypatch.setattr(host_logging, '_file_handler', lambda: handler)
+    monkeypatch.setattr(host_logging, '_log_file', path)
+    monkeypatch.setattr(host_logging, '_rotate', True)
+    monkeypatch.setattr(host_logging, '_max_bytes', 10)
+    monkeypatch.setattr(host_logging, '_backups', 2)
+    yield path, handler
+    handler.close()
+
+
+def write(handler, text):
+    handler.emit(logging.makeLogRecord({'msg': text}))
+    handler.flush()
+
+
+def test_rotation_keeps_the_configured_backups(log_file):
+    path, handler = log_file
+    assert not host_logging.rotate_log()
+
+    for text in ('first log line', 'second log line', 'third log line'):
+        write(handler, text)
+        assert host_logging.rotate_log()
+    write(handler, 'current')
+
+    assert path.read_text(encoding='utf-8') == 'current\n'
+    assert (path.parent / 'host.log.1').read_text(encoding='utf-8') == 'third log line\n'
+    assert (path.parent / 'host.log.2').read_text(encoding='utf-8') == 'second log line\n'
+    assert sorted(os.listdir(path.parent)) == ['host.log', 'host.log.1', 'host.log.2']
+
+
+def test_only_the_lock_holder_rotates(log_file):
+    path, handler = log_file
+    write(handler, 'a long enough line')
+    lock = path.parent / 'host.log.lock'
+    lock.write_bytes(b'')
+    assert not host_logging.rotate_log()
+    assert not (path.parent / 'host.log.1').exists()
+
+    # A lock left by a process that died is cleared for the next attempt
+    stale = time.time() - host_logging.ROTATE_LOCK_STALE_SECONDS - 1
+    os.utime(lock, (stale, stale))
+    assert not host_logging.rotate_log()
+    assert not lock.exists()
+    assert host_logging.rotate_log()
+
+
+def test_refused_rename_changes_nothing(log_file, monkeypatch):
+    path, handler = log_file
+    write(handler, 'a long enough line')
+
+    def refuse(source, target):
+        raise PermissionError('file is open in another process')
+
+    monkeypatch.setattr(host_logging.os, 'replace', refuse)
+    assert not host_logging.rotate_log()
+    assert os.listdir(path.parent) == ['host.log']
+    write(handler, 'still appending')
+    assert path.read_text(encoding='utf-8') == 'a long enough line\nstill appending\n'
@@ -1,16 +1,13 @@
 #!/usr/bin/env python3
 import sys
-import json
-import struct
+import io
 import subprocess
 
+from frame_codec import FrameReader, FramingError, dumps, pack_frames
+
 def send_message(message):
     """Send a message in Chrome native messaging format"""
-    message_json = json.dumps(message)
-    message_bytes = message_json.encode('utf-8')
-    length_bytes = struct.pack('<I', len(message_bytes))
-    
-    return length_bytes + message_bytes
+    return pack_frames([dumps(message)])
 
 def test_native_host():
     """Test the native host with a list_templates message"""
@@ -28,8 +25,8 @@ def test_native_host():
     stdout, stderr = process.communicate(input=message_data)
     
     try:
-        print("STDOUT:", stdout.decode('utf-8'))
-    except UnicodeDecodeError:
+        print("RESPONSE:", FrameReader(io.BytesIO(stdout)).read_message())
+    except (FramingError, ValueError):
         print("STDOUT (hex):", stdout.hex())
     
     try:
@@ -39,5 +36,37 @@ def test_native_host():
         
     print("Return code:", process.returncode)
 
+# Runs the enhanced host with python-docx hidden, as on a machine without it
+NO_DOCX_HOST = (
+    "import runpy, sys; sys.modules['docx'] = None; "
+    "sys.argv = ['word_updater_enhanced.py']; "
+    "runpy.run_path('word_updater_enhanced.py', run_name='__main__')"
+)
+
+def test_missing_dependency():
+    """Check the enhanced host reports a dependency_error when python-docx is missing"""
+    process = subprocess.run(
+        [sys.executable, '-c', NO_DOCX_HOST],
+        input=send_message({"action": "ping"}),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        timeout=30
+    )
+    
+    response = FrameReader(io.BytesIO(process.stdout)).read_message()
+    print("RESPONSE:", response)
+    print("Return code:", process.returncode)
+    error = (response or {}).get("error") or {}
+    assert error.get("type") == "dependency_error" and process.returncode == 1, \
+        "expected a dependency_error response and exit code 1"
+    print("OK")
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "deps":
+        test_missing_dependency()
+        sys.exit(0)
+    # "test_native.py load ..." runs the load tester (see benchmarks/load.py)
+    if len(sys.argv) > 1 and sys.argv[1] == "load":
+        from benchmarks.load import main
+        sys.exit(main(sys.argv[2:]))
     test_native_host()
\ No newline at end of file
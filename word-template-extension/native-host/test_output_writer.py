@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import os
+import re
+
+import pytest
+
+import output_writer
+from output_writer import OutputName, open_output
+
+
+def test_output_name_exists_only_once_published(tmp_path):
+    name = OutputName(tmp_path, 'letter', '.docx')
+    assert name.path is None
+    assert re.fullmatch(r'letter_\d{8}_\d{6}\.docx', os.path.basename(str(name)))
+
+    with open_output(name) as stream:
+        stream.write(b'document')
+        assert not any(entry.startswith('letter_') for entry in os.listdir(tmp_path))
+
+    assert name.path == tmp_path / f'letter_{name.timestamp}.docx'
+    assert name.path.read_bytes() == b'document'
+    assert os.listdir(tmp_path) == [name.path.name]
+    assert str(name) == str(name.path)
+
+
+def test_output_names_never_overwrite(tmp_path):
+    first = OutputName(tmp_path, 'letter', '.docx')
+    second = OutputName(tmp_path, 'letter', '.docx')
+    third = OutputName(tmp_path, 'letter', '.docx')
+    second.timestamp = third.timestamp = first.timestamp
+
+    for index, name in enumerate((first, second, third)):
+        with open_output(name) as stream:
+            stream.write(b'%d' % index)
+
+    assert first.path.name == f'letter_{first.timestamp}.docx'
+    assert second.path.name == f'letter_{first.timestamp}_2.docx'
+    assert third.path.name == f'letter_{first.timestamp}_3.docx'
+    assert [name.path.read_bytes() for name in (first, second, third)] == [b'0', b'1', b'2']
+
+
+def test_failed_render_publishes_nothing(tmp_path):
+    name = OutputName(tmp_path, 'letter', '.docx')
+    with pytest.raises(RuntimeError):
+        with open_output(name) as stream:
+            stream.write(b'half a document')
+            raise RuntimeError('render failed')
+    assert name.path is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_publishing_without_hard_links(tmp_path, monkeypatch):
+    def no_links(source, target):
+        raise OSError('hard links not supported')
+
+    monkeypatch.setattr(output_writer.os, 'link', no_links)
+    taken = OutputName(tmp_path, 'letter', '.txt')
+    with open_output(taken, text=True) as stream:
+        stream.write('first')
+    name = OutputName(tmp_path, 'letter', '.txt')
+    name.timestamp = taken.timestamp
+    with open_output(name, text=True) as stream:
+        stream.write('second')
+
+    assert taken.path.read_text(encoding='utf-8') == 'first'
+    assert name.path.read_text(encoding='utf-8') == 'second'
+    assert sorted(os.listdir(tmp_path)) == sorted([taken.path.name, name.path.name])
+
+
+def test_name_locked_by_another_writer_is_skipped(tmp_path, monkeypatch):
+    def no_links(source, target):
+        raise OSError('hard links not supported')
+
+    monkeypatch.setattr(output_writer.os, 'link', no_links)
+    name = OutputName(tmp_path, 'letter', '.txt')
+    (tmp_path / f'.letter_{name.timestamp}.txt.lock').write_bytes(b'')
+    with open_output(name, text=True) as stream:
+        stream.write('document')
+    assert name.path.name == f'letter_{name.timestamp}_2.txt'
+    assert sorted(os.listdir(tmp_path)) == [f'.letter_{name.timestamp}.txt.lock', name.path.name]
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='POSIX permissions')
+def test_published_files_get_the_default_mode(tmp_path):
+    name = OutputName(tmp_path, 'letter', '.docx')
+    with open_output(name) as stream:
+        stream.write(b'document')
+    target = tmp_path / 'out.txt'
+    with open_output(target, text=True) as stream:
+        stream.write('text')
+    for path in (name.path, target):
+        assert path.stat().st_mode & 0o777 == output_writer.DEFAULT_FILE_MODE
+
+
+def test_path_target_is_replaced_atomically(tmp_path):
+    target = tmp_path / 'out.txt'
+    target.write_text('old', encoding='utf-8')
+    with pytest.raises(RuntimeError):
+        with open_output(target, text=True) as stream:
+            stream.write('new')
+            raise RuntimeError('render failed')
+    assert target.read_text(encoding='utf-8') == 'old'
+
+    with open_output(target, text=True) as stream:
+        stream.write('new')
+    assert target.read_text(encoding='utf-8') == 'new'
+    assert os.listdir(tmp_path) == ['out.txt']
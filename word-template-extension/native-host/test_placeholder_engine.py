@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+from placeholder_engine import find_placeholders, substitute_runs, substitute_text
+
+
+class FakeRun:
+    """Stands in for a python-docx run, recording every write to ``text``."""
+
+    def __init__(self, text):
+        self._text = text
+        self.writes = 0
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        self._text = value
+        self.writes += 1
+
+
+def make_runs(*texts):
+    return [FakeRun(text) for text in texts]
+
+
+def texts(runs):
+    return [run.text for run in runs]
+
+
+def test_find_placeholders_in_document_order():
+    assert find_placeholders('{{B}} and {{A}}, {{B}} again') == ['{{B}}', '{{A}}', '{{B}}']
+    assert find_placeholders('no {placeholders} here') == []
+
+
+def test_substitute_text_counts_known_placeholders_only():
+    text, count = substitute_text('{{A}}-{{B}}-{{A}}', {'{{A}}': '1'})
+    assert (text, count) == ('1-{{B}}-1', 2)
+    assert substitute_text('plain', {'{{A}}': '1'}) == ('plain', 0)
+
+
+def test_substitute_runs_within_one_run():
+    runs = make_runs('Dear {{NAME}},', ' welcome')
+    assert substitute_runs(runs, {'{{NAME}}': 'Ada'}.get) == 1
+    assert texts(runs) == ['Dear Ada,', ' welcome']
+    assert runs[1].writes == 0
+
+
+def test_substitute_runs_across_runs_writes_into_first_run():
+    runs = make_runs('Total: {{', 'AM', 'OUNT}} EUR')
+    assert substitute_runs(runs, {'{{AMOUNT}}': '42'}.get) == 1
+    assert texts(runs) == ['Total: 42', '', ' EUR']
+
+
+def test_substitute_runs_skips_empty_runs_when_mapping_offsets():
+    runs = make_runs('', '{{A', '', '}}{{B}}', '')
+    assert substitute_runs(runs, {'{{A}}': 'x', '{{B}}': 'y'}.get) == 2
+    assert ''.join(texts(runs)) == 'xy'
+    assert runs[0].writes == runs[2].writes == runs[4].writes == 0
+
+
+def test_substitute_runs_several_placeholders_in_a_paragraph():
+    runs = make_runs('{{A}} {{B', '}} {{C}}')
+    resolve = {'{{A}}': 'alpha', '{{B}}': 'beta', '{{C}}': 'gamma'}.get
+    assert substitute_runs(runs, resolve) == 3
+    assert ''.join(texts(runs)) == 'alpha beta gamma'
+    assert texts(runs)[0] == 'alpha beta'
+
+
+def test_substitute_runs_leaves_unresolved_placeholders():
+    runs = make_runs('{{KNOWN}} {{UNKNOWN}}')
+    assert substitute_runs(runs, {'{{KNOWN}}': 'k'}.get) == 1
+    assert texts(runs) == ['k {{UNKNOWN}}']
+
+
+def test_substitute_runs_without_matches_writes_nothing():
+    runs = make_runs('plain ', 'text')
+    assert substitute_runs(runs, lambda placeholder: 'x') == 0
+    runs = make_runs('{{A}}')
+    assert substitute_runs(runs, lambda placeholder: None) == 0
+    assert runs[0].writes == 0
+
+
+def test_substitute_runs_with_empty_value():
+    runs = make_runs('a{{GONE}}b')
+    assert substitute_runs(runs, {'{{GONE}}': ''}.get) == 1
+    assert texts(runs) == ['ab']
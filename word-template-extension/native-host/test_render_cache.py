@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+import os
+
+import render_cache
+from render_cache import RenderCache, render_key
+
+
+def test_render_key_ignores_key_order():
+    template = ('/t/a.docx', 10, 20)
+    assert render_key(template, {'a': 1, 'b': 2}) == render_key(template, {'b': 2, 'a': 1})
+    assert render_key(template, {'a': 1}) != render_key(('/t/a.docx', 11, 20), {'a': 1})
+
+
+def test_output_is_hashed_only_when_its_mtime_moves(tmp_path, monkeypatch):
+    output = tmp_path / 'letter.docx'
+    output.write_bytes(b'document')
+    cache = RenderCache(tmp_path / 'render_cache.json')
+    cache.store('key', output, {'replacements': 1})
+
+    digests = []
+    digest = render_cache.file_digest
+    monkeypatch.setattr(render_cache, 'file_digest', lambda path: digests.append(path) or digest(path))
+
+    assert cache.lookup('key')['result'] == {'replacements': 1}
+    assert digests == []
+
+    stat = output.stat()
+    os.utime(output, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.lookup('key') is not None
+    assert len(digests) == 1
+
+    output.write_bytes(b'DOCUMENT')
+    assert cache.lookup('key') is None
+    assert cache.lookup('key') is None
+
+
+def test_edited_or_deleted_outputs_are_rendered_again(tmp_path):
+    cache = RenderCache(tmp_path / 'render_cache.json')
+    for name in ('a.docx', 'b.docx'):
+        (tmp_path / name).write_bytes(b'document')
+        cache.store(name, tmp_path / name)
+
+    (tmp_path / 'a.docx').write_bytes(b'longer document')
+    (tmp_path / 'b.docx').unlink()
+    assert cache.lookup('a.docx') is None
+    assert cache.lookup('b.docx') is None
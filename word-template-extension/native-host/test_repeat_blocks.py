@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+import pytest
+
+docx = pytest.importorskip('docx')
+
+from repeat_blocks import expand_repeat_blocks, has_repeat_blocks
+
+
+def paragraphs(doc):
+    return [paragraph.text for paragraph in doc.paragraphs]
+
+
+def rows(table):
+    return [[cell.text for cell in row.cells] for row in table.rows]
+
+
+def document(*texts):
+    doc = docx.Document()
+    for text in texts:
+        doc.add_paragraph(text)
+    return doc
+
+
+def test_has_repeat_blocks():
+    assert has_repeat_blocks('{{#each items}}')
+    assert not has_repeat_blocks('{{items}} {{/each}}')
+
+
+def test_paragraph_block_repeats_per_record():
+    doc = document('Before', '{{#each items}}', '{{@number}}. {{name}} ({{TITLE}})', '{{/each}}', 'After')
+    data = {'items': [{'name': 'a'}, {'name': 'b'}]}
+    assert expand_repeat_blocks(doc.element.body, data) == 1
+    # Fields the record lacks are left for the document-wide pass
+    assert paragraphs(doc) == ['Before', '1. a ({{TITLE}})', '2. b ({{TITLE}})', 'After']
+
+
+def test_plain_values_and_index():
+    doc = document('{{#each tags}}', '{{@index}}={{this}}', '{{/each}}', 'end')
+    expand_repeat_blocks(doc.element.body, {'tags': ['x', 'y']})
+    assert paragraphs(doc) == ['0=x', '1=y', 'end']
+
+
+def test_block_name_is_matched_case_insensitively():
+    doc = document('{{#each Items}}', '{{name}}', '{{/each}}')
+    expand_repeat_blocks(doc.element.body, {'items': [{'name': 'a'}]})
+    assert paragraphs(doc) == ['a']
+
+
+def test_missing_or_single_value():
+    doc = document('{{#each items}}', '{{name}}', '{{/each}}', 'kept')
+    expand_repeat_blocks(doc.element.body, {})
+    assert paragraphs(doc) == ['kept']
+
+    doc = document('{{#each items}}', '{{name}}', '{{/each}}')
+    expand_repeat_blocks(doc.element.body, {'items': {'name': 'only'}})
+    assert paragraphs(doc) == ['only']
+
+
+def test_unterminated_block_is_left_alone():
+    doc = document('{{#each items}}', '{{name}}')
+    assert expand_repeat_blocks(doc.element.body, {'items': [{'name': 'a'}]}) == 0
+    assert paragraphs(doc) == ['{{#each items}}', '{{name}}']
+
+
+def test_table_row_block_drops_marker_rows():
+    doc = docx.Document()
+    table = doc.add_table(rows=4, cols=2)
+    for row, values in zip(table.rows, [('Name', 'Price'), ('{{#each items}}', ''),
+                                        ('{{name}}', '{{price}}'), ('{{/each}}', '')]):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+
+    data = {'items': [{'name': 'a', 'price': 1}, {'name': 'b', 'price': 2}]}
+    assert expand_repeat_blocks(doc.element.body, data) == 1
+    assert rows(table) == [['Name', 'Price'], ['a', '1'], ['b', '2']]
+
+
+def test_lists_are_joined():
+    doc = document('{{#each people}}', '{{name}}: {{roles}}', '{{/each}}')
+    expand_repeat_blocks(doc.element.body, {'people': [{'name': 'a', 'roles': ['x', 'y']}]})
+    assert paragraphs(doc) == ['a: x, y']
+
+
+def test_inline_block_repeats_only_its_span():
+    doc = document('Tags: {{#each tags}}{{this}}; {{/each}}({{TITLE}})', 'After')
+    assert expand_repeat_blocks(doc.element.body, {'tags': ['x', 'y']}) == 1
+    assert paragraphs(doc) == ['Tags: x; y; ({{TITLE}})', 'After']
+
+
+def test_inline_block_split_across_runs():
+    doc = docx.Document()
+    paragraph = doc.add_paragraph('Items: {{#each items}}{{na')
+    paragraph.add_run('me}} {{/each}}').bold = True
+    paragraph.add_run('end')
+    expand_repeat_blocks(doc.element.body, {'items': [{'name': 'a'}, {'name': 'b'}]})
+    assert paragraphs(doc) == ['Items: a b end']
+
+
+def test_inline_block_inside_a_paragraph_block():
+    doc = document('{{#each people}}', '{{name}}: {{#each roles}}[{{this}}]{{/each}}', '{{/each}}')
+    data = {'people': [{'name': 'a', 'roles': ['x', 'y']}, {'name': 'b', 'roles': []}]}
+    assert expand_repeat_blocks(doc.element.body, data) == 1
+    assert paragraphs(doc) == ['a: [x][y]', 'b: ']
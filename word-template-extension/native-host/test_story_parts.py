@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import zipfile
+
+import pytest
+
+docx = pytest.importorskip('docx')
+
+from story_parts import iter_story_paragraphs, iter_story_parts, load_story_parts
+
+W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+CT = 'application/vnd.openxmlformats-officedocument.wordprocessingml'
+
+
+def notes(tag, text):
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<w:{tag}s xmlns:w="{W}" xmlns:r="{R}"><w:{tag} w:id="1"><w:p>'
+            f'<w:r><w:t>{text}</w:t></w:r><w:hyperlink r:id="rIdLink"><w:r><w:t> (link)</w:t></w:r></w:hyperlink>'
+            f'</w:p></w:{tag}></w:{tag}s>')
+
+
+def with_notes(path):
+    """Save a document that has footnotes and endnotes, each with a placeholder."""
+    plain = path.with_name('plain.docx')
+    docx.Document().save(str(plain))
+    link_rels = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                 '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                 f'<Relationship Id="rIdLink" Type="{R}/hyperlink" Target="https://example.com" '
+                 'TargetMode="External"/></Relationships>')
+    with zipfile.ZipFile(plain) as source, zipfile.ZipFile(path, 'w') as target:
+        for info in source.infolist():
+            data = source.read(info)
+            if info.filename == '[Content_Types].xml':
+                data = data.replace(b'</Types>', (
+                    f'<Override PartName="/word/footnotes.xml" ContentType="{CT}.footnotes+xml"/>'
+                    f'<Override PartName="/word/endnotes.xml" ContentType="{CT}.endnotes+xml"/>'
+                    '</Types>').encode())
+            elif info.filename == 'word/_rels/document.xml.rels':
+                data = data.replace(b'</Relationships>', (
+                    f'<Relationship Id="rIdFoot" Type="{R}/footnotes" Target="footnotes.xml"/>'
+                    f'<Relationship Id="rIdEnd" Type="{R}/endnotes" Target="endnotes.xml"/>'
+                    '</Relationships>').encode())
+            target.writestr(info, data)
+        target.writestr('word/footnotes.xml', notes('footnote', '{{SOURCE}}'))
+        target.writestr('word/_rels/footnotes.xml.rels', link_rels)
+        target.writestr('word/endnotes.xml', notes('endnote', '{{NOTE}}'))
+
+
+def texts(part):
+    return [''.join(t.text or '' for t in p.iter(f'{{{W}}}t')) for p, _ in iter_story_paragraphs(part.element)]
+
+
+def test_notes_are_parsed_for_this_document_only(tmp_path):
+    path = tmp_path / 'notes.docx'
+    with_notes(path)
+
+    doc = docx.Document(str(path))
+    assert [kind for _, kind, _ in iter_story_parts(doc)] == ['document']
+    assert load_story_parts(doc) == 2
+    assert load_story_parts(doc) == 0
+    parts = {kind: part for _, kind, part in iter_story_parts(doc)}
+    assert texts(parts['footnotes']) == ['{{SOURCE}} (link)']
+    assert texts(parts['endnotes']) == ['{{NOTE}} (link)']
+    assert parts['footnotes'].rels['rIdLink'].target_ref == 'https://example.com'
+
+    # No global registration: another document still sees opaque parts
+    other = docx.Document(str(path))
+    assert [kind for _, kind, _ in iter_story_parts(other)] == ['document']
+
+
+def test_edited_notes_are_saved(tmp_path):
+    path = tmp_path / 'notes.docx'
+    with_notes(path)
+    doc = docx.Document(str(path))
+    load_story_parts(doc)
+    footnotes = next(part for _, kind, part in iter_story_parts(doc) if kind == 'footnotes')
+    next(footnotes.element.iter(f'{{{W}}}t')).text = 'Annual report'
+
+    output = tmp_path / 'out.docx'
+    doc.save(str(output))
+    with zipfile.ZipFile(output) as package:
+        assert b'Annual report' in package.read('word/footnotes.xml')
+        assert b'https://example.com' in package.read('word/_rels/footnotes.xml.rels')
+        assert sum(name == 'word/footnotes.xml' for name in package.namelist()) == 1
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import os
+
+import pytest
+
+from template_catalog import TemplateCatalog, describe_placeholders, extract_placeholders, select_page
+
+
+def write_docx(path, *texts):
+    docx = pytest.importorskip('docx')
+    doc = docx.Document()
+    for text in texts:
+        doc.add_paragraph(text)
+    doc.save(str(path))
+
+
+def touch(path, text, mtime):
+    path.write_text(text, encoding='utf-8')
+    os.utime(path, (mtime, mtime))
+
+
+def test_extract_placeholders_from_text_template(tmp_path):
+    path = tmp_path / 'letter.txt'
+    path.write_text('{{NAME}} {{DATE}} {{NAME}}', encoding='utf-8')
+    assert extract_placeholders(path) == ['{{NAME}}', '{{DATE}}']
+    assert extract_placeholders(tmp_path / 'image.png') == []
+
+
+def test_extract_placeholders_keeps_block_markers(tmp_path):
+    path = tmp_path / 'invoice.docx'
+    write_docx(path, '{{TITLE}}', '{{#each items}}', '{{name}} {{TITLE}}', '{{/each}}', '{{TITLE}}')
+    assert extract_placeholders(path) == [
+        '{{TITLE}}', '{{#each items}}', '{{name}}', '{{TITLE}}', '{{/each}}']
+
+
+def test_extract_placeholders_split_across_runs(tmp_path):
+    docx = pytest.importorskip('docx')
+    doc = docx.Document()
+    paragraph = doc.add_paragraph('Dear {{FIRST')
+    paragraph.add_run('_NAME}}').bold = True
+    path = tmp_path / 'split.docx'
+    doc.save(str(path))
+    assert extract_placeholders(path) == ['{{FIRST_NAME}}']
+
+
+def test_describe_placeholders():
+    manifest = describe_placeholders([
+        '{{TITLE}}', '{{BARCODE_SKU:ean13}}', '{{items[-1]}}',
+        '{{#each items}}', '{{name}}', '{{@number}}', '{{/each}}'])
+    kinds = [(item['placeholder'], item['kind'], item.get('block')) for item in manifest['placeholders']]
+    assert kinds == [
+        ('{{TITLE}}', 'field', None),
+        ('{{BARCODE_SKU:ean13}}', 'barcode', None),
+        ('{{items[-1]}}', 'array_item', None),
+        ('{{name}}', 'field', 'items'),
+        ('{{@number}}', 'block_value', 'items'),
+    ]
+    assert manifest['placeholders'][1]['symbology'] == 'ean13'
+    assert manifest['placeholders'][2]['index'] == -1
+    assert manifest['fields'] == ['TITLE', 'BARCODE_SKU', 'items']
+    assert manifest['blocks'] == [{'name': 'items', 'fields': ['name']}]
+
+
+def test_refresh_lists_templates_and_persists(tmp_path):
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    touch(templates / 'a.txt', '{{A}}', 1000)
+    (templates / '~$lock.docx').write_bytes(b'')
+    catalog_path = tmp_path / 'catalog.json'
+
+    entries = TemplateCatalog(catalog_path).refresh([templates, tmp_path / 'missing'])
+    assert [(entry['name'], entry['size'], entry['mtime']) for entry in entries] == [('a.txt', 5, 1000)]
+    assert catalog_path.exists()
+
+    # A fresh catalog answers from the stored index while the directory is unchanged
+    catalog = TemplateCatalog(catalog_path)
+    catalog.load()
+    catalog.dirs[str(templates)]['files']['a.txt']['size'] = 99
+    assert catalog.refresh([templates])[0]['size'] == 99
+    assert catalog.refresh([templates], force=True)[0]['size'] == 5
+
+
+def test_placeholders_are_read_again_after_an_edit(tmp_path):
+    path = tmp_path / 'a.txt'
+    touch(path, '{{A}}', 1000)
+    catalog = TemplateCatalog(tmp_path / 'catalog.json')
+    entry = catalog.refresh([tmp_path])[0]
+    assert catalog.placeholders(entry) == ['{{A}}']
+    assert catalog.placeholders_for(path) == ['{{A}}']
+
+    touch(path, '{{B}} {{C}}', 2000)
+    assert catalog.placeholders(entry) == ['{{B}}', '{{C}}']
+    touch(path, '{{D}}', 3000)
+    assert catalog.placeholders_for(path) == ['{{D}}']
+
+
+def test_select_page():
+    entries = [{'name': name, 'mtime': mtime, 'size': size}
+               for name, mtime, size in [('Beta.docx', 3, 10), ('alpha.docx', 2, 30), ('beta2.txt', 1, 20)]]
+    page, total = select_page(entries, prefix='be')
+    assert ([entry['name'] for entry in page], total) == (['Beta.docx', 'beta2.txt'], 2)
+
+    page, total = select_page(entries, sort='modified', order='desc', offset=1, limit=1)
+    assert ([entry['name'] for entry in page], total) == (['alpha.docx'], 3)
+
+    page, _ = select_page(entries, query='DOCX', sort='size')
+    assert [entry['name'] for entry in page] == ['Beta.docx', 'alpha.docx']
@@ -10,7 +10,9 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Never imported by the host; keeping them out of the one-file archive
+    # shortens the extraction every cold start pays
+    excludes=['tkinter', 'test', 'pydoc_data'],
     noarchive=False,
     optimize=0,
 )
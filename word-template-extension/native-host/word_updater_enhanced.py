@@ -7,36 +7,47 @@ Includes improved error handling, logging, and diagnostics.
 
 import sys
 import json
-import struct
+import base64
 import logging
 import os
-import subprocess
+import threading
+import time
 import traceback
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 
-try:
-    from docx import Document
-    from docx.shared import Inches
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
+from importlib.util import find_spec
 
-# Configure logging with rotation
+# Only check that python-docx is installed; it is imported by the template
+# cache on the first render, so ping, config and listing requests start
+# without loading it.
+DOCX_AVAILABLE = find_spec("docx") is not None
+
+from body_encoding import ENCODINGS, EncodingError, accepts_encoding, compress_response, decode_message
+from chunked_framing import (MAX_FRAME_BYTES, RESPONSE_TOO_LARGE, ChunkAssembler, ChunkError, is_chunk,
+                             split_message, too_large_message, wants_single_frame)
+from frame_codec import JSON_BACKEND, FrameReader, FramingError, dumps
+from host_logging import LOG_DEFAULTS, apply_log_config, configure_logging, log_payload
+from job_queue import JobCancelled, JobManager, RequestRegistry, activate, current_context, job_id_from
+from metrics import Metrics, merge_into_file, phase, stats_response
+from output_writer import DEFAULT_COMPRESSION, OUTPUT_MODES, OutputName, save_document
+from placeholder_engine import substitute_runs, substitute_text
+from render_cache import RENDER_CACHE_DEFAULTS, RenderCache, render_key
+from request_dispatch import DEFAULT_REQUEST_WORKERS, FrameWriter, MessageReader, RequestDispatcher
+from story_parts import counts_summary, iter_story_parts, part_counts
+from template_cache import TemplateCache, resolve_slots
+from template_catalog import TemplateCatalog, describe_placeholders, select_page
+
+# Configure logging with rotation; the level and rotation limits come from
+# the log_* config keys once the config is loaded
 log_dir = Path.home() / "AppData" / "Local" / "WordTemplateExtension"
 log_dir.mkdir(parents=True, exist_ok=True)
 log_file = log_dir / "word_updater.log"
 
 # Set up logging with more detailed format
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - [%(funcName)s:%(lineno)d] %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler(sys.stderr)
-    ]
-)
+configure_logging(log_file, '%(asctime)s - %(levelname)s - [%(funcName)s:%(lineno)d] %(message)s')
 logger = logging.getLogger(__name__)
 
 class NativeMessagingError(Exception):
@@ -51,10 +62,24 @@ class WordTemplateUpdaterEnhanced:
         self.config_dir = Path.home() / "AppData" / "Local" / "WordTemplateExtension"
         self.config_dir.mkdir(parents=True, exist_ok=True)
         self.config_file = self.config_dir / "config.json"
+        self.config_mtime = None
+        # Serializes config changes; readers see a whole dict, never one mid-update
+        self.config_lock = threading.Lock()
         
-        # Check dependencies first
+        # The writer comes first so a missing dependency can be reported
+        self.writer = FrameWriter(sys.stdout.buffer)
         self.check_dependencies()
         self.load_config()
+        self.template_cache = TemplateCache(self.config["template_cache_mb"])
+        self.template_catalog = TemplateCatalog(self.config_dir / "template_catalog.json")
+        self.jobs = JobManager(int(self.config["job_workers"]))
+        self.requests = RequestRegistry()
+        self.chunks = ChunkAssembler(int(self.config["max_transfer_mb"]) * 1024 * 1024)
+        self.metrics = Metrics()
+        self.metrics_file = self.config_dir / "metrics.json"
+        self.render_cache = RenderCache(self.config_dir / "render_cache.json")
+        self.read_seconds = 0.0
+        self.reader = FrameReader(sys.stdin.buffer, MAX_FRAME_BYTES)
         
         logger.info("WordTemplateUpdaterEnhanced initialized successfully")
     
@@ -64,6 +89,7 @@ class WordTemplateUpdaterEnhanced:
             error_msg = "python-docx library not installed. Run: pip install python-docx"
             logger.error(error_msg)
             self.send_error_response("dependency_error", error_msg)
+            self.writer.close()
             sys.exit(1)
         
         logger.info("All dependencies available")
@@ -77,7 +103,14 @@ class WordTemplateUpdaterEnhanced:
             "default_template": "template.docx",
             "max_file_size_mb": 50,
             "allowed_extensions": [".docx", ".docm"],
-            "log_level": "INFO"
+            "template_cache_mb": 64,
+            "output_compression": DEFAULT_COMPRESSION,
+            "job_workers": 1,
+            "request_workers": DEFAULT_REQUEST_WORKERS,
+            "max_transfer_mb": 64,
+            "persist_metrics": True,
+            **RENDER_CACHE_DEFAULTS,
+            **LOG_DEFAULTS
         }
         
         try:
@@ -85,18 +118,21 @@ class WordTemplateUpdaterEnhanced:
                 with open(self.config_file, 'r', encoding='utf-8') as f:
                     user_config = json.load(f)
                 self.config = {**default_config, **user_config}
+                self.config_mtime = self.config_file.stat().st_mtime
                 logger.info("Configuration loaded from file")
             else:
                 self.config = default_config
                 self.save_config()
                 logger.info("Default configuration created")
                 
+            apply_log_config(self.config)
             # Validate and create directories
             self.validate_config()
             
         except Exception as e:
             logger.error(f"Error loading config: {e}")
             self.config = default_config
+            apply_log_config(self.config)
             self.validate_config()
     
     def validate_config(self):
@@ -117,75 +153,123 @@ class WordTemplateUpdaterEnhanced:
             logger.error(f"Error validating config: {e}")
             raise NativeMessagingError(f"Configuration validation failed: {e}")
     
+    def reload_config_if_changed(self):
+        """Reload config.json if another host process has rewritten it."""
+        try:
+            mtime = self.config_file.stat().st_mtime
+        except OSError:
+            return
+        if mtime != self.config_mtime:
+            logger.info("Configuration file changed, reloading")
+            with self.config_lock:
+                self.load_config()
+    
     def save_config(self):
         """Save configuration settings."""
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(self.config, f, indent=2)
+            self.config_mtime = self.config_file.stat().st_mtime
             logger.debug("Configuration saved")
         except Exception as e:
             logger.error(f"Error saving config: {e}")
     
     def read_message(self) -> Optional[Dict[str, Any]]:
-        """Read a message from stdin using Chrome native messaging format."""
-        try:
-            # Read the message length (4 bytes, little-endian)
-            raw_length = sys.stdin.buffer.read(4)
-            if not raw_length:
-                logger.debug("No message length received, assuming shutdown")
+        """Read a message from stdin using Chrome native messaging format.
+        
+        Each frame is limited to 1 MB; larger messages arrive as a chunked
+        transfer and are reassembled before being returned, and compressed
+        bodies are inflated. A frame that is too large or not valid JSON is
+        reported and skipped; the stream stays in step, so the messages after
+        it are still served.
+        """
+        while True:
+            try:
+                message = self.reader.read_message()
+            except FramingError as e:
+                # A truncated frame means the stream has ended; the next read says so
+                logger.error(f"Error reading message: {e}")
+                self.send_error_response("read_error", f"Message read error: {e}")
+                continue
+            except ValueError as e:
+                logger.error(f"Invalid JSON in message: {e}")
+                self.send_error_response("invalid_json", f"Invalid JSON: {e}")
+                continue
+            except Exception as e:
+                logger.error(f"Error reading message: {e}")
+                self.send_error_response("read_error", f"Message read error: {e}")
                 return None
             
-            if len(raw_length) != 4:
-                raise NativeMessagingError(f"Invalid message length header: {len(raw_length)} bytes")
-            
-            message_length = struct.unpack('<I', raw_length)[0]
-            logger.debug(f"Message length: {message_length}")
-            
-            if message_length > 1024 * 1024:  # 1MB limit
-                raise NativeMessagingError(f"Message too large: {message_length} bytes")
-            
-            # Read the message
-            message_data = sys.stdin.buffer.read(message_length)
-            if len(message_data) != message_length:
-                raise NativeMessagingError(f"Incomplete message: expected {message_length}, got {len(message_data)}")
-            
-            message_str = message_data.decode('utf-8')
-            message = json.loads(message_str)
+            if message is None:
+                logger.debug("No message length received, assuming shutdown")
+                return None
+            self.read_seconds = time.perf_counter() - self.reader.started
             
-            logger.debug(f"Received message: {json.dumps(message, indent=2)}")
+            if is_chunk(message):
+                logger.debug("Received chunk %s of transfer %s", message.get('seq'), message.get('transfer_id'))
+                try:
+                    message = self.chunks.feed(message)
+                except ChunkError as e:
+                    logger.error(f"Chunked transfer failed: {e}")
+                    self.send_error_response("chunk_error", str(e))
+                    continue
+                if message is None:
+                    continue
+            
+            try:
+                # A compressed body may expand to no more than a chunked transfer
+                decode_message(message, self.chunks.max_bytes)
+            except EncodingError as e:
+                logger.error(f"Compressed body rejected: {e}")
+                response = self.error_response("encoding_error", str(e))
+                if message.get("id") is not None:
+                    response["id"] = message["id"]
+                self.send_message(response)
+                continue
+            
+            log_payload(logger, "Received message", message)
             return message
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in message: {e}")
-            self.send_error_response("invalid_json", f"Invalid JSON: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Error reading message: {e}")
-            self.send_error_response("read_error", f"Message read error: {e}")
-            return None
     
-    def send_message(self, message: Dict[str, Any]):
-        """Send a message to stdout using Chrome native messaging format."""
+    def send_message(self, message: Dict[str, Any], compress: bool = False, single_frame: bool = False,
+                     wait: bool = False):
+        """Send a message to stdout using Chrome native messaging format.
+        
+        With ``compress`` (the request accepted it) a large message is sent
+        as a compressed body. With ``single_frame`` (a one-shot request) a
+        message too large for one frame is replaced by an error. With
+        ``wait`` it returns once the frames are written.
+        """
         try:
-            encoded_message = json.dumps(message, ensure_ascii=False).encode('utf-8')
+            encoded_message = dumps(message)
             message_length = len(encoded_message)
             
-            logger.debug(f"Sending message ({message_length} bytes): {json.dumps(message, indent=2)}")
-            
-            # Send message length (4 bytes, little-endian)
-            sys.stdout.buffer.write(struct.pack('<I', message_length))
-            
-            # Send message
-            sys.stdout.buffer.write(encoded_message)
-            sys.stdout.buffer.flush()
+            log_payload(logger, f"Sending message ({message_length} bytes)", message)
+            if compress:
+                encoded_message = compress_response(message, encoded_message)
+                if len(encoded_message) < message_length:
+                    logger.debug("Compressed response to %d bytes", len(encoded_message))
+            if single_frame and len(encoded_message) > MAX_FRAME_BYTES:
+                logger.warning(f"Response of {len(encoded_message)} bytes is too large for a one-shot request")
+                error = self.error_response(RESPONSE_TOO_LARGE, too_large_message(len(encoded_message)))
+                if message.get("id") is not None:
+                    error["id"] = message["id"]
+                encoded_message = dumps(error)
+            
+            # Messages over the 1MB browser limit go out as a chunked transfer
+            frames = split_message(encoded_message)
+            if len(frames) > 1:
+                logger.debug("Sending message in %d chunks", len(frames))
+            
+            # Request and job threads send too; one writer thread keeps frames contiguous
+            self.writer.send(frames, wait)
             
         except Exception as e:
             logger.error(f"Error sending message: {e}")
             # Can't send error response if send_message itself fails
     
-    def send_error_response(self, error_type: str, error_message: str, **kwargs):
-        """Send standardized error response."""
-        response = {
+    def error_response(self, error_type: str, error_message: str, **kwargs) -> Dict[str, Any]:
+        """Build standardized error response."""
+        return {
             "success": False,
             "error": {
                 "type": error_type,
@@ -194,17 +278,23 @@ class WordTemplateUpdaterEnhanced:
                 **kwargs
             }
         }
-        self.send_message(response)
     
-    def send_success_response(self, data: Dict[str, Any] = None, **kwargs):
-        """Send standardized success response."""
-        response = {
+    def success_response(self, data: Dict[str, Any] = None, **kwargs) -> Dict[str, Any]:
+        """Build standardized success response."""
+        return {
             "success": True,
             "timestamp": datetime.now().isoformat(),
             **(data or {}),
             **kwargs
         }
-        self.send_message(response)
+    
+    def send_error_response(self, error_type: str, error_message: str, **kwargs):
+        """Send standardized error response."""
+        self.send_message(self.error_response(error_type, error_message, **kwargs))
+    
+    def send_success_response(self, data: Dict[str, Any] = None, **kwargs):
+        """Send standardized success response."""
+        self.send_message(self.success_response(data, **kwargs))
     
     def handle_ping(self, message: Dict[str, Any]) -> Dict[str, Any]:
         """Handle ping requests for connectivity testing."""
@@ -213,33 +303,60 @@ class WordTemplateUpdaterEnhanced:
             "action": "pong",
             "version": "2.0.0",
             "status": "ready",
+            "capabilities": ["request_id", "pipelining", "persistent", "jobs", "chunked", "stats",
+                             "deadlines", "cancel", "concurrent", "compression", "oneshot"],
+            "encodings": list(ENCODINGS),
             "config": {
                 "template_path": self.config["template_path"],
                 "output_path": self.config["output_path"],
-                "docx_available": DOCX_AVAILABLE
+                "docx_available": DOCX_AVAILABLE,
+                "json_backend": JSON_BACKEND
             }
         }
     
     def handle_list_templates(self, message: Dict[str, Any]) -> Dict[str, Any]:
-        """List available templates."""
+        """List available templates from the persistent catalog.
+        
+        ``data`` may hold ``prefix``/``query`` name filters, ``sort`` (name,
+        modified, size) and ``order``, ``offset``/``limit`` paging,
+        ``placeholders`` to include placeholder sets and ``refresh`` to force
+        a full rescan.
+        """
         try:
+            data = message.get("data") or {}
             template_path = Path(self.config["template_path"])
-            templates = []
+            extensions = tuple(ext.lower() for ext in self.config["allowed_extensions"])
+            
+            entries = self.template_catalog.refresh([template_path], force=bool(data.get("refresh")))
+            page, total = select_page(
+                entries,
+                prefix=data.get("prefix"),
+                query=data.get("query"),
+                sort=data.get("sort", "name"),
+                order=data.get("order", "asc"),
+                offset=data.get("offset", 0),
+                limit=data.get("limit"),
+                include=lambda entry: entry["name"].lower().endswith(extensions)
+            )
             
-            if template_path.exists():
-                for ext in self.config["allowed_extensions"]:
-                    for template_file in template_path.glob(f"*{ext}"):
-                        templates.append({
-                            "name": template_file.name,
-                            "path": str(template_file),
-                            "size": template_file.stat().st_size,
-                            "modified": datetime.fromtimestamp(template_file.stat().st_mtime).isoformat()
-                        })
-            
-            logger.info(f"Found {len(templates)} templates")
+            templates = []
+            for entry in page:
+                template = {
+                    "name": entry["name"],
+                    "path": entry["path"],
+                    "size": entry["size"],
+                    "modified": datetime.fromtimestamp(entry["mtime"]).isoformat()
+                }
+                if data.get("placeholders"):
+                    template["placeholders"] = self.template_catalog.placeholders(entry)
+                templates.append(template)
+            self.template_catalog.save()
+            
+            logger.info(f"Found {total} templates, returning {len(templates)}")
             return {
                 "action": "template_list",
                 "templates": templates,
+                "total": total,
                 "template_path": str(template_path)
             }
             
@@ -247,6 +364,33 @@ class WordTemplateUpdaterEnhanced:
             logger.error(f"Error listing templates: {e}")
             raise NativeMessagingError(f"Failed to list templates: {e}")
     
+    def handle_describe_template(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the placeholders, data fields and repeating blocks a template uses."""
+        try:
+            template_name = (message.get("data") or {}).get("template")
+            if not template_name:
+                raise NativeMessagingError("No template specified")
+            
+            template_path = Path(self.config["template_path"]) / template_name
+            if not template_path.exists():
+                raise NativeMessagingError(f"Template not found: {template_name}")
+            
+            sequence = self.template_catalog.placeholders_for(template_path)
+            self.template_catalog.save()
+            
+            return {
+                "action": "template_description",
+                "template": template_name,
+                "path": str(template_path),
+                **describe_placeholders(sequence)
+            }
+            
+        except NativeMessagingError:
+            raise
+        except Exception as e:
+            logger.error(f"Error describing template: {e}")
+            raise NativeMessagingError(f"Failed to describe template: {e}")
+    
     def handle_update_template(self, message: Dict[str, Any]) -> Dict[str, Any]:
         """Update a Word template with provided data."""
         try:
@@ -268,90 +412,153 @@ class WordTemplateUpdaterEnhanced:
                 raise NativeMessagingError(f"Template too large: {template_size / 1024 / 1024:.1f}MB")
             
             logger.info(f"Processing template: {template_name}")
-            logger.debug(f"Extracted data: {extracted_data}")
+            log_payload(logger, "Extracted data", extracted_data)
+            
+            output_mode = data.get("output", "file")
+            if output_mode not in OUTPUT_MODES:
+                raise NativeMessagingError(f"Unknown output mode: {output_mode}")
+            level = data.get("compression", self.config["output_compression"])
+            
+            if output_mode == "bytes":
+                # Render in memory; large responses go out as a chunked transfer
+                buffer = BytesIO()
+                _, counts = self.process_template(template_path, extracted_data, level, buffer)
+                content = buffer.getvalue()
+                return {
+                    "action": "template_updated",
+                    "template": template_name,
+                    "filename": f"{template_path.stem}.docx",
+                    "size": len(content),
+                    "document_base64": base64.b64encode(content).decode("ascii"),
+                    "data_processed": len(extracted_data),
+                    **counts
+                }
+            
+            # A retried or repeated request gets the document it already produced
+            cache_key = None
+            if self.config.get("render_cache", True):
+                self.render_cache.configure(self.config)
+                cache_key = render_key(TemplateCache.make_key(template_path), {
+                    "host": "enhanced",
+                    "extractedData": extracted_data,
+                    "compression": level,
+                    "output_dir": self.config["output_path"]
+                })
+                with phase("cache"):
+                    entry = self.render_cache.claim(cache_key)
+                if entry is not None:
+                    output_path = entry["output_path"]
+                    logger.info(f"Identical render already produced, returning {output_path}")
+                    self.auto_open(Path(output_path))
+                    return {
+                        "action": "template_updated",
+                        "template": template_name,
+                        "output_path": output_path,
+                        "data_processed": len(extracted_data),
+                        "cached": True,
+                        **entry["result"]
+                    }
             
             # Process the template
-            output_path = self.process_template(template_path, extracted_data)
+            try:
+                output_path, counts = self.process_template(template_path, extracted_data, level)
+                if cache_key is not None:
+                    self.render_cache.store(cache_key, output_path, counts)
+            finally:
+                if cache_key is not None:
+                    self.render_cache.release(cache_key)
             
             return {
                 "action": "template_updated",
                 "template": template_name,
                 "output_path": str(output_path),
-                "data_processed": len(extracted_data)
+                "data_processed": len(extracted_data),
+                **counts
             }
             
+        except JobCancelled:
+            raise
         except Exception as e:
             logger.error(f"Error updating template: {e}")
             raise NativeMessagingError(f"Template update failed: {e}")
     
-    def process_template(self, template_path: Path, data: Dict[str, Any]) -> Path:
-        """Process a template with provided data."""
+    def process_template(self, template_path: Path, data: Dict[str, Any], level: Optional[int] = None,
+                         output=None) -> Tuple[Any, Dict[str, Any]]:
+        """Process a template with provided data.
+        
+        The document is compressed at ``level`` (0-9, 0 stores) and published
+        atomically in the output folder, or written to ``output`` when a
+        binary file object is given (nothing then touches the disk). Returns
+        the output path (or ``output``) and the replacement total with
+        per-part counts, covering every story part of the template.
+        """
         try:
-            # Load template
-            doc = Document(str(template_path))
-            
-            # Generate output filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            base_name = template_path.stem
-            output_name = f"{base_name}_{timestamp}.docx"
-            output_path = Path(self.config["output_path"]) / output_name
-            
-            # Replace placeholders
-            replacements_made = 0
-            
-            # Process paragraphs
-            for paragraph in doc.paragraphs:
-                original_text = paragraph.text
-                new_text = self.replace_placeholders(original_text, data)
-                if new_text != original_text:
-                    paragraph.text = new_text
-                    replacements_made += 1
-            
-            # Process tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        original_text = cell.text
-                        new_text = self.replace_placeholders(original_text, data)
-                        if new_text != original_text:
-                            cell.text = new_text
-                            replacements_made += 1
-            
-            # Save document
-            doc.save(str(output_path))
-            
-            logger.info(f"Template processed: {replacements_made} replacements made")
-            logger.info(f"Output saved to: {output_path}")
-            
-            # Auto-open if configured
-            if self.config.get("auto_open", False):
-                try:
-                    os.startfile(str(output_path))
-                    logger.info("Document opened automatically")
-                except Exception as e:
-                    logger.warning(f"Could not auto-open document: {e}")
-            
-            return output_path
-            
+            # Load template from the compiled cache
+            with phase("open"):
+                compiled = self.template_cache.get(template_path)
+                doc = compiled.clone()
+            
+            # Process the indexed paragraphs of every story part
+            with phase("replace"):
+                replacements = self.build_replacements(data)
+                counts = part_counts(iter_story_parts(doc))
+                for name, found in resolve_slots(doc, compiled.slots):
+                    for slot, paragraph in found:
+                        # Rewrite runs in place so character formatting survives
+                        replaced = substitute_runs(paragraph.runs, replacements.get)
+                        if slot.primary:
+                            counts[name]["replacements"] += replaced
+                        current_context().add_replacements(replaced)
+                    current_context().part_done(name)
+                counts = counts_summary(counts)
+            
+            # Save document; concurrent renders may finish in the same second,
+            # so the file name is only settled once it is complete
+            with phase("save"):
+                if output is None:
+                    name = OutputName(Path(self.config["output_path"]), template_path.stem, ".docx")
+                    save_document(doc, name, template_path, level)
+                    output = name.path
+                else:
+                    save_document(doc, output, template_path, level)
+            
+            logger.info(f"Template processed: {counts['replacements']} replacements made")
+            if not isinstance(output, Path):
+                return output, counts
+            logger.info(f"Output saved to: {output}")
+            
+            self.auto_open(output)
+            return output, counts
+            
+        except JobCancelled:
+            raise
         except Exception as e:
             logger.error(f"Error processing template: {e}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
     
+    def auto_open(self, output_path: Path):
+        """Open a generated document if configured to."""
+        if self.config.get("auto_open", False):
+            try:
+                with phase("auto_open"):
+                    os.startfile(str(output_path))
+                logger.info("Document opened automatically")
+            except Exception as e:
+                logger.warning(f"Could not auto-open document: {e}")
+    
+    def build_replacements(self, data: Dict[str, Any]) -> Dict[str, str]:
+        """Map each ``{{key}}`` placeholder to its formatted value."""
+        return {f"{{{{{key}}}}}": self.format_value(value) for key, value in data.items()}
+    
     def replace_placeholders(self, text: str, data: Dict[str, Any]) -> str:
         """Replace placeholders in text with data values."""
         if not text or not data:
             return text
         
-        result = text
-        for key, value in data.items():
-            placeholder = f"{{{{{key}}}}}"
-            if placeholder in result:
-                # Convert value to string, handling different data types
-                str_value = self.format_value(value)
-                result = result.replace(placeholder, str_value)
-                logger.debug(f"Replaced {placeholder} with '{str_value}'")
-        
+        result, replaced = substitute_text(text, self.build_replacements(data))
+        if replaced:
+            logger.debug("Replaced %d placeholder(s)", replaced)
         return result
     
     def format_value(self, value: Any) -> str:
@@ -375,70 +582,206 @@ class WordTemplateUpdaterEnhanced:
         }
     
     def handle_update_config(self, message: Dict[str, Any]) -> Dict[str, Any]:
-        """Update configuration."""
+        """Update configuration.
+        
+        The new dict is swapped in whole under the lock, as other requests
+        read the configuration on the pool meanwhile.
+        """
         try:
             new_config = message.get("config", {})
             
-            # Validate new config
-            for key, value in new_config.items():
-                if key in self.config:
-                    self.config[key] = value
-            
-            self.save_config()
-            self.validate_config()
+            with self.config_lock:
+                # Only known keys are taken
+                config = dict(self.config)
+                for key, value in new_config.items():
+                    if key in config:
+                        config[key] = value
+                
+                self.config = config
+                self.save_config()
+                self.validate_config()
+                apply_log_config(config)
             
             logger.info("Configuration updated")
             return {
                 "action": "config_updated",
-                "config": self.config.copy()
+                "config": config.copy()
             }
             
         except Exception as e:
             logger.error(f"Error updating config: {e}")
             raise NativeMessagingError(f"Configuration update failed: {e}")
     
-    def process_message(self, message: Dict[str, Any]):
-        """Process incoming messages and route to appropriate handlers."""
+    def handle_submit_job(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue an update_template request as a background job.
+        
+        Progress is pushed as ``{"type": "progress", ...}`` messages when the
+        request sets ``progress``; both that and job_result need the
+        persistent port the job was started on.
+        """
+        request_id = message.get("id")
+        on_progress = None
+        if message.get("progress"):
+            def on_progress(progress):
+                self.send_message({"type": "progress", "id": request_id, **progress})
+        
+        action = message.get("action")
+        
+        def run_job():
+            with self.metrics.request(action) as timer:
+                result = self.handle_message({**message, "async": False})
+                timer.failed = result.get("success") is False
+                return result
+        
+        job = self.jobs.submit(action, run_job, on_progress, current_context().deadline)
+        return {"action": "job_queued", "job_id": job.id, "status": job.status}
+    
+    def job_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Unwrap a JobManager answer, raising on unknown or finished jobs."""
+        if not response.pop("success"):
+            raise NativeMessagingError(response["error"])
+        return response
+    
+    def handle_job_status(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Report the state and progress of a background job."""
+        return self.job_response(self.jobs.status(job_id_from(message)))
+    
+    def handle_job_result(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a finished job's response, or ``ready: false`` while it runs."""
+        return self.job_response(self.jobs.result(job_id_from(message)))
+    
+    def handle_cancel_job(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Ask a queued or running job to stop."""
+        return self.job_response(self.jobs.cancel(job_id_from(message)))
+    
+    def handle_stats(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Report per-action latency histograms.
+        
+        ``data.scope`` is ``all`` (this process plus the metrics file) or
+        ``process``; ``data.reset`` clears both after reporting.
+        """
+        data = message.get("data", {})
+        response = stats_response(self.metrics, self.metrics_file, data.get("scope", "all"))
+        if data.get("reset"):
+            self.metrics.reset()
+            if self.metrics_file.exists():
+                self.metrics_file.unlink()
+        return {"action": "stats", **response}
+    
+    def handle_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Route a message to its handler and return the response envelope."""
         try:
             action = message.get("action", "unknown")
-            logger.info(f"Processing action: {action}")
+            logger.info("Processing action: %s", action)
             
             handlers = {
                 "ping": self.handle_ping,
                 "list_templates": self.handle_list_templates,
+                "describe_template": self.handle_describe_template,
                 "update_template": self.handle_update_template,
                 "get_config": self.handle_get_config,
-                "update_config": self.handle_update_config
+                "update_config": self.handle_update_config,
+                "job_status": self.handle_job_status,
+                "job_result": self.handle_job_result,
+                "cancel_job": self.handle_cancel_job,
+                "stats": self.handle_stats
             }
             
+            if message.get("async") and action == "update_template":
+                return self.success_response(self.handle_submit_job(message))
             if action in handlers:
                 response_data = handlers[action](message)
-                self.send_success_response(response_data)
+                return self.success_response(response_data)
             else:
                 error_msg = f"Unknown action: {action}"
                 logger.error(error_msg)
-                self.send_error_response("unknown_action", error_msg, available_actions=list(handlers.keys()))
+                return self.error_response("unknown_action", error_msg, available_actions=list(handlers.keys()))
                 
+        except JobCancelled:
+            raise
         except NativeMessagingError as e:
             logger.error(f"Native messaging error: {e}")
-            self.send_error_response("native_messaging_error", str(e))
+            return self.error_response("native_messaging_error", str(e))
         except Exception as e:
             logger.error(f"Unexpected error processing message: {e}")
             logger.error(f"Traceback: {traceback.format_exc()}")
-            self.send_error_response("internal_error", f"Internal error: {e}")
+            return self.error_response("internal_error", f"Internal error: {e}")
+    
+    def cancel_request(self, message: Dict[str, Any]) -> bool:
+        """Handle ``cancel_request`` as soon as it is read; False for any other message.
+        
+        Runs on the reader thread, so the request being cancelled can be
+        stopped at its next check rather than answered first.
+        """
+        if message.get("action") != "cancel_request":
+            return False
+        target = message.get("request_id", message.get("data", {}).get("request_id"))
+        result = self.requests.cancel(target)
+        if result.pop("success"):
+            response = self.success_response({"action": "request_cancelling", **result})
+        else:
+            response = self.error_response("native_messaging_error", result["error"])
+        if message.get("id") is not None:
+            response["id"] = message["id"]
+        self.send_message(response)
+        return True
+    
+    def handle_request(self, message: Dict[str, Any], context) -> Dict[str, Any]:
+        """Handle a message under its render context (deadline and cancellation)."""
+        try:
+            with activate(context):
+                context.check()
+                return self.handle_message(message)
+        except JobCancelled as e:
+            logger.warning(f"Abandoned {message.get('action')}: {e}")
+            return self.error_response(e.code, str(e))
+        finally:
+            self.requests.discard(message.get("id"))
+    
+    def process_message(self, message: Dict[str, Any], read_seconds: float, context):
+        """Process incoming messages and send the response.
+        
+        The client supplied ``id`` is echoed so that several requests can be
+        in flight on one ``connectNative`` port.
+        """
+        action = message.get("action", "unknown")
+        # Queued renders are timed by their job; this only times the hand-off
+        if message.get("async") and action == "update_template":
+            action = "submit_job"
+        with self.metrics.request(action) as timer:
+            timer.add("read", read_seconds)
+            with phase("config"):
+                self.reload_config_if_changed()
+            response = self.handle_request(message, context)
+            timer.failed = response.get("success") is False
+            if message.get("id") is not None:
+                response["id"] = message["id"]
+            with phase("write"):
+                self.send_message(response, accepts_encoding(message), wants_single_frame(message), wait=True)
     
     def run(self):
-        """Main message processing loop."""
+        """Main message processing loop.
+        
+        Handles one message per process for ``sendNativeMessage`` and any
+        number of pipelined messages for a ``connectNative`` port, until
+        stdin is closed. Messages are read ahead on their own thread, so a
+        ``cancel_request`` reaches a request while it is still rendering.
+        Renders run on up to ``request_workers`` threads while cheap actions
+        are answered at once, so responses may arrive out of order.
+        """
         logger.info("Starting WordTemplateUpdaterEnhanced main loop")
+        reader = MessageReader(self.read_message, lambda: self.read_seconds,
+                               self.requests, self.cancel_request).start()
+        dispatcher = RequestDispatcher(self.process_message, int(self.config["request_workers"]))
         
         try:
             while True:
-                message = self.read_message()
-                if message is None:
+                queued = reader.get()
+                if queued is None:
                     logger.info("No message received, shutting down")
                     break
                 
-                self.process_message(message)
+                dispatcher.dispatch(*queued)
                 
         except KeyboardInterrupt:
             logger.info("Received keyboard interrupt, shutting down")
@@ -447,6 +790,11 @@ class WordTemplateUpdaterEnhanced:
             logger.error(f"Traceback: {traceback.format_exc()}")
             self.send_error_response("fatal_error", f"Fatal error: {e}")
         finally:
+            dispatcher.shutdown()
+            self.jobs.shutdown()
+            self.writer.close()
+            if self.config.get("persist_metrics", True):
+                merge_into_file(self.metrics_file, self.metrics)
             logger.info("WordTemplateUpdaterEnhanced shutting down")
 
 def main():